@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+from flask import Response, request, abort
+from serializacao_json import para_json, de_json
+from snapshot_dados import (
+    obter_snapshot,
+    agregar_por_nre,
+    agregar_selecao,
+    COLUNAS_NUMERICAS,
+    COLUNAS_CONTAGEM,
+    COLUNAS_RANKING,
+    COLUNAS_SOMA
+)
+
+# Prefixo das rotas da API (versão do contrato, não dos dados)
+PREFIXO_API = '/api/v1'
+
+# Escolas por página (padrão e máximo)
+ESCOLAS_POR_PAGINA = 100
+MAXIMO_POR_PAGINA = 1000
+
+# Escolas serializadas por vez no NDJSON
+LINHAS_POR_PARTE_NDJSON = 1000
+
+def ler_inteiro(nome, padrao, minimo=1, maximo=None):
+    """
+    Lê um parâmetro inteiro da query string (erro 400 se for inválido)
+    """
+    valor = request.args.get(nome)
+    if valor is None or valor == '':
+        return padrao
+    try:
+        valor = int(valor)
+    except ValueError:
+        abort(400, f"Parâmetro {nome} inválido")
+    if valor < minimo or (maximo is not None and valor > maximo):
+        abort(400, f"Parâmetro {nome} fora do intervalo")
+    return valor
+
+def dataframe_api_escolas(snapshot, indices):
+    """
+    Monta as escolas no formato da API (nomes de campo do snapshot, NaN
+    serializado como null)
+
+    Args:
+        snapshot: Snapshot das escolas
+        indices: Índices (ou fatia) das escolas
+
+    Returns:
+        DataFrame
+    """
+    nres = np.array(snapshot['nres'], dtype=object)
+    dados = {'nre': nres[snapshot['nre_codigo'][indices]], 'escola': snapshot['escola'][indices]}
+    for nome in list(COLUNAS_NUMERICAS) + [nome for nome in COLUNAS_RANKING if nome in snapshot]:
+        valores = snapshot[nome][indices]
+        if nome in COLUNAS_CONTAGEM and not np.isnan(valores).any():
+            valores = valores.astype(np.int64)
+        dados[nome] = valores
+    return pd.DataFrame(dados)
+
+def registros(df):
+    """
+    Converte um DataFrame na lista de objetos JSON (NaN vira None)
+    """
+    return de_json(df.to_json(orient='records', force_ascii=False))
+
+def faixa_escolas(snapshot, nre=None):
+    """
+    Retorna a faixa (início, fim) das escolas do NRE nos arrays do snapshot,
+    ou de todas as escolas
+    """
+    if nre is None:
+        return 0, len(snapshot['escola'])
+    codigo = snapshot['nres'].index(nre)
+    return int(snapshot['offsets'][codigo]), int(snapshot['offsets'][codigo + 1])
+
+def resposta_json(conteudo, versao):
+    """
+    Monta a resposta JSON da API com o ETag da versão dos dados
+    """
+    resposta = Response(para_json(conteudo), mimetype='application/json')
+    return marcar_versao(resposta, versao)
+
+def marcar_versao(resposta, versao):
+    """
+    Adiciona o ETag (versão dos dados) e o Cache-Control das respostas da API
+
+    O ETag é fraco porque a mesma versão pode ir comprimida ou não.
+    """
+    resposta.set_etag(versao, weak=True)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
+def gerar_ndjson(snapshot, inicio, fim):
+    """
+    Gera as escolas da faixa em NDJSON (um objeto por linha), em partes de
+    LINHAS_POR_PARTE_NDJSON escolas
+
+    Yields:
+        str: Linhas de uma parte
+    """
+    for parte in range(inicio, fim, LINHAS_POR_PARTE_NDJSON):
+        df = dataframe_api_escolas(snapshot, slice(parte, min(parte + LINHAS_POR_PARTE_NDJSON, fim)))
+        yield df.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n') + '\n'
+
+def registrar_rotas_api(server):
+    """
+    Registra no servidor Flask a API somente leitura, servida do snapshot
+    carregado:
+
+    - /api/v1/nres: métricas de cada NRE
+    - /api/v1/escolas?nre=&page=&por_pagina=: escolas paginadas (todas, ou
+      as do NRE); com formato=ndjson, todas as escolas do filtro em NDJSON
+    - /api/v1/resumo?nre=: totais e indicadores do Estado ou do NRE
+
+    Todas as respostas levam o ETag da versão dos dados: um cliente que envia
+    If-None-Match com a versão atual recebe 304 sem que nada seja calculado.
+
+    Args:
+        server: Aplicação Flask
+    """
+    def snapshot_atual():
+        snapshot = obter_snapshot()
+        if snapshot is None:
+            abort(503, "Dados ainda não carregados")
+        if request.if_none_match.contains_weak(snapshot['versao']):
+            abort(marcar_versao(Response(status=304), snapshot['versao']))
+        nre = request.args.get('nre') or None
+        if nre is not None and nre not in snapshot['nres']:
+            abort(404, f"NRE não encontrado: {nre}")
+        return snapshot, nre
+
+    @server.route(f'{PREFIXO_API}/nres')
+    def api_nres():
+        snapshot, _ = snapshot_atual()
+        totais = agregar_por_nre(snapshot, snapshot['nres'])
+        for nome in COLUNAS_SOMA:
+            totais[nome] = np.rint(totais[nome]).astype(np.int64)
+        dados = pd.DataFrame({'nre': snapshot['nres'], **totais})
+        return resposta_json({'versao': snapshot['versao'], 'dados': registros(dados)}, snapshot['versao'])
+
+    @server.route(f'{PREFIXO_API}/escolas')
+    def api_escolas():
+        snapshot, nre = snapshot_atual()
+        inicio, fim = faixa_escolas(snapshot, nre)
+
+        if request.args.get('formato') == 'ndjson':
+            resposta = Response(gerar_ndjson(snapshot, inicio, fim), mimetype='application/x-ndjson')
+            return marcar_versao(resposta, snapshot['versao'])
+
+        por_pagina = ler_inteiro('por_pagina', ESCOLAS_POR_PAGINA, maximo=MAXIMO_POR_PAGINA)
+        total = fim - inicio
+        paginas = max(1, -(-total // por_pagina))
+        pagina = ler_inteiro('page', 1, maximo=paginas)
+
+        primeira = inicio + (pagina - 1) * por_pagina
+        dados = dataframe_api_escolas(snapshot, slice(primeira, min(primeira + por_pagina, fim)))
+        return resposta_json({
+            'versao': snapshot['versao'],
+            'nre': nre,
+            'pagina': pagina,
+            'paginas': paginas,
+            'por_pagina': por_pagina,
+            'total': total,
+            'dados': registros(dados),
+        }, snapshot['versao'])
+
+    @server.route(f'{PREFIXO_API}/resumo')
+    def api_resumo():
+        snapshot, nre = snapshot_atual()
+        totais = agregar_selecao(snapshot, [nre] if nre else snapshot['nres'])
+        resumo = {nome: (None if np.isnan(valor) else float(valor)) for nome, valor in totais.items()}
+        for nome in COLUNAS_SOMA + ('num_escolas',):
+            resumo[nome] = int(round(totais[nome]))
+        return resposta_json({
+            'versao': snapshot['versao'],
+            'nre': nre,
+            'num_nres': 1 if nre else len(snapshot['nres']),
+            'semanas_atuais': snapshot.get('semanas_atuais'),
+            'questoes_por_semana': snapshot.get('questoes_por_semana'),
+            **resumo,
+        }, snapshot['versao'])
@@ -1,8 +1,10 @@
 import os
 import dash
 from dash import dcc, html, Input, Output, State, callback
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import pandas as pd
+import numpy as np
 import json
 import plotly.express as px
 import plotly.graph_objects as go
@@ -10,12 +12,50 @@ import base64
 from datetime import datetime
 from melhorias_graficos import (
     criar_gauge_melhorado, 
+    criar_patch_gauge,
     criar_grafico_nres_melhorado, 
     criar_grafico_alunos_nre_melhorado,
-    criar_tabela_escolas_melhorada
+    criar_tabela_escolas_melhorada,
+    criar_grafico_dispersao_escolas,
+    criar_grafico_hierarquia_escolas,
+    criar_grafico_comparacao,
+    criar_grafico_distribuicao,
+    criar_patch_distribuicao,
+    precarregar_templates_gauge
 )
+from snapshot_dados import (
+    construir_snapshot,
+    publicar_snapshot,
+    obter_snapshot,
+    dataframe_escolas,
+    dataframe_nres,
+    agregar_por_nre,
+    agregar_selecao,
+    histograma,
+    data_publicacao,
+    SEPARADOR_CHAVE
+)
+from visoes_dashboard import (
+    variacao_nres,
+    calcular_indicadores,
+    tabela_escolas_filtro,
+    construir_saidas_filtro,
+    chaves_escolas,
+    indices_por_chaves,
+    indices_filtro,
+    nre_do_filtro
+)
+from visoes_precalculadas import preparar_visoes, obter_saidas_precalculadas
+from busca_escolas import buscar_escolas
 from exportar_dados import criar_componentes_exportacao, registrar_callbacks_exportacao
-from atualizar_dados_integrado import verificar_formato_planilha, atualizar_dados_dashboard, obter_historico_atualizacoes
+from artefatos_exportacao import preparar_artefatos
+from renderizador_imagens import iniciar_renderizador
+from processos_auxiliares import em_processo_auxiliar
+from compressao_http import registrar_compressao
+from api_dados import registrar_rotas_api
+from serializacao_json import instalar_serializacao_callbacks
+from tarefas_pesadas import executar_tarefa, ServidorOcupado
+from atualizar_dados_integrado import verificar_formato_planilha, atualizar_dados_dashboard, obter_historico_atualizacoes, recalcular_semanas
 
 # Inicializar a aplicação Dash
 app = dash.Dash(
@@ -28,6 +68,15 @@ app = dash.Dash(
 # Configurar o servidor para implantação
 server = app.server
 
+# Serializar as respostas dos callbacks com orjson, quando instalado
+instalar_serializacao_callbacks()
+
+# Comprimir as respostas dos callbacks (figuras em JSON)
+registrar_compressao(server)
+
+# API somente leitura (/api/v1)
+registrar_rotas_api(server)
+
 # Definir o título da aplicação
 app.title = "Dashboard Desafio PR - NREs"
 
@@ -126,200 +175,352 @@ except:
     with open('dados_processados/historico_atualizacoes.json', 'w', encoding='utf-8') as f:
         json.dump([], f, ensure_ascii=False, indent=4)
 
+# Carregar o snapshot colunar das escolas (gerado na ingestão) ou criá-lo a
+# partir dos dados carregados acima. Os callbacks usam obter_snapshot(), que
+# acompanha as novas versões publicadas.
+snapshot_escolas = obter_snapshot()
+if snapshot_escolas is None:
+    snapshot_escolas = construir_snapshot(df_escolas_metricas, estrutura_dados['semanas_atuais'], estrutura_dados['questoes_por_semana'])
+    publicar_snapshot(snapshot_escolas)
+
+# As tarefas de segundo plano são só do servidor: os processos auxiliares
+# (spawn) reimportam o módulo principal ao iniciar
+if not em_processo_auxiliar():
+    # Pré-calcular em segundo plano as visões do Estado e de cada NRE que
+    # ainda não estiverem em disco (até lá, o dashboard as constrói na hora)
+    preparar_visoes(snapshot_escolas)
+
+    # Gerar em segundo plano os arquivos de exportação desta versão dos
+    # dados (os que já existirem em disco são reaproveitados)
+    preparar_artefatos(snapshot_escolas)
+
+    # Processos renderizadores de imagens aquecidos antes do primeiro pedido
+    # (com o preload do Gunicorn, no post_fork de cada worker)
+    if os.environ.get('RENDERIZADORES_POST_FORK') != '1':
+        iniciar_renderizador()
+
+# Templates dos gauges de todas as faixas, prontos antes de criar os workers
+precarregar_templates_gauge(["Índice de Respostas", "Percentual de Acertos"])
+
 # Resto do código da aplicação...
 # [O código original continua aqui]
 
-# Layout da aplicação
-app.layout = html.Div([
-    # Cabeçalho
-    html.Div([
-        html.Div([
-            html.Img(src='/assets/logo.png', className='logo'),
-            html.H1("Dashboard Desafio PR", className='dashboard-title'),
-        ], className='header-left'),
+# Layout da aplicação, montado a partir do snapshot publicado (uma vez por
+# versão dos dados): cada carregamento da página acompanha as versões
+# publicadas por qualquer processo, como os callbacks
+_LAYOUT = {'versao': None, 'layout': None}
+
+def criar_layout():
+    """
+    Retorna o layout da página para a versão atual dos dados
+    """
+    snapshot_escolas = obter_snapshot()
+    if _LAYOUT['versao'] == snapshot_escolas['versao']:
+        return _LAYOUT['layout']
+
+    # Métricas por NRE derivadas do snapshot, já ordenadas por percentual de acertos
+    df_nre_metricas = dataframe_nres(snapshot_escolas)
+    indicadores_estado = calcular_indicadores(snapshot_escolas)
+    totais = agregar_selecao(snapshot_escolas, snapshot_escolas['nres'])
+    publicacao = data_publicacao()
+    ultima_atualizacao = publicacao.strftime("%d/%m/%Y %H:%M:%S") if publicacao else ''
+
+    layout = html.Div([
+        # Cabeçalho
         html.Div([
             html.Div([
-                html.Span("Semana Atual: ", className='week-label'),
-                html.Span(f"{estrutura_dados['semanas_atuais']}", className='current-week-highlight'),
-            ], className='week-indicator'),
+                html.Img(src='/assets/logo.png', className='logo'),
+                html.H1("Dashboard Desafio PR", className='dashboard-title'),
+            ], className='header-left'),
             html.Div([
-                html.Span("Última Atualização: ", className='update-label'),
-                html.Span(estrutura_dados['ultima_atualizacao'], className='update-date'),
-            ], className='update-indicator'),
-        ], className='header-right'),
-    ], className='header'),
-    
-    # Filtros
-    html.Div([
-        html.Div([
-            html.Label("Selecione o NRE:"),
-            dcc.Dropdown(
-                id='dropdown-nre',
-                options=[{'label': nre, 'value': nre} for nre in lista_nres],
-                placeholder="Todos os NREs",
-                className='filter-dropdown'
-            ),
-        ], className='filter-item'),
-        html.Div([
-            html.Label("Selecione a Escola:"),
-            dcc.Dropdown(
-                id='dropdown-escola',
-                placeholder="Selecione um NRE primeiro",
-                disabled=True,
-                className='filter-dropdown'
-            ),
-        ], className='filter-item'),
-        html.Button("Limpar Filtros", id='btn-limpar', className='btn-limpar'),
-    ], className='filters-container'),
+                html.Div([
+                    html.Span("Semana Atual: ", className='week-label'),
+                    html.Span(f"{snapshot_escolas['semanas_atuais']}", id='semana-atual', className='current-week-highlight'),
+                ], className='week-indicator'),
+                html.Div([
+                    html.Span("Última Atualização: ", className='update-label'),
+                    html.Span(ultima_atualizacao, className='update-date'),
+                ], className='update-indicator'),
+            ], className='header-right'),
+        ], className='header'),
     
-    # Métricas principais
-    html.Div([
+        # Filtros
         html.Div([
-            html.H3("Total de NREs", className='card-title'),
-            html.Div(estrutura_dados['total_nres'], className='card-value'),
-            html.Div([html.I(className="fas fa-building")], className='card-icon'),
-        ], className='metric-card'),
+            html.Div([
+                html.Label("Selecione o NRE:"),
+                dcc.Dropdown(
+                    id='dropdown-nre',
+                    options=[{'label': nre, 'value': nre} for nre in snapshot_escolas['nres']],
+                    placeholder="Todos os NREs",
+                    className='filter-dropdown'
+                ),
+            ], className='filter-item'),
+            html.Div([
+                html.Label("Selecione a Escola:"),
+                dcc.Dropdown(
+                    id='dropdown-escola',
+                    placeholder="Selecione um NRE primeiro",
+                    disabled=True,
+                    className='filter-dropdown'
+                ),
+            ], className='filter-item'),
+            html.Div([
+                html.Label("Buscar Escola:"),
+                dcc.Dropdown(
+                    id='busca-escola',
+                    placeholder="Digite o nome da escola",
+                    className='filter-dropdown'
+                ),
+            ], className='filter-item'),
+            html.Button("Limpar Filtros", id='btn-limpar', className='btn-limpar'),
+        ], className='filters-container'),
+    
+        # Métricas principais
         html.Div([
-            html.H3("Total de Escolas", className='card-title'),
-            html.Div(estrutura_dados['total_escolas'], className='card-value'),
-            html.Div([html.I(className="fas fa-school")], className='card-icon'),
-        ], className='metric-card'),
+            html.Div([
+                html.H3("Total de NREs", className='card-title'),
+                html.Div(len(snapshot_escolas['nres']), className='card-value'),
+                html.Div([html.I(className="fas fa-building")], className='card-icon'),
+            ], className='metric-card'),
+            html.Div([
+                html.H3("Total de Escolas", className='card-title'),
+                html.Div(totais['num_escolas'], className='card-value'),
+                html.Div([html.I(className="fas fa-school")], className='card-icon'),
+            ], className='metric-card'),
+            html.Div([
+                html.H3("Total de Alunos", className='card-title'),
+                html.Div(f"{int(totais['alunos']):,}".replace(',', '.'), className='card-value'),
+                html.Div([html.I(className="fas fa-user-graduate")], className='card-icon'),
+            ], className='metric-card'),
+            html.Div([
+                html.H3("Total de Professores", className='card-title'),
+                html.Div(f"{int(totais['professores']):,}".replace(',', '.'), className='card-value'),
+                html.Div([html.I(className="fas fa-chalkboard-teacher")], className='card-icon'),
+            ], className='metric-card'),
+        ], className='metrics-container'),
+    
+        # Gráficos de desempenho
         html.Div([
-            html.H3("Total de Alunos", className='card-title'),
-            html.Div(f"{estrutura_dados['total_alunos']:,}".replace(',', '.'), className='card-value'),
-            html.Div([html.I(className="fas fa-user-graduate")], className='card-icon'),
-        ], className='metric-card'),
+            html.Div([
+                html.H3("Índice de Respostas", className='card-title'),
+                dcc.Graph(
+                    id='gauge-respostas',
+                    figure=criar_gauge_melhorado(indicadores_estado['indice_respostas'], "Índice de Respostas", indicadores_estado['anterior_indice_respostas']),
+                    config={'displayModeBar': False},
+                    className='gauge-chart'
+                ),
+            ], className='performance-card'),
+            html.Div([
+                html.H3("Percentual de Acertos", className='card-title'),
+                dcc.Graph(
+                    id='gauge-acertos',
+                    figure=criar_gauge_melhorado(indicadores_estado['percentual_acertos'], "Percentual de Acertos", indicadores_estado['anterior_percentual_acertos']),
+                    config={'displayModeBar': False},
+                    className='gauge-chart'
+                ),
+            ], className='performance-card'),
+        ], className='performance-container'),
+    
+        # Gráficos comparativos
         html.Div([
-            html.H3("Total de Professores", className='card-title'),
-            html.Div(f"{estrutura_dados['total_professores']:,}".replace(',', '.'), className='card-value'),
-            html.Div([html.I(className="fas fa-chalkboard-teacher")], className='card-icon'),
-        ], className='metric-card'),
-    ], className='metrics-container'),
-    
-    # Gráficos de desempenho
-    html.Div([
+            html.H2("Comparativo entre NREs", className='section-title'),
+            html.Div([
+                html.Div([
+                    dcc.Graph(
+                        id='grafico-nres',
+                        figure=criar_grafico_nres_melhorado(df_nre_metricas, ordenado=True, variacao=variacao_nres(snapshot_escolas, df_nre_metricas)),
+                        config={'displayModeBar': True},
+                        className='graph'
+                    ),
+                ], className='graph-container'),
+                html.Div([
+                    dcc.Graph(
+                        id='grafico-alunos-nre',
+                        figure=criar_grafico_alunos_nre_melhorado(df_nre_metricas),
+                        config={'displayModeBar': True},
+                        className='graph'
+                    ),
+                ], className='graph-container'),
+            ], className='graphs-row'),
+        ], className='graphs-section'),
+    
+        # Distribuição das escolas por faixa de desempenho
         html.Div([
-            html.H3("Índice de Respostas", className='card-title'),
-            dcc.Graph(
-                id='gauge-respostas',
-                figure=criar_gauge_melhorado(estrutura_dados['indice_respostas_geral'], "Índice de Respostas"),
-                config={'displayModeBar': False},
-                className='gauge-chart'
-            ),
-        ], className='performance-card'),
+            html.H2("Distribuição das Escolas", className='section-title'),
+            html.Div([
+                dcc.Graph(
+                    id='grafico-distribuicao',
+                    figure=criar_grafico_distribuicao(
+                        snapshot_escolas['histograma_bordas'],
+                        histograma(snapshot_escolas, 'percentual_acertos'),
+                        histograma(snapshot_escolas, 'indice_respostas')
+                    ),
+                    config={'displayModeBar': True},
+                    className='graph'
+                ),
+            ], className='graph-container'),
+        ], className='graphs-section'),
+    
+        # Dispersão de todas as escolas do estado
         html.Div([
-            html.H3("Percentual de Acertos", className='card-title'),
-            dcc.Graph(
-                id='gauge-acertos',
-                figure=criar_gauge_melhorado(estrutura_dados['percentual_acertos_geral'], "Percentual de Acertos"),
-                config={'displayModeBar': False},
-                className='gauge-chart'
-            ),
-        ], className='performance-card'),
-    ], className='performance-container'),
+            html.H2("Escolas do Estado", className='section-title'),
+            html.P("Selecione uma região do gráfico para filtrar a tabela de escolas.", className='section-hint'),
+            html.Div([
+                dcc.Graph(
+                    id='grafico-dispersao-escolas',
+                    figure=criar_grafico_dispersao_escolas(snapshot_escolas),
+                    config={'displayModeBar': True},
+                    className='graph'
+                ),
+            ], className='graph-container'),
+        ], className='graphs-section'),
     
-    # Gráficos comparativos
-    html.Div([
-        html.H2("Comparativo entre NREs", className='section-title'),
+        # Hierarquia NRE -> Escola
         html.Div([
+            html.H2("Alunos por NRE e Escola", className='section-title'),
+            html.P("Clique em um NRE para ver as suas escolas.", className='section-hint'),
+            dcc.RadioItems(
+                id='radio-tipo-hierarquia',
+                options=[
+                    {'label': 'Sunburst', 'value': 'sunburst'},
+                    {'label': 'Treemap', 'value': 'treemap'}
+                ],
+                value='sunburst',
+                inline=True,
+                className='hierarquia-radio'
+            ),
             html.Div([
                 dcc.Graph(
-                    id='grafico-nres',
-                    figure=criar_grafico_nres_melhorado(df_nre_metricas),
+                    id='grafico-hierarquia',
+                    figure=criar_grafico_hierarquia_escolas(snapshot_escolas),
                     config={'displayModeBar': True},
                     className='graph'
                 ),
             ], className='graph-container'),
+        ], className='graphs-section'),
+    
+        # Comparação de vários NREs e escolas
+        html.Div([
+            html.H2("Comparar NREs e Escolas", className='section-title'),
+            html.Div([
+                html.Div([
+                    html.Label("NREs:"),
+                    dcc.Dropdown(
+                        id='comparar-nres',
+                        options=[{'label': nre, 'value': nre} for nre in snapshot_escolas['nres']],
+                        multi=True,
+                        placeholder="Selecione um ou mais NREs",
+                        className='filter-dropdown'
+                    ),
+                ], className='filter-item'),
+                html.Div([
+                    html.Label("Escolas:"),
+                    dcc.Dropdown(
+                        id='comparar-escolas',
+                        multi=True,
+                        placeholder="Digite o nome das escolas",
+                        className='filter-dropdown'
+                    ),
+                ], className='filter-item'),
+            ], className='filters-container'),
+            html.Div(id='comparacao-resumo', className='metrics-container'),
             html.Div([
                 dcc.Graph(
-                    id='grafico-alunos-nre',
-                    figure=criar_grafico_alunos_nre_melhorado(df_nre_metricas),
+                    id='grafico-comparacao',
+                    figure=criar_grafico_comparacao(pd.DataFrame(columns=['Item', 'Índice de Respostas', 'Percentual de acertos'])),
                     config={'displayModeBar': True},
                     className='graph'
                 ),
             ], className='graph-container'),
-        ], className='graphs-row'),
-    ], className='graphs-section'),
+        ], className='graphs-section'),
     
-    # Tabela de escolas
-    html.Div([
-        html.H2("Principais Escolas", className='section-title'),
-        html.Div(id='tabela-escolas', className='table-container'),
-    ], className='table-section'),
+        # Tabela de escolas
+        html.Div([
+            html.H2("Principais Escolas", className='section-title'),
+            html.Div(id='tabela-escolas', className='table-container'),
+            html.Div(id='lista-atencao', className='table-container'),
+        ], className='table-section'),
     
-    # Componentes de exportação
-    criar_componentes_exportacao(),
+        # Componentes de exportação
+        criar_componentes_exportacao(),
     
-    # Seção de atualização de dados
-    html.Div([
-        html.H2("Atualização de Dados", className='section-title'),
+        # Seção de atualização de dados
         html.Div([
-            dcc.Upload(
-                id='upload-data',
-                children=html.Div([
-                    'Arraste e solte ou ',
-                    html.A('selecione um arquivo Excel')
-                ]),
-                style={
-                    'width': '100%',
-                    'height': '60px',
-                    'lineHeight': '60px',
-                    'borderWidth': '1px',
-                    'borderStyle': 'dashed',
-                    'borderRadius': '5px',
-                    'textAlign': 'center',
-                    'margin': '10px 0'
-                },
-                multiple=False
-            ),
-            html.Div([
-                html.Label("Semana Atual:"),
-                dcc.Input(
-                    id='input-semana',
-                    type='number',
-                    value=estrutura_dados['semanas_atuais'],
-                    min=1,
-                    max=52,
-                    step=1,
-                    className='update-input'
-                ),
-            ], className='update-field'),
+            html.H2("Atualização de Dados", className='section-title'),
             html.Div([
-                html.Label("Questões por Semana:"),
-                dcc.Input(
-                    id='input-questoes',
-                    type='number',
-                    value=estrutura_dados['questoes_por_semana'],
-                    min=1,
-                    max=100,
-                    step=1,
-                    className='update-input'
+                dcc.Upload(
+                    id='upload-data',
+                    children=html.Div([
+                        'Arraste e solte ou ',
+                        html.A('selecione um arquivo Excel')
+                    ]),
+                    style={
+                        'width': '100%',
+                        'height': '60px',
+                        'lineHeight': '60px',
+                        'borderWidth': '1px',
+                        'borderStyle': 'dashed',
+                        'borderRadius': '5px',
+                        'textAlign': 'center',
+                        'margin': '10px 0'
+                    },
+                    multiple=False
                 ),
-            ], className='update-field'),
-            html.Button('Atualizar Dados', id='btn-atualizar', className='btn-update'),
-            html.Button('Recarregar Dashboard', id='btn-reload', className='btn-reload'),
-            html.Div(id='output-data-upload', className='update-output'),
-        ], className='update-container'),
+                html.Div([
+                    html.Label("Semana Atual:"),
+                    dcc.Input(
+                        id='input-semana',
+                        type='number',
+                        value=snapshot_escolas['semanas_atuais'],
+                        min=1,
+                        max=52,
+                        step=1,
+                        className='update-input'
+                    ),
+                ], className='update-field'),
+                html.Div([
+                    html.Label("Questões por Semana:"),
+                    dcc.Input(
+                        id='input-questoes',
+                        type='number',
+                        value=snapshot_escolas['questoes_por_semana'],
+                        min=1,
+                        max=100,
+                        step=1,
+                        className='update-input'
+                    ),
+                ], className='update-field'),
+                html.Button('Atualizar Dados', id='btn-atualizar', className='btn-update'),
+                html.Button('Recalcular Semana (sem planilha)', id='btn-recalcular', className='btn-update'),
+                html.Button('Recarregar Dashboard', id='btn-reload', className='btn-reload'),
+                html.Div(id='output-data-upload', className='update-output'),
+            ], className='update-container'),
         
-        # Histórico de atualizações
-        html.Div([
-            html.H3("Histórico de Atualizações", className='section-title'),
-            html.Div(id='historico-atualizacoes', className='historico-container'),
-        ], className='historico-section'),
-    ], className='update-section'),
-    
-    # Rodapé
-    html.Footer([
-        html.P("Dashboard Desafio PR © 2025 - Todos os direitos reservados"),
-        html.P("Versão 2.0 - Atualizado em Abril/2025"),
-    ], className='footer'),
-    
-    # Armazenamento de dados
-    dcc.Store(id='store-nre-selecionado'),
-    dcc.Store(id='store-escola-selecionada'),
-    dcc.Store(id='store-dados-upload'),
-    dcc.Location(id='url', refresh=False),
-], className='dashboard-container')
+            # Histórico de atualizações
+            html.Div([
+                html.H3("Histórico de Atualizações", className='section-title'),
+                html.Div(id='historico-atualizacoes', className='historico-container'),
+            ], className='historico-section'),
+        ], className='update-section'),
+    
+        # Rodapé
+        html.Footer([
+            html.P("Dashboard Desafio PR © 2025 - Todos os direitos reservados"),
+            html.P("Versão 2.0 - Atualizado em Abril/2025"),
+        ], className='footer'),
+    
+        # Armazenamento de dados
+        dcc.Store(id='store-nre-selecionado'),
+        dcc.Store(id='store-escola-selecionada'),
+        dcc.Store(id='store-dados-upload'),
+        dcc.Store(id='store-versao-dados', data=snapshot_escolas['versao']),
+        dcc.Location(id='url', refresh=False),
+    ], className='dashboard-container')
+
+    _LAYOUT.update(versao=snapshot_escolas['versao'], layout=layout)
+    return layout
+
+app.layout = criar_layout
 
 # Callbacks da aplicação
 @app.callback(
@@ -329,62 +530,242 @@ app.layout = html.Div([
 )
 def atualizar_dropdown_escolas(nre_selecionado):
     if nre_selecionado:
-        escolas = escolas_por_nre.get(nre_selecionado, [])
-        return [{'label': escola, 'value': escola} for escola in escolas], False
+        snapshot_escolas = obter_snapshot()
+        if nre_selecionado not in snapshot_escolas['nres']:
+            return [], True
+        escolas = snapshot_escolas['escola'][indices_filtro(snapshot_escolas, nre_selecionado)]
+        return [{'label': str(escola), 'value': str(escola)} for escola in escolas], False
     return [], True
 
 @app.callback(
     [Output('dropdown-nre', 'value'),
      Output('dropdown-escola', 'value'),
-     Output('store-nre-selecionado', 'data'),
-     Output('store-escola-selecionada', 'data')],
+     Output('busca-escola', 'value')],
     [Input('btn-limpar', 'n_clicks')],
-    [State('dropdown-nre', 'value'),
-     State('dropdown-escola', 'value')]
+    prevent_initial_call=True
 )
-def limpar_filtros(n_clicks, nre_atual, escola_atual):
-    if n_clicks:
-        return None, None, None, None
-    return nre_atual, escola_atual, nre_atual, escola_atual
+def limpar_filtros(n_clicks):
+    return None, None, None
+
+@app.callback(
+    [Output('store-nre-selecionado', 'data'),
+     Output('store-escola-selecionada', 'data')],
+    [Input('dropdown-nre', 'value'),
+     Input('dropdown-escola', 'value')]
+)
+def sincronizar_filtros(nre_selecionado, escola_selecionada):
+    return nre_selecionado, escola_selecionada
+
+def opcoes_escolas(snapshot_escolas, indices):
+    """
+    Cria as opções de um dropdown de escolas; o valor é a chave estável
+    "NRE<tab>Escola", que continua válida após uma nova versão dos dados
+    """
+    nres = snapshot_escolas['nres']
+    return [
+        {'label': f"{snapshot_escolas['escola'][i]} ({nres[snapshot_escolas['nre_codigo'][i]]})", 'value': str(chave)}
+        for i, chave in zip(indices, chaves_escolas(snapshot_escolas, indices))
+    ]
+
+@app.callback(
+    Output('busca-escola', 'options'),
+    [Input('busca-escola', 'search_value')],
+    [State('busca-escola', 'value'),
+     State('busca-escola', 'options')]
+)
+def buscar_escola(termo, valor_atual, opcoes_atuais):
+    snapshot_escolas = obter_snapshot()
+    # A busca é feita no servidor; só os resultados vão para o navegador
+    if not termo:
+        raise PreventUpdate
+    
+    opcoes = opcoes_escolas(snapshot_escolas, buscar_escolas(snapshot_escolas, termo))
+    
+    # Manter a opção já selecionada para o valor não ser descartado
+    if valor_atual is not None and all(opcao['value'] != valor_atual for opcao in opcoes):
+        opcoes += [opcao for opcao in (opcoes_atuais or []) if opcao['value'] == valor_atual]
+    return opcoes
+
+@app.callback(
+    [Output('dropdown-nre', 'value', allow_duplicate=True),
+     Output('dropdown-escola', 'options', allow_duplicate=True),
+     Output('dropdown-escola', 'disabled', allow_duplicate=True),
+     Output('dropdown-escola', 'value', allow_duplicate=True)],
+    [Input('busca-escola', 'value')],
+    prevent_initial_call=True
+)
+def selecionar_escola_busca(chave):
+    snapshot_escolas = obter_snapshot()
+    # A escola pode ter deixado de existir em uma nova versão dos dados
+    if chave is None or len(indices_por_chaves(snapshot_escolas, [chave])) == 0:
+        raise PreventUpdate
+    
+    nre, _, escola = chave.partition(SEPARADOR_CHAVE)
+    opcoes, desabilitado = atualizar_dropdown_escolas(nre)
+    return nre, opcoes, desabilitado, escola
+
+def criar_tabela_para_filtro(nre_selecionado, escola_selecionada):
+    # As escolas vêm das ordens pré-calculadas no snapshot (top-k em O(k))
+    snapshot_escolas = obter_snapshot()
+    return tabela_escolas_filtro(snapshot_escolas, nre_do_filtro(snapshot_escolas, nre_selecionado), escola_selecionada)
 
 @app.callback(
     [Output('gauge-respostas', 'figure'),
      Output('gauge-acertos', 'figure'),
      Output('grafico-nres', 'figure'),
      Output('grafico-alunos-nre', 'figure'),
-     Output('tabela-escolas', 'children')],
+     Output('tabela-escolas', 'children'),
+     Output('lista-atencao', 'children')],
     [Input('store-nre-selecionado', 'data'),
      Input('store-escola-selecionada', 'data'),
-     Input('btn-reload', 'n_clicks')]
+     Input('btn-reload', 'n_clicks'),
+     Input('store-versao-dados', 'data')]
 )
-def atualizar_dashboard(nre_selecionado, escola_selecionada, n_clicks):
-    # Filtrar dados com base nas seleções
-    if nre_selecionado:
-        df_nre_filtrado = df_nre_metricas[df_nre_metricas['NRE'] == nre_selecionado]
-        df_escolas_filtrado = df_escolas_metricas[df_escolas_metricas['NRE'] == nre_selecionado]
-        
-        if escola_selecionada:
-            df_escolas_filtrado = df_escolas_filtrado[df_escolas_filtrado['Escola'] == escola_selecionada]
-            
-        # Calcular métricas filtradas
-        indice_respostas = df_escolas_filtrado['Questões Respondidas'].sum() / df_escolas_filtrado['Atribuição Esperada'].sum()
-        percentual_acertos = df_escolas_filtrado['Questões Corretas'].sum() / df_escolas_filtrado['Questões Respondidas'].sum()
+def atualizar_dashboard(nre_selecionado, escola_selecionada, n_clicks, versao_dados=None):
+    snapshot_escolas = obter_snapshot()
+    nre_selecionado = nre_do_filtro(snapshot_escolas, nre_selecionado)
+    
+    # Calcular os indicadores com o motor de agregação do snapshot
+    indicadores = calcular_indicadores(snapshot_escolas, nre_selecionado, escola_selecionada)
+    
+    # Criar gráficos atualizados (gauges são enviados como atualização parcial)
+    fig_gauge_respostas = criar_patch_gauge(
+        indicadores['indice_respostas'], "Índice de Respostas", indicadores['anterior_indice_respostas'])
+    fig_gauge_acertos = criar_patch_gauge(
+        indicadores['percentual_acertos'], "Percentual de Acertos", indicadores['anterior_percentual_acertos'])
+    
+    # Gráficos, tabela de escolas e lista de atenção do Estado e de cada NRE
+    # são pré-calculados na ingestão; com escola selecionada, montar na hora
+    saidas = None if escola_selecionada else obter_saidas_precalculadas(snapshot_escolas, nre_selecionado)
+    if saidas is None:
+        saidas = construir_saidas_filtro(snapshot_escolas, nre_selecionado, escola_selecionada)
+    
+    return (fig_gauge_respostas, fig_gauge_acertos, saidas['grafico_nres'], saidas['grafico_alunos'],
+            saidas['tabela_escolas'], saidas['lista_atencao'])
+
+@app.callback(
+    Output('comparar-escolas', 'options'),
+    [Input('comparar-escolas', 'search_value')],
+    [State('comparar-escolas', 'value'),
+     State('comparar-escolas', 'options')]
+)
+def buscar_escolas_comparacao(termo, valores_atuais, opcoes_atuais):
+    snapshot_escolas = obter_snapshot()
+    if not termo:
+        raise PreventUpdate
+    
+    # Manter as escolas já selecionadas entre as opções
+    selecionadas = set(valores_atuais or [])
+    opcoes = [opcao for opcao in (opcoes_atuais or []) if opcao['value'] in selecionadas]
+    opcoes += [opcao for opcao in opcoes_escolas(snapshot_escolas, buscar_escolas(snapshot_escolas, termo))
+               if opcao['value'] not in selecionadas]
+    return opcoes
+
+@app.callback(
+    [Output('comparacao-resumo', 'children'),
+     Output('grafico-comparacao', 'figure')],
+    [Input('comparar-nres', 'value'),
+     Input('comparar-escolas', 'value')]
+)
+def atualizar_comparacao(nres, escolas):
+    snapshot_escolas = obter_snapshot()
+    nres = [nre for nre in (nres or []) if nre in snapshot_escolas['nres']]
+    # Chaves estáveis das escolas, resolvidas no snapshot atual
+    escolas = indices_por_chaves(snapshot_escolas, escolas or [])
+    
+    # Indicadores de cada item (NREs em um único cálculo vetorizado)
+    por_nre = agregar_por_nre(snapshot_escolas, nres)
+    itens = list(nres) + [str(snapshot_escolas['escola'][i]) for i in escolas]
+    indices = np.concatenate((por_nre['indice_respostas'], snapshot_escolas['indice_respostas'][escolas]))
+    acertos = np.concatenate((por_nre['percentual_acertos'], snapshot_escolas['percentual_acertos'][escolas]))
+    
+    # Seleção combinada
+    selecao = agregar_selecao(snapshot_escolas, nres, escolas)
+    if len(itens) > 1:
+        itens.append('Seleção combinada')
+        indices = np.append(indices, selecao['indice_respostas'])
+        acertos = np.append(acertos, selecao['percentual_acertos'])
+    
+    df_comparacao = pd.DataFrame({
+        'Item': itens,
+        'Índice de Respostas': indices,
+        'Percentual de acertos': acertos
+    })
+    
+    def cartao(titulo, valor):
+        return html.Div([
+            html.H3(titulo, className='card-title'),
+            html.Div(valor, className='card-value'),
+        ], className='metric-card')
+    
+    if itens:
+        resumo = [
+            cartao("Escolas", f"{selecao['num_escolas']:,}".replace(',', '.')),
+            cartao("Alunos", f"{int(selecao['alunos']):,}".replace(',', '.')),
+            cartao("Índice de Respostas", f"{selecao['indice_respostas']:.1%}" if pd.notna(selecao['indice_respostas']) else "-"),
+            cartao("Percentual de Acertos", f"{selecao['percentual_acertos']:.1%}" if pd.notna(selecao['percentual_acertos']) else "-"),
+        ]
     else:
-        df_nre_filtrado = df_nre_metricas
-        df_escolas_filtrado = df_escolas_metricas
-        indice_respostas = estrutura_dados['indice_respostas_geral']
-        percentual_acertos = estrutura_dados['percentual_acertos_geral']
+        resumo = html.P("Selecione NREs e/ou escolas para comparar.", className='section-hint')
     
-    # Criar gráficos atualizados
-    fig_gauge_respostas = criar_gauge_melhorado(indice_respostas, "Índice de Respostas")
-    fig_gauge_acertos = criar_gauge_melhorado(percentual_acertos, "Percentual de Acertos")
-    fig_nres = criar_grafico_nres_melhorado(df_nre_filtrado)
-    fig_alunos = criar_grafico_alunos_nre_melhorado(df_nre_filtrado)
+    return resumo, criar_grafico_comparacao(df_comparacao)
+
+@app.callback(
+    Output('grafico-distribuicao', 'figure'),
+    [Input('store-nre-selecionado', 'data'),
+     Input('store-versao-dados', 'data')],
+    prevent_initial_call=True
+)
+def atualizar_distribuicao(nre_selecionado, versao_dados):
+    snapshot_escolas = obter_snapshot()
+    nre_selecionado = nre_do_filtro(snapshot_escolas, nre_selecionado)
     
-    # Criar tabela de escolas
-    tabela_escolas = criar_tabela_escolas_melhorada(df_escolas_filtrado)
+    # Histogramas pré-calculados na ingestão: só as contagens vão ao navegador
+    return criar_patch_distribuicao(
+        histograma(snapshot_escolas, 'percentual_acertos', nre_selecionado),
+        histograma(snapshot_escolas, 'indice_respostas', nre_selecionado),
+        nre_selecionado or 'Estado'
+    )
+
+@app.callback(
+    Output('grafico-hierarquia', 'figure'),
+    [Input('radio-tipo-hierarquia', 'value')],
+    prevent_initial_call=True
+)
+def alternar_tipo_hierarquia(tipo):
+    snapshot_escolas = obter_snapshot()
+    return criar_grafico_hierarquia_escolas(snapshot_escolas, tipo)
+
+@app.callback(
+    Output('tabela-escolas', 'children', allow_duplicate=True),
+    [Input('grafico-dispersao-escolas', 'selectedData')],
+    [State('store-nre-selecionado', 'data'),
+     State('store-escola-selecionada', 'data')],
+    prevent_initial_call=True
+)
+def filtrar_tabela_por_selecao(selecao, nre_selecionado, escola_selecionada):
+    snapshot_escolas = obter_snapshot()
+    # Sem seleção: voltar à tabela correspondente aos filtros atuais
+    if not selecao or not selecao.get('points'):
+        return criar_tabela_para_filtro(nre_selecionado, escola_selecionada)
+    
+    # Os pontos carregam em customdata a chave estável da escola, resolvida
+    # no snapshot atual (escolas que não existem mais são ignoradas)
+    indices = indices_por_chaves(snapshot_escolas, [ponto['customdata'] for ponto in selecao['points'] if 'customdata' in ponto])
+    
+    # Mostrar as 20 escolas selecionadas mais bem posicionadas no estado
+    indices = indices[np.argsort(snapshot_escolas['posicao_estado'][indices], kind='stable')[:20]]
     
-    return fig_gauge_respostas, fig_gauge_acertos, fig_nres, fig_alunos, tabela_escolas
+    return criar_tabela_escolas_melhorada(dataframe_escolas(snapshot_escolas, indices), ordenado=True)
+
+def mensagem_servidor_ocupado():
+    """
+    Mensagem exibida quando o pool de tarefas pesadas está cheio
+    """
+    return html.Div([
+        html.H4("Servidor ocupado", className="update-error-title"),
+        html.P("O servidor está ocupado com outras operações pesadas. Tente novamente em instantes.", className="update-error-text")
+    ])
 
 @app.callback(
     [Output('store-dados-upload', 'data'),
@@ -401,18 +782,50 @@ def processar_atualizacao(n_clicks, dados_upload, semana_atual, questoes_por_sem
     try:
         # Processar a atualização com os dados do upload
         arquivo_temp = dados_upload['arquivo_temp']
-        resultado = atualizar_dados_dashboard(arquivo_temp, semana_atual, questoes_por_semana)
+        resultado = executar_tarefa('atualizacao', atualizar_dados_dashboard, arquivo_temp, semana_atual, questoes_por_semana)
         
         return None, html.Div([
             html.H4("Resultado da Atualização", className="update-result-title"),
             html.Pre(resultado, className="update-result-text")
         ])
+    except ServidorOcupado:
+        return dados_upload, mensagem_servidor_ocupado()
     except Exception as e:
         return dados_upload, html.Div([
             html.H4("Erro na Atualização", className="update-error-title"),
             html.Pre(str(e), className="update-error-text")
         ])
 
+@app.callback(
+    [Output('store-versao-dados', 'data'),
+     Output('semana-atual', 'children'),
+     Output('output-data-upload', 'children', allow_duplicate=True)],
+    [Input('btn-recalcular', 'n_clicks')],
+    [State('input-semana', 'value'),
+     State('input-questoes', 'value')],
+    prevent_initial_call=True
+)
+def recalcular_semana(n_clicks, semana_atual, questoes_por_semana):
+    if not semana_atual or not questoes_por_semana:
+        raise PreventUpdate
+    
+    # Reescala a atribuição esperada do snapshot atual, sem planilha
+    try:
+        resultado = executar_tarefa('atualizacao', recalcular_semanas, int(semana_atual), int(questoes_por_semana))
+    except ServidorOcupado:
+        return dash.no_update, dash.no_update, mensagem_servidor_ocupado()
+    except Exception as e:
+        return dash.no_update, dash.no_update, html.Div([
+            html.H4("Erro no Recálculo", className="update-error-title"),
+            html.Pre(str(e), className="update-error-text")
+        ])
+    snapshot_escolas = obter_snapshot()
+    
+    return snapshot_escolas['versao'], f"{snapshot_escolas['semanas_atuais']}", html.Div([
+        html.H4("Resultado do Recálculo", className="update-result-title"),
+        html.Pre(resultado, className="update-result-text")
+    ])
+
 @app.callback(
     Output('historico-atualizacoes', 'children'),
     [Input('btn-reload', 'n_clicks')]
@@ -442,17 +855,14 @@ def atualizar_historico(n_clicks):
     except Exception as e:
         return html.P(f"Erro ao carregar histórico: {str(e)}", className="historico-erro")
 
-@app.callback(
-    Output('store-dados-upload', 'data', allow_duplicate=True),
-    [Input('upload-data', 'contents')],
-    [State('upload-data', 'filename'),
-     State('upload-data', 'last_modified')],
-    prevent_initial_call=True
-)
-def armazenar_upload(contents, filename, date):
-    if contents is None:
-        return None
+def salvar_upload(contents):
+    """
+    Decodifica e salva a planilha enviada e verifica o formato (executado no
+    pool de tarefas pesadas)
     
+    Returns:
+        str: Caminho do arquivo salvo, ou None se o formato for inválido
+    """
     content_type, content_string = contents.split(',')
     decoded = base64.b64decode(content_string)
     
@@ -465,17 +875,38 @@ def armazenar_upload(contents, filename, date):
     formato_valido, mensagem = verificar_formato_planilha(arquivo_temp)
     
     if formato_valido:
-        return {
-            'arquivo_temp': arquivo_temp,
-            'filename': filename,
-            'date': date
-        }
-    else:
-        # Se o formato for inválido, excluir o arquivo temporário
-        if os.path.exists(arquivo_temp):
-            os.remove(arquivo_temp)
-        
-        return None
+        return arquivo_temp
+    
+    # Se o formato for inválido, excluir o arquivo temporário
+    if os.path.exists(arquivo_temp):
+        os.remove(arquivo_temp)
+    return None
+
+@app.callback(
+    [Output('store-dados-upload', 'data', allow_duplicate=True),
+     Output('output-data-upload', 'children', allow_duplicate=True)],
+    [Input('upload-data', 'contents')],
+    [State('upload-data', 'filename'),
+     State('upload-data', 'last_modified')],
+    prevent_initial_call=True
+)
+def armazenar_upload(contents, filename, date):
+    if contents is None:
+        return None, dash.no_update
+    
+    try:
+        arquivo_temp = executar_tarefa('upload', salvar_upload, contents)
+    except ServidorOcupado:
+        return None, mensagem_servidor_ocupado()
+    
+    if arquivo_temp is None:
+        return None, dash.no_update
+    
+    return {
+        'arquivo_temp': arquivo_temp,
+        'filename': filename,
+        'date': date
+    }, dash.no_update
 
 # Registrar callbacks de exportação
 registrar_callbacks_exportacao(app)
@@ -0,0 +1,237 @@
+import pandas as pd
+import os
+import shutil
+import threading
+from snapshot_dados import dataframe_origem, dataframe_nres
+from visoes_dashboard import indices_filtro
+from escrita_excel import escrever_excel_streaming
+from exportacao_arrow import arrow_disponivel, tabela_arrow, escrever_tabela_arrow
+
+# Diretório dos artefatos de exportação (um subdiretório por versão dos dados)
+DIRETORIO_ARTEFATOS = 'dados_processados/exportacoes'
+
+# Artefatos padrão, gerados na ingestão de cada nova versão dos dados
+ARTEFATOS_PADRAO = (
+    'nres_metricas.csv',
+    'nres_metricas.xlsx',
+    'escolas_metricas.csv',
+    'escolas_metricas.xlsx',
+    'dados_completos.xlsx',
+)
+if arrow_disponivel():
+    ARTEFATOS_PADRAO += (
+        'nres_metricas.parquet',
+        'escolas_metricas.parquet',
+        'escolas_metricas.feather',
+    )
+
+# Tabela de professores (gerada na extração das planilhas, quando disponível)
+ARQUIVO_PROFESSORES = 'dados_processados/professores_metricas.csv'
+
+# Número de linhas lido/escrito por vez nas exportações
+LINHAS_POR_PARTE = 1000
+
+# Artefatos em construção neste processo (caminho -> threading.Event), para
+# que pedidos simultâneos do mesmo arquivo esperem uma única construção
+_EM_CONSTRUCAO = {}
+_TRAVA = threading.Lock()
+
+def _reiniciar_no_filho():
+    """
+    Descarta, no processo filho de um fork, as construções em andamento no
+    pai (as threads que as fariam não existem no filho)
+    """
+    global _TRAVA
+    _EM_CONSTRUCAO.clear()
+    _TRAVA = threading.Lock()
+
+os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+def partes_tabela(snapshot, nome, nre=None, escola=None):
+    """
+    Retorna as linhas de uma tabela exportável para o filtro, montadas dos
+    arrays da versão do snapshot (mesmas colunas de nre_metricas.csv e
+    escolas_metricas.csv), em DataFrames de até LINHAS_POR_PARTE linhas (o
+    primeiro sempre é gerado, para que o cabeçalho seja escrito mesmo sem
+    linhas)
+
+    Args:
+        snapshot: Snapshot das escolas
+        nome: 'nres_metricas' ou 'escolas_metricas'
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+
+    Yields:
+        DataFrame: Parte da tabela
+    """
+    if nome == 'nres_metricas':
+        df_nre = dataframe_nres(snapshot).sort_values(by='NRE')
+        if nre:
+            df_nre = df_nre[df_nre['NRE'] == nre]
+        yield df_nre.reset_index(drop=True)
+        return
+    if nome != 'escolas_metricas':
+        raise ValueError(f"Tabela de exportação desconhecida: {nome}")
+
+    # Com filtro, só as linhas do NRE (faixa dos offsets) ou da escola
+    indices = indices_filtro(snapshot, nre, escola)
+    for inicio in range(0, max(len(indices), 1), LINHAS_POR_PARTE):
+        yield dataframe_origem(snapshot, indices[inicio:inicio + LINHAS_POR_PARTE])
+
+def partes_professores(snapshot, nre=None, escola=None):
+    """
+    Retorna a tabela de professores para o filtro, lida do CSV em partes de
+    LINHAS_POR_PARTE linhas
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+
+    Yields:
+        DataFrame: Parte da tabela de professores
+    """
+    escolas = set(snapshot['escola'][indices_filtro(snapshot, nre, escola)]) if (nre or escola) else None
+    for df in pd.read_csv(ARQUIVO_PROFESSORES, chunksize=LINHAS_POR_PARTE):
+        if escolas is not None:
+            df = df[df['Escola'].isin(escolas)]
+        yield df
+
+def abas_exportacao(snapshot, nome_arquivo, nre=None, escola=None):
+    """
+    Retorna as abas de uma exportação em Excel, no formato aceito por
+    escrever_excel_streaming
+
+    'dados_completos' reúne NREs, escolas e professores (quando a tabela de
+    professores existir); as demais exportações têm uma única aba.
+
+    Args:
+        snapshot: Snapshot das escolas
+        nome_arquivo: Nome do arquivo exportado (ex.: 'escolas_metricas.xlsx')
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+
+    Returns:
+        list: Pares (nome da aba, partes)
+    """
+    nome = os.path.splitext(nome_arquivo)[0]
+    if nome != 'dados_completos':
+        return [('Dados', partes_tabela(snapshot, nome, nre, escola))]
+
+    abas = [
+        ('NREs', partes_tabela(snapshot, 'nres_metricas', nre, escola)),
+        ('Escolas', partes_tabela(snapshot, 'escolas_metricas', nre, escola)),
+    ]
+    if os.path.exists(ARQUIVO_PROFESSORES):
+        abas.append(('Professores', partes_professores(snapshot, nre, escola)))
+    return abas
+
+def escrever_artefato(snapshot, nome_arquivo, caminho):
+    """
+    Escreve um artefato de exportação em CSV (com BOM, para o Excel), XLSX,
+    Feather ou Parquet, conforme a extensão. O arquivo é escrito ao lado e
+    renomeado no final, para que nunca seja lido pela metade.
+
+    Args:
+        snapshot: Snapshot das escolas
+        nome_arquivo: Nome do artefato (ex.: 'nres_metricas.xlsx')
+        caminho: Caminho final do arquivo
+    """
+    diretorio, nome = os.path.split(caminho)
+    temporario = os.path.join(diretorio, f".{os.getpid()}-{threading.get_ident()}-{nome}")
+    try:
+        base, extensao = os.path.splitext(nome_arquivo)
+        if extensao == '.csv':
+            with open(temporario, 'w', encoding='utf-8-sig', newline='') as f:
+                for i, df in enumerate(partes_tabela(snapshot, base)):
+                    df.to_csv(f, index=False, header=i == 0)
+        elif extensao in ('.feather', '.parquet'):
+            escrever_tabela_arrow(tabela_arrow(snapshot, base), temporario, extensao[1:])
+        else:
+            escrever_excel_streaming(temporario, abas_exportacao(snapshot, nome_arquivo))
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+
+def obter_artefato(snapshot, nome_arquivo, diretorio=DIRETORIO_ARTEFATOS):
+    """
+    Retorna o caminho do artefato de exportação da versão atual dos dados,
+    construindo-o se ainda não existir
+
+    Se o artefato já estiver sendo construído por outra thread, espera essa
+    construção em vez de repeti-la (e falha junto com ela).
+
+    Args:
+        snapshot: Snapshot das escolas
+        nome_arquivo: Nome do artefato (ex.: 'escolas_metricas.csv')
+        diretorio: Diretório dos artefatos (padrão: DIRETORIO_ARTEFATOS)
+
+    Returns:
+        str: Caminho do arquivo em disco
+    """
+    caminho = os.path.join(diretorio, snapshot['versao'], nome_arquivo)
+    if os.path.exists(caminho):
+        return caminho
+
+    with _TRAVA:
+        if os.path.exists(caminho):
+            return caminho
+        evento = _EM_CONSTRUCAO.get(caminho)
+        construir = evento is None
+        if construir:
+            evento = _EM_CONSTRUCAO[caminho] = threading.Event()
+
+    if not construir:
+        evento.wait()
+        if not os.path.exists(caminho):
+            raise RuntimeError(f"Falha ao gerar o artefato de exportação {nome_arquivo}")
+        return caminho
+
+    try:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        escrever_artefato(snapshot, nome_arquivo, caminho)
+    finally:
+        with _TRAVA:
+            del _EM_CONSTRUCAO[caminho]
+        evento.set()
+
+    return caminho
+
+def remover_artefatos_antigos(versao_atual, diretorio=DIRETORIO_ARTEFATOS):
+    """
+    Remove os artefatos de versões anteriores dos dados
+
+    Args:
+        versao_atual: Versão cujos artefatos devem ser mantidos
+        diretorio: Diretório dos artefatos (padrão: DIRETORIO_ARTEFATOS)
+    """
+    if not os.path.isdir(diretorio):
+        return
+    for versao in os.listdir(diretorio):
+        if versao != versao_atual:
+            shutil.rmtree(os.path.join(diretorio, versao), ignore_errors=True)
+
+def preparar_artefatos(snapshot, diretorio=DIRETORIO_ARTEFATOS):
+    """
+    Constrói em segundo plano os artefatos padrão da versão dos dados e
+    remove os das versões anteriores
+
+    Args:
+        snapshot: Snapshot recém-publicado
+        diretorio: Diretório dos artefatos (padrão: DIRETORIO_ARTEFATOS)
+
+    Returns:
+        threading.Thread: Thread da construção
+    """
+    def construir():
+        for nome_arquivo in ARTEFATOS_PADRAO:
+            try:
+                obter_artefato(snapshot, nome_arquivo, diretorio)
+            except Exception as e:
+                print(f"Erro ao gerar o artefato de exportação {nome_arquivo}: {e}")
+        remover_artefatos_antigos(snapshot['versao'], diretorio)
+
+    thread = threading.Thread(target=construir, name='artefatos-exportacao', daemon=True)
+    thread.start()
+    return thread
@@ -35,6 +35,22 @@ def atualizar_dados_dashboard(arquivo_excel, semanas_atuais=8, questoes_por_sema
     funcoes = criar_funcoes_atualizacao()
     return funcoes['atualizar_dados_dashboard'](arquivo_excel, semanas_atuais, questoes_por_semana)
 
+def recalcular_semanas(semanas_atuais, questoes_por_semana):
+    """
+    Recalcula a Atribuição Esperada dos dados atuais para um novo número de
+    semanas/questões, sem precisar de uma nova planilha
+    
+    Args:
+        semanas_atuais: Novo número de semanas
+        questoes_por_semana: Novo número de questões por semana
+        
+    Returns:
+        str: Mensagem com o resultado do recálculo
+    """
+    # Obter as funções de atualização
+    funcoes = criar_funcoes_atualizacao()
+    return funcoes['recalcular_semanas'](semanas_atuais, questoes_por_semana)
+
 def obter_historico_atualizacoes(limite=5):
     """
     Obtém o histórico de atualizações
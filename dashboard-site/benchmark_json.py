@@ -0,0 +1,107 @@
+import sys
+import time
+from snapshot_dados import obter_snapshot, histograma
+from visoes_dashboard import construir_figuras, construir_saidas_filtro
+from melhorias_graficos import (
+    criar_patch_gauge,
+    criar_grafico_dispersao_escolas,
+    criar_grafico_hierarquia_escolas,
+    criar_grafico_distribuicao
+)
+from visoes_precalculadas import obter_saidas_precalculadas
+from serializacao_json import orjson, para_json, instalar_serializacao_callbacks
+
+# Repetições de cada medição (vale o menor tempo)
+REPETICOES = 20
+
+# Benchmark da serialização JSON das respostas do dashboard
+#
+# Mede, para cada visão, o tamanho da resposta e o tempo de serialização com
+# o json da biblioteca padrão (codificador do Plotly) e com orjson, quando
+# instalado. Usa o snapshot publicado (execute o app uma vez antes).
+#
+# Uso: python benchmark_json.py [NRE ...]
+
+def medir(valor, motor):
+    """
+    Retorna o menor tempo (ms) de serialização do valor e o tamanho (bytes),
+    ou (None, None) se o motor não serializar o valor (fragmentos de JSON
+    pré-calculado só são aceitos pelo orjson)
+    """
+    melhor = float('inf')
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        try:
+            conteudo = para_json(valor, motor)
+        except TypeError:
+            return None, None
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000, len(conteudo.encode('utf-8'))
+
+def formatar_tempo(tempo):
+    """
+    Formata um tempo da tabela ('-' quando não medido)
+    """
+    return f"{tempo:>12.3f}" if tempo is not None else f"{'-':>12}"
+
+def visoes_dashboard(snapshot, nres):
+    """
+    Retorna as respostas de cada visão do dashboard, como os callbacks as
+    devolvem (nome -> objeto serializado pelo Dash)
+    """
+    visoes = {}
+    for nre in [None] + nres:
+        nome = nre or 'Estado'
+        figuras = construir_figuras(snapshot, nre)
+        saidas = construir_saidas_filtro(snapshot, nre)
+        visoes[f"{nome}: gauges (patch)"] = [criar_patch_gauge(0.5, "Índice de Respostas"), criar_patch_gauge(0.5, "Percentual de Acertos")]
+        visoes[f"{nome}: gauges (figura)"] = [figuras['gauge_respostas'], figuras['gauge_acertos']]
+        visoes[f"{nome}: barras NREs"] = saidas['grafico_nres']
+        visoes[f"{nome}: pizza alunos"] = saidas['grafico_alunos']
+        visoes[f"{nome}: tabela e atenção"] = [saidas['tabela_escolas'], saidas['lista_atencao']]
+        precalculadas = obter_saidas_precalculadas(snapshot, nre)
+        if precalculadas is not None:
+            visoes[f"{nome}: pré-calculadas"] = precalculadas
+
+    visoes['Distribuição'] = criar_grafico_distribuicao(
+        snapshot['histograma_bordas'], histograma(snapshot, 'percentual_acertos'), histograma(snapshot, 'indice_respostas'))
+    visoes['Dispersão (todas as escolas)'] = criar_grafico_dispersao_escolas(snapshot)
+    visoes['Sunburst'] = criar_grafico_hierarquia_escolas(snapshot, 'sunburst')
+    visoes['Treemap'] = criar_grafico_hierarquia_escolas(snapshot, 'treemap')
+    return visoes
+
+def executar_benchmark(nres=None):
+    """
+    Executa o benchmark e imprime uma tabela por visão
+
+    Args:
+        nres: NREs a medir além do Estado (padrão: o primeiro NRE)
+    """
+    snapshot = obter_snapshot()
+    if snapshot is None:
+        print("Snapshot não encontrado: execute o app uma vez para gerá-lo.")
+        return
+
+    # As visões pré-calculadas são medidas como o app as devolve
+    instalar_serializacao_callbacks()
+    nres = nres or snapshot['nres'][:1]
+    motores = ['json'] + (['orjson'] if orjson is not None else [])
+    if orjson is None:
+        print("orjson não instalado: medindo apenas o json da biblioteca padrão.")
+
+    print(f"{'Visão':<40} {'Bytes':>10} " + ' '.join(f"{motor + ' (ms)':>12}" for motor in motores)
+          + (f" {'Ganho':>8}" if len(motores) > 1 else ''))
+    totais = [0.0] * len(motores)
+    for nome, valor in visoes_dashboard(snapshot, nres).items():
+        medidas = [medir(valor, motor) for motor in motores]
+        for i, (tempo, _) in enumerate(medidas):
+            totais[i] += tempo or 0
+        tamanho = next(tamanho for _, tamanho in medidas if tamanho is not None)
+        linha = f"{nome:<40} {tamanho:>10,} " + ' '.join(formatar_tempo(tempo) for tempo, _ in medidas)
+        if len(motores) > 1 and medidas[0][0] is not None:
+            linha += f" {medidas[0][0] / medidas[1][0]:>7.1f}x"
+        print(linha)
+    print(f"{'Total':<40} {'':>10} " + ' '.join(f"{total:>12.3f}" for total in totais))
+
+if __name__ == '__main__':
+    executar_benchmark(sys.argv[1:])
@@ -0,0 +1,117 @@
+import numpy as np
+import unicodedata
+
+def normalizar_texto(texto):
+    """
+    Normaliza um texto para busca: remove acentos, converte para minúsculas e
+    reduz espaços repetidos
+
+    Args:
+        texto: Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+def extrair_trigramas(texto):
+    """
+    Retorna o conjunto de trigramas (sequências de 3 caracteres) de um texto
+    já normalizado
+    """
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def construir_indice_busca(nomes):
+    """
+    Constrói o índice de busca das escolas: nomes normalizados ordenados (para
+    busca por prefixo) e listas invertidas de trigramas (para busca por
+    trecho), no formato CSR para poderem ser salvas como arrays
+
+    Args:
+        nomes: Array com os nomes das escolas, na ordem do snapshot
+
+    Returns:
+        dict: Arrays 'busca_*' do índice
+    """
+    normalizados = np.array([normalizar_texto(nome) for nome in nomes], dtype=str)
+    ordem = np.argsort(normalizados, kind='stable').astype(np.int64)
+
+    # Listas invertidas: trigrama -> escolas que o contêm
+    postagens = {}
+    for i, nome in enumerate(normalizados):
+        for trigrama in extrair_trigramas(nome):
+            postagens.setdefault(trigrama, []).append(i)
+
+    trigramas = sorted(postagens)
+    tamanhos = [len(postagens[t]) for t in trigramas]
+
+    return {
+        'busca_nomes': normalizados,
+        'busca_ordem': ordem,
+        'busca_nomes_ordenados': normalizados[ordem],
+        'busca_trigramas': np.array(trigramas, dtype=str),
+        'busca_trigramas_offsets': np.concatenate(([0], np.cumsum(tamanhos))).astype(np.int64),
+        'busca_trigramas_escolas': np.array([i for t in trigramas for i in postagens[t]], dtype=np.int64),
+    }
+
+def _postagens(snapshot, trigrama):
+    """
+    Retorna os índices das escolas que contêm o trigrama (array vazio se
+    nenhuma contiver)
+    """
+    trigramas = snapshot['busca_trigramas']
+    posicao = np.searchsorted(trigramas, trigrama)
+    if posicao >= len(trigramas) or trigramas[posicao] != trigrama:
+        return np.array([], dtype=np.int64)
+    offsets = snapshot['busca_trigramas_offsets']
+    return snapshot['busca_trigramas_escolas'][offsets[posicao]:offsets[posicao + 1]]
+
+def buscar_escolas(snapshot, termo, limite=10):
+    """
+    Busca escolas pelo nome, ignorando acentos e maiúsculas
+
+    Termos com menos de 3 caracteres são buscados como prefixo do nome; os
+    demais pelo índice de trigramas, confirmando o trecho nos candidatos.
+    Resultados que começam com o termo aparecem primeiro.
+
+    Args:
+        snapshot: Snapshot das escolas com o índice de busca
+        termo: Texto digitado pelo usuário
+        limite: Número máximo de resultados (padrão: 10)
+
+    Returns:
+        list: Índices das escolas encontradas, na ordem de relevância
+    """
+    consulta = normalizar_texto(termo)
+    if not consulta:
+        return []
+
+    nomes = snapshot['busca_nomes']
+
+    if len(consulta) < 3:
+        # Busca por prefixo na lista de nomes ordenada
+        ordenados = snapshot['busca_nomes_ordenados']
+        inicio = np.searchsorted(ordenados, consulta, side='left')
+        fim = np.searchsorted(ordenados, consulta + '\uffff', side='left')
+        return snapshot['busca_ordem'][inicio:min(fim, inicio + limite)].tolist()
+
+    # Interseção das listas de trigramas, começando pela menor
+    listas = sorted((_postagens(snapshot, t) for t in extrair_trigramas(consulta)), key=len)
+    candidatos = listas[0]
+    for lista in listas[1:]:
+        if len(candidatos) == 0:
+            break
+        candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+
+    # Confirmar o trecho (os trigramas podem aparecer fora de ordem) e ordenar
+    # por posição do trecho no nome e depois pelo nome
+    encontrados = []
+    for i in candidatos:
+        posicao = nomes[i].find(consulta)
+        if posicao >= 0:
+            encontrados.append((posicao, nomes[i], int(i)))
+    encontrados.sort()
+
+    return [i for _, _, i in encontrados[:limite]]
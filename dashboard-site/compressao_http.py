@@ -0,0 +1,249 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from flask import Response, request, abort
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    # brotli está no requirements.txt, mas continua opcional: sem ele, as
+    # respostas são comprimidas só com gzip
+    brotli = None
+
+# Tamanho mínimo (bytes) de uma resposta dinâmica para valer a pena comprimir
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+# Tipos de conteúdo comprimidos (imagens e planilhas já são comprimidas)
+TIPOS_COMPRIMIVEIS = (
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'text/plain',
+    'image/svg+xml',
+)
+
+# Cache-Control dos arquivos estáticos (assets): sempre revalidar pelo ETag
+# forte. Os nomes dos assets não mudam entre versões do site, então um
+# max-age manteria arquivos antigos nos navegadores depois de um deploy.
+CACHE_ESTATICOS = 'no-cache'
+
+# Cache-Control das páginas HTML: sempre revalidar (resposta 304 se não mudou)
+CACHE_PAGINAS = 'no-cache'
+
+# Trecho do caminho dos bundles JavaScript/CSS dos componentes do Dash
+ROTA_COMPONENTES = '/_dash-component-suites/'
+
+# Arquivos estáticos já comprimidos (caminho -> versão do arquivo e conteúdos)
+_CACHE_ESTATICOS = {}
+
+# Bundles dos componentes já comprimidos ((caminho, ETag, codificação) ->
+# conteúdo comprimido)
+_CACHE_COMPONENTES = {}
+_TRAVA = threading.Lock()
+
+def codificacao_aceita():
+    """
+    Retorna a melhor codificação aceita pelo cliente ('br', 'gzip') ou None
+    """
+    aceitas = request.accept_encodings
+    if brotli is not None and aceitas['br']:
+        return 'br'
+    if aceitas['gzip']:
+        return 'gzip'
+    return None
+
+def comprimir(dados, codificacao):
+    """
+    Comprime o conteúdo com a codificação indicada
+
+    Args:
+        dados: Conteúdo (bytes)
+        codificacao: 'br' ou 'gzip'
+
+    Returns:
+        bytes: Conteúdo comprimido
+    """
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=5)
+    return gzip.compress(dados, compresslevel=6)
+
+def comprimivel(mimetype):
+    """
+    Indica se o tipo de conteúdo vale a pena ser comprimido
+    """
+    return mimetype in TIPOS_COMPRIMIVEIS
+
+def obter_estatico(caminho):
+    """
+    Retorna o arquivo estático com o ETag e as versões comprimidas,
+    lendo-o e comprimindo-o só quando o arquivo muda
+
+    Args:
+        caminho: Caminho do arquivo
+
+    Returns:
+        dict: conteúdo original ('identity'), comprimidos ('gzip', 'br'),
+        'etag' e 'mimetype'; ou None se o arquivo não existir
+    """
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    versao = (estado.st_mtime_ns, estado.st_size)
+
+    entrada = _CACHE_ESTATICOS.get(caminho)
+    if entrada is not None and entrada['versao'] == versao:
+        return entrada
+
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    mimetype = mimetypes.guess_type(caminho)[0] or 'application/octet-stream'
+    entrada = {
+        'versao': versao,
+        'mimetype': mimetype,
+        'etag': hashlib.sha1(dados).hexdigest()[:16],
+        'identity': dados,
+    }
+    if comprimivel(mimetype) and len(dados) >= TAMANHO_MINIMO_COMPRESSAO:
+        entrada['gzip'] = comprimir(dados, 'gzip')
+        if brotli is not None:
+            entrada['br'] = comprimir(dados, 'br')
+
+    with _TRAVA:
+        _CACHE_ESTATICOS[caminho] = entrada
+    return entrada
+
+def precomprimir_estaticos(*diretorios):
+    """
+    Lê e comprime de antemão os arquivos estáticos (chamado na
+    inicialização, para que o primeiro visitante não pague a compressão)
+
+    Args:
+        diretorios: Arquivos ou diretórios a percorrer
+    """
+    for diretorio in diretorios:
+        if os.path.isfile(diretorio):
+            obter_estatico(diretorio)
+            continue
+        for raiz, _, arquivos in os.walk(diretorio):
+            for nome in arquivos:
+                obter_estatico(os.path.join(raiz, nome))
+
+def servir_estatico(diretorio, caminho, cache_control=CACHE_ESTATICOS):
+    """
+    Serve um arquivo estático na versão pré-comprimida aceita pelo cliente,
+    com ETag forte e Cache-Control; responde 304 se o cliente já tiver a
+    mesma versão
+
+    Args:
+        diretorio: Diretório base
+        caminho: Caminho do arquivo dentro do diretório
+        cache_control: Valor do cabeçalho Cache-Control
+
+    Returns:
+        flask.Response
+    """
+    arquivo = safe_join(diretorio, caminho)
+    entrada = obter_estatico(arquivo) if arquivo is not None else None
+    if entrada is None:
+        abort(404)
+
+    codificacao = codificacao_aceita()
+    if codificacao not in entrada:
+        codificacao = 'identity'
+
+    # Cada codificação é uma representação diferente: ETag próprio
+    etag = entrada['etag'] if codificacao == 'identity' else f"{entrada['etag']}-{codificacao}"
+    resposta = Response(entrada[codificacao], mimetype=entrada['mimetype'])
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = cache_control
+    resposta.vary.add('Accept-Encoding')
+    if codificacao != 'identity':
+        resposta.headers['Content-Encoding'] = codificacao
+    return resposta.make_conditional(request)
+
+def comprimir_componente(resposta):
+    """
+    Comprime um bundle dos componentes do Dash uma única vez por versão
+
+    O conteúdo de um bundle é identificado pelo caminho, que traz a versão
+    do pacote (fingerprint), ou pelo ETag que o próprio Dash envia quando o
+    caminho não tem versão; o ETag do Dash é mantido, já que é ele quem
+    responde 304.
+
+    Args:
+        resposta: flask.Response do Dash com o bundle
+
+    Returns:
+        flask.Response
+    """
+    resposta.vary.add('Accept-Encoding')
+    codificacao = codificacao_aceita()
+    if codificacao is None:
+        return resposta
+
+    chave = (request.path, resposta.get_etag()[0], codificacao)
+    comprimido = _CACHE_COMPONENTES.get(chave)
+    if comprimido is None:
+        dados = resposta.get_data()
+        if len(dados) < TAMANHO_MINIMO_COMPRESSAO:
+            return resposta
+        comprimido = comprimir(dados, codificacao)
+        with _TRAVA:
+            _CACHE_COMPONENTES[chave] = comprimido
+
+    resposta.set_data(comprimido)
+    resposta.headers['Content-Encoding'] = codificacao
+    return resposta
+
+def comprimir_resposta(resposta):
+    """
+    Comprime respostas dinâmicas (callbacks do Dash, layout, APIs) acima de
+    TAMANHO_MINIMO_COMPRESSAO, e responde 304 a GETs cujo conteúdo o cliente
+    já tem (pelo ETag). Registrado com after_request.
+
+    Downloads em streaming e arquivos servidos do disco passam sem
+    alteração; os bundles dos componentes do Dash são comprimidos uma vez
+    só (ver comprimir_componente).
+
+    Args:
+        resposta: flask.Response
+
+    Returns:
+        flask.Response
+    """
+    if resposta.direct_passthrough or resposta.is_streamed or resposta.status_code != 200 \
+            or 'Content-Encoding' in resposta.headers or not comprimivel(resposta.mimetype):
+        return resposta
+    if ROTA_COMPONENTES in request.path:
+        return comprimir_componente(resposta)
+
+    dados = resposta.get_data()
+    codificacao = codificacao_aceita() if len(dados) >= TAMANHO_MINIMO_COMPRESSAO else None
+    resposta.vary.add('Accept-Encoding')
+
+    if request.method == 'GET' and 'ETag' not in resposta.headers:
+        etag = hashlib.sha1(dados).hexdigest()[:16]
+        resposta.set_etag(etag if codificacao is None else f"{etag}-{codificacao}")
+        resposta.make_conditional(request)
+        if resposta.status_code == 304:
+            return resposta
+
+    if codificacao is not None:
+        resposta.set_data(comprimir(dados, codificacao))
+        resposta.headers['Content-Encoding'] = codificacao
+    return resposta
+
+def registrar_compressao(server):
+    """
+    Ativa a compressão das respostas dinâmicas em um servidor Flask
+
+    Args:
+        server: Servidor Flask
+    """
+    server.after_request(comprimir_resposta)
@@ -0,0 +1,38 @@
+import pandas as pd
+from openpyxl import Workbook
+
+def linhas_dataframe(df):
+    """
+    Percorre as linhas de um DataFrame como tuplas prontas para o openpyxl
+    (valores ausentes viram células vazias)
+
+    Args:
+        df: DataFrame
+
+    Yields:
+        tuple: Valores da linha
+    """
+    valores = df.astype(object).where(pd.notna(df), None)
+    yield from valores.itertuples(index=False, name=None)
+
+def escrever_excel_streaming(destino, abas):
+    """
+    Escreve uma planilha Excel em modo somente-escrita do openpyxl: as linhas
+    vão para o arquivo à medida que são adicionadas, sem manter as células em
+    memória, então o consumo de memória não cresce com o número de linhas
+
+    Args:
+        destino: Caminho ou objeto de arquivo binário
+        abas: Iterável de (nome da aba, partes), onde partes é um iterável de
+            DataFrames com as mesmas colunas; o cabeçalho da aba é escrito a
+            partir do primeiro
+    """
+    workbook = Workbook(write_only=True)
+    for nome_aba, partes in abas:
+        worksheet = workbook.create_sheet(title=nome_aba)
+        for i, df in enumerate(partes):
+            if i == 0:
+                worksheet.append(list(df.columns))
+            for linha in linhas_dataframe(df):
+                worksheet.append(linha)
+    workbook.save(destino)
@@ -0,0 +1,123 @@
+import os
+import threading
+import numpy as np
+from snapshot_dados import COLUNAS_NUMERICAS, COLUNAS_CONTAGEM, COLUNAS_RANKING, dataframe_nres
+from visoes_dashboard import indices_escola
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    # pyarrow é opcional: sem ele, as exportações Arrow/Parquet ficam indisponíveis
+    pa = None
+
+# Tabela Arrow completa das escolas por versão dos dados
+_CACHE_TABELAS = {}
+_TRAVA = threading.Lock()
+
+def _reiniciar_no_filho():
+    """
+    Recria, no processo filho de um fork, a trava herdada do pai
+    """
+    global _TRAVA
+    _TRAVA = threading.Lock()
+
+os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+def arrow_disponivel():
+    """
+    Indica se o pyarrow está instalado
+    """
+    return pa is not None
+
+def tabela_escolas_arrow(snapshot):
+    """
+    Monta a tabela Arrow de todas as escolas diretamente dos arrays do
+    snapshot (uma vez por versão dos dados)
+
+    As colunas numéricas completas são usadas sem cópia; o NRE vira uma
+    coluna de dicionário (categórica no pandas) a partir dos códigos.
+
+    Args:
+        snapshot: Snapshot das escolas
+
+    Returns:
+        pyarrow.Table com as mesmas colunas de dataframe_escolas
+    """
+    versao = snapshot['versao']
+    tabela = _CACHE_TABELAS.get(versao)
+    if tabela is None:
+        colunas = {
+            'NRE': pa.DictionaryArray.from_arrays(snapshot['nre_codigo'].astype(np.int32), pa.array(snapshot['nres'])),
+            'Escola': pa.array(snapshot['escola'], type=pa.string()),
+        }
+        for nome, coluna in COLUNAS_NUMERICAS.items():
+            valores = snapshot[nome]
+            if nome in COLUNAS_CONTAGEM and not np.isnan(valores).any():
+                valores = valores.astype(np.int64)
+            colunas[coluna] = pa.array(valores, from_pandas=True)
+        for nome, coluna in COLUNAS_RANKING.items():
+            if nome in snapshot:
+                colunas[coluna] = pa.array(snapshot[nome], from_pandas=True)
+        if 'anterior_percentual_acertos' in snapshot:
+            colunas['Variação de acertos'] = pa.array(
+                snapshot['percentual_acertos'] - snapshot['anterior_percentual_acertos'], from_pandas=True)
+
+        tabela = pa.table(colunas)
+
+        # Outra thread pode estar trocando o cache para outra versão: o
+        # resultado desta chamada é a própria tabela, não a entrada do cache
+        with _TRAVA:
+            _CACHE_TABELAS.clear()
+            _CACHE_TABELAS[versao] = tabela
+    return tabela
+
+def tabela_arrow(snapshot, nome, nre=None, escola=None):
+    """
+    Retorna a tabela Arrow de uma exportação para o filtro
+
+    O filtro por NRE é uma fatia da tabela completa (sem cópia, pois as
+    escolas estão agrupadas por NRE no snapshot).
+
+    Args:
+        snapshot: Snapshot das escolas
+        nome: 'nres_metricas' ou 'escolas_metricas'
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+
+    Returns:
+        pyarrow.Table
+    """
+    if nome == 'nres_metricas':
+        df_nre = dataframe_nres(snapshot).sort_values(by='NRE')
+        if nre:
+            df_nre = df_nre[df_nre['NRE'] == nre]
+        return pa.Table.from_pandas(df_nre, preserve_index=False)
+    if nome != 'escolas_metricas':
+        raise ValueError(f"Tabela de exportação desconhecida: {nome}")
+
+    tabela = tabela_escolas_arrow(snapshot)
+    if escola:
+        return tabela.take(pa.array(indices_escola(snapshot, nre, escola)))
+    if nre:
+        codigo = snapshot['nres'].index(nre)
+        inicio, fim = snapshot['offsets'][codigo], snapshot['offsets'][codigo + 1]
+        return tabela.slice(inicio, fim - inicio)
+    return tabela
+
+def escrever_tabela_arrow(tabela, destino, formato):
+    """
+    Escreve uma tabela Arrow em Feather (Arrow IPC) ou Parquet
+
+    Args:
+        tabela: pyarrow.Table
+        destino: Caminho ou objeto de arquivo binário
+        formato: 'feather' ou 'parquet'
+    """
+    if formato == 'feather':
+        feather.write_feather(tabela, destino, compression='zstd')
+    elif formato == 'parquet':
+        pq.write_table(tabela, destino, compression='zstd')
+    else:
+        raise ValueError(f"Formato Arrow desconhecido: {formato}")
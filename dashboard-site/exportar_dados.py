@@ -4,11 +4,81 @@ import plotly.graph_objects as go
 import dash
 from dash import dcc, html, Input, Output, State, callback
 import dash_bootstrap_components as dbc
-import base64
+from flask import Response, request, stream_with_context, abort
+from urllib.parse import urlencode
 import io
 import json
+import hashlib
+import tempfile
+import threading
+import zipfile
 import os
 from datetime import datetime
+from collections import OrderedDict
+from snapshot_dados import obter_snapshot
+from artefatos_exportacao import obter_artefato, partes_tabela, abas_exportacao
+from escrita_excel import escrever_excel_streaming
+from exportacao_arrow import arrow_disponivel, tabela_arrow, escrever_tabela_arrow
+from renderizador_imagens import renderizar_imagem, renderizar_imagens
+from tarefas_pesadas import executar_tarefa
+from relatorios_nre import ARQUIVO_RELATORIOS, iniciar_geracao_relatorios, ler_progresso
+from visoes_dashboard import construir_figuras
+
+# Tamanho das partes enviadas nas exportações em streaming (bytes)
+TAMANHO_PARTE = 64 * 1024
+
+# Tabelas exportáveis (nome do arquivo sem extensão)
+TABELAS_EXPORTACAO = ('nres_metricas', 'escolas_metricas')
+
+# Planilha com NREs, escolas e professores em abas separadas
+PLANILHA_COMPLETA = 'dados_completos.xlsx'
+
+# Zip com todas as exportações e um manifesto
+PACOTE_COMPLETO = 'exportacao_completa.zip'
+
+# Gráficos exportáveis: nome do arquivo (sem extensão) -> figura de construir_figuras
+GRAFICOS_EXPORTACAO = {
+    'grafico_nres': 'grafico_nres',
+    'grafico_alunos': 'grafico_alunos',
+}
+
+# PDFs do dashboard já gerados, por (versão dos dados, NRE, escola)
+_CACHE_PDF = OrderedDict()
+_TRAVA_PDF = threading.Lock()
+TAMANHO_CACHE_PDF = 16
+
+# Tipos MIME por extensão (o Flask acrescenta charset=utf-8 aos tipos text/*)
+TIPOS_MIME = {
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.csv': 'text/csv',
+    '.png': 'image/png',
+    '.pdf': 'application/pdf',
+    '.zip': 'application/zip',
+    '.feather': 'application/vnd.apache.arrow.file',
+    '.parquet': 'application/vnd.apache.parquet',
+}
+
+# Formatos de tabela e extensões correspondentes (Arrow/Parquet só com pyarrow)
+EXTENSOES_TABELA = ('.csv', '.xlsx', '.feather', '.parquet') if arrow_disponivel() else ('.csv', '.xlsx')
+
+# Botões de exportação cujo link acompanha os filtros (id -> arquivo)
+LINKS_EXPORTACAO = {
+    'btn-export-nre-excel': 'nres_metricas.xlsx',
+    'btn-export-nre-csv': 'nres_metricas.csv',
+    'btn-export-escolas-excel': 'escolas_metricas.xlsx',
+    'btn-export-escolas-csv': 'escolas_metricas.csv',
+    'btn-export-completo-excel': 'dados_completos.xlsx',
+    'btn-export-pacote': 'exportacao_completa.zip',
+    'btn-export-grafico-nre': 'grafico_nres.png',
+    'btn-export-grafico-alunos': 'grafico_alunos.png',
+    'btn-export-dashboard-pdf': 'dashboard_completo.pdf',
+}
+if arrow_disponivel():
+    LINKS_EXPORTACAO.update({
+        'btn-export-nre-parquet': 'nres_metricas.parquet',
+        'btn-export-escolas-parquet': 'escolas_metricas.parquet',
+        'btn-export-escolas-feather': 'escolas_metricas.feather',
+    })
 
 def criar_funcao_exportacao():
     """
@@ -31,14 +101,8 @@ def criar_funcao_exportacao():
         # Criar um buffer em memória
         output = io.BytesIO()
         
-        # Criar um writer do Excel
-        writer = pd.ExcelWriter(output, engine='openpyxl')
-        
-        # Escrever o DataFrame no Excel
-        df.to_excel(writer, index=False, sheet_name='Dados')
-        
-        # Salvar o arquivo
-        writer.close()
+        # Escrever o DataFrame no Excel, linha a linha (modo somente-escrita)
+        escrever_excel_streaming(output, [('Dados', [df])])
         
         # Retornar o conteúdo do buffer
         output.seek(0)
@@ -65,32 +129,42 @@ def criar_funcao_exportacao():
         output.seek(0)
         return output.getvalue().encode('utf-8-sig')
     
-    def gerar_link_download(conteudo, nome_arquivo):
+    def ler_em_partes(arquivo):
         """
-        Gera um link de download para um conteúdo
+        Lê um arquivo em partes de TAMANHO_PARTE bytes, para envio em streaming
         
         Args:
-            conteudo: Conteúdo do arquivo em bytes
-            nome_arquivo: Nome do arquivo
+            arquivo: Caminho ou objeto de arquivo binário (fechado ao final)
             
-        Returns:
-            str: Link de download em formato data URL
+        Yields:
+            bytes: Partes do arquivo
         """
-        # Codificar o conteúdo em base64
-        b64 = base64.b64encode(conteudo).decode()
-        
-        # Determinar o tipo MIME com base na extensão do arquivo
-        if nome_arquivo.endswith('.xlsx'):
-            mime = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        elif nome_arquivo.endswith('.csv'):
-            mime = 'text/csv'
-        else:
-            mime = 'application/octet-stream'
-        
-        # Criar o link de download
-        href = f'data:{mime};base64,{b64}'
+        if isinstance(arquivo, str):
+            arquivo = open(arquivo, 'rb')
+        try:
+            while True:
+                parte = arquivo.read(TAMANHO_PARTE)
+                if not parte:
+                    break
+                yield parte
+        finally:
+            arquivo.close()
+    
+    def gerar_csv_em_partes(partes):
+        """
+        Gera um CSV (com BOM, para o Excel) a partir de uma sequência de
+        DataFrames, sem montar o arquivo inteiro em memória
         
-        return href
+        Args:
+            partes: Iterável de DataFrames com as mesmas colunas; o cabeçalho
+                é escrito a partir do primeiro
+            
+        Yields:
+            bytes: Partes do CSV
+        """
+        yield '\ufeff'.encode('utf-8')
+        for i, df in enumerate(partes):
+            yield df.to_csv(index=False, header=i == 0).encode('utf-8')
     
     def exportar_grafico_para_imagem(fig, formato='png'):
         """
@@ -103,8 +177,8 @@ def criar_funcao_exportacao():
         Returns:
             bytes: Conteúdo da imagem em bytes
         """
-        # Exportar a figura para o formato especificado
-        img_bytes = fig.to_image(format=formato, scale=2)
+        # Renderizar nos processos renderizadores (com cache por figura)
+        img_bytes = renderizar_imagem(fig, formato, escala=2)
         
         return img_bytes
     
@@ -124,7 +198,6 @@ def criar_funcao_exportacao():
             from reportlab.platypus import SimpleDocTemplate, Image, Spacer, Paragraph
             from reportlab.lib.styles import getSampleStyleSheet
             from reportlab.lib.units import inch
-            import tempfile
             
             # Criar um buffer em memória para o PDF
             buffer = io.BytesIO()
@@ -140,20 +213,11 @@ def criar_funcao_exportacao():
             elements.append(Paragraph(f"Dashboard Desafio PR - Exportado em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", styles['Title']))
             elements.append(Spacer(1, 0.25*inch))
             
-            # Adicionar cada figura como uma imagem
-            for i, fig in enumerate(figs):
-                # Salvar a figura temporariamente
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                    tmp_filename = tmp.name
-                    fig.write_image(tmp_filename, scale=2)
-                
-                # Adicionar a imagem ao PDF
-                img = Image(tmp_filename, width=7*inch, height=5*inch)
+            # Renderizar as figuras em paralelo, direto para a memória
+            for png in renderizar_imagens(figs, 'png', escala=2):
+                img = Image(io.BytesIO(png), width=7*inch, height=5*inch)
                 elements.append(img)
                 elements.append(Spacer(1, 0.25*inch))
-                
-                # Remover o arquivo temporário
-                os.unlink(tmp_filename)
             
             # Construir o PDF
             doc.build(elements)
@@ -170,7 +234,8 @@ def criar_funcao_exportacao():
     return {
         'exportar_para_excel': exportar_para_excel,
         'exportar_para_csv': exportar_para_csv,
-        'gerar_link_download': gerar_link_download,
+        'ler_em_partes': ler_em_partes,
+        'gerar_csv_em_partes': gerar_csv_em_partes,
         'exportar_grafico_para_imagem': exportar_grafico_para_imagem,
         'exportar_dashboard_para_pdf': exportar_dashboard_para_pdf
     }
@@ -179,248 +244,353 @@ def criar_componentes_exportacao():
     """
     Cria componentes Dash para exportação de dados
     
+    Os botões são links para as rotas de exportação (/exportar/...), que
+    enviam o arquivo em streaming; nada passa pela resposta dos callbacks.
+    
     Returns:
         html.Div: Componente Dash com os botões de exportação
     """
+    def botao(texto, id_botao, nome_arquivo):
+        return dbc.Button(
+            texto,
+            id=id_botao,
+            href=f"/exportar/{nome_arquivo}",
+            download=nome_arquivo,
+            external_link=True,
+            color="primary",
+            className="export-button"
+        )
+    
     componente = html.Div([
         html.H3("Exportar Dados", className="section-title"),
         html.Div([
             html.Div([
                 html.H5("Exportar Tabelas", className="export-subtitle"),
                 html.Div([
-                    dbc.Button("Exportar NREs (Excel)", id="btn-export-nre-excel", color="primary", className="export-button"),
-                    dbc.Button("Exportar NREs (CSV)", id="btn-export-nre-csv", color="primary", className="export-button"),
+                    botao("Exportar NREs (Excel)", "btn-export-nre-excel", "nres_metricas.xlsx"),
+                    botao("Exportar NREs (CSV)", "btn-export-nre-csv", "nres_metricas.csv"),
                 ], className="export-button-group"),
                 html.Div([
-                    dbc.Button("Exportar Escolas (Excel)", id="btn-export-escolas-excel", color="primary", className="export-button"),
-                    dbc.Button("Exportar Escolas (CSV)", id="btn-export-escolas-csv", color="primary", className="export-button"),
+                    botao("Exportar Escolas (Excel)", "btn-export-escolas-excel", "escolas_metricas.xlsx"),
+                    botao("Exportar Escolas (CSV)", "btn-export-escolas-csv", "escolas_metricas.csv"),
                 ], className="export-button-group"),
-                # Links de download (inicialmente vazios)
                 html.Div([
-                    html.A(id="download-nre-excel", download="nres_metricas.xlsx"),
-                    html.A(id="download-nre-csv", download="nres_metricas.csv"),
-                    html.A(id="download-escolas-excel", download="escolas_metricas.xlsx"),
-                    html.A(id="download-escolas-csv", download="escolas_metricas.csv"),
-                ], style={"display": "none"}),
+                    botao("Exportar NREs (Parquet)", "btn-export-nre-parquet", "nres_metricas.parquet"),
+                    botao("Exportar Escolas (Parquet)", "btn-export-escolas-parquet", "escolas_metricas.parquet"),
+                    botao("Exportar Escolas (Feather)", "btn-export-escolas-feather", "escolas_metricas.feather"),
+                ], className="export-button-group") if arrow_disponivel() else None,
+                html.Div([
+                    botao("Exportar NREs, Escolas e Professores (Excel)", "btn-export-completo-excel", "dados_completos.xlsx"),
+                    botao("Exportar Tudo (ZIP)", "btn-export-pacote", "exportacao_completa.zip"),
+                ], className="export-button-group"),
             ], className="export-section"),
             
             html.Div([
                 html.H5("Exportar Gráficos", className="export-subtitle"),
                 html.Div([
-                    dbc.Button("Exportar Gráfico NREs (PNG)", id="btn-export-grafico-nre", color="primary", className="export-button"),
-                    dbc.Button("Exportar Gráfico Alunos (PNG)", id="btn-export-grafico-alunos", color="primary", className="export-button"),
+                    botao("Exportar Gráfico NREs (PNG)", "btn-export-grafico-nre", "grafico_nres.png"),
+                    botao("Exportar Gráfico Alunos (PNG)", "btn-export-grafico-alunos", "grafico_alunos.png"),
                 ], className="export-button-group"),
                 html.Div([
-                    dbc.Button("Exportar Dashboard Completo (PDF)", id="btn-export-dashboard-pdf", color="primary", className="export-button"),
+                    botao("Exportar Dashboard Completo (PDF)", "btn-export-dashboard-pdf", "dashboard_completo.pdf"),
                 ], className="export-button-group"),
-                # Links de download para gráficos (inicialmente vazios)
+            ], className="export-section"),
+            
+            html.Div([
+                html.H5("Relatórios por NRE", className="export-subtitle"),
                 html.Div([
-                    html.A(id="download-grafico-nre", download="grafico_nres.png"),
-                    html.A(id="download-grafico-alunos", download="grafico_alunos.png"),
-                    html.A(id="download-dashboard-pdf", download="dashboard_completo.pdf"),
-                ], style={"display": "none"}),
+                    dbc.Button("Gerar Relatórios por NRE (PDF + Excel)", id="btn-gerar-relatorios",
+                               color="primary", className="export-button"),
+                    botao("Baixar Relatórios (ZIP)", "btn-baixar-relatorios", "relatorios_nre.zip"),
+                ], className="export-button-group"),
+                dbc.Progress(id="progresso-relatorios", value=0, label="", className="export-progress"),
+                html.Div(id="status-relatorios", className="section-hint"),
+                dcc.Interval(id="intervalo-relatorios", interval=1000, disabled=True),
             ], className="export-section"),
         ], className="export-container"),
-        
-        # Feedback de exportação
-        dbc.Alert(
-            "Exportação concluída com sucesso!",
-            id="alert-export",
-            color="success",
-            dismissable=True,
-            is_open=False,
-            duration=4000,
-        ),
     ], className="export-section-container")
     
     return componente
 
-def registrar_callbacks_exportacao(app):
+def conteudo_tabela(funcoes_exportacao, snapshot, nome_arquivo, nre=None, escola=None):
     """
-    Registra os callbacks para os botões de exportação
+    Retorna o conteúdo de uma exportação de tabela, em partes
+    
+    Sem filtro, vem do artefato da versão atual dos dados (gerado uma vez e
+    lido do disco); com filtro, o CSV é gerado a partir do snapshot à medida
+    que é enviado e os demais formatos são escritos num arquivo temporário.
     
     Args:
-        app: Aplicação Dash
+        funcoes_exportacao: Funções criadas por criar_funcao_exportacao
+        snapshot: Snapshot das escolas
+        nome_arquivo: Nome do arquivo exportado (ex.: 'escolas_metricas.csv')
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+        
+    Returns:
+        tuple: (iterável de bytes, tamanho em bytes ou None se desconhecido)
     """
-    # Obter as funções de exportação
-    funcoes_exportacao = criar_funcao_exportacao()
+    if not (nre or escola):
+        caminho = obter_artefato(snapshot, nome_arquivo)
+        return funcoes_exportacao['ler_em_partes'](caminho), os.path.getsize(caminho)
     
-    # Callback para exportar NREs para Excel
-    @app.callback(
-        [Output("download-nre-excel", "href"),
-         Output("download-nre-excel", "children")],
-        [Input("btn-export-nre-excel", "n_clicks")],
-        prevent_initial_call=True
-    )
-    def exportar_nre_excel(n_clicks):
-        if n_clicks:
-            # Carregar dados
-            df_nre_metricas = pd.read_csv('dados_processados/nre_metricas.csv')
-            
-            # Exportar para Excel
-            excel_bytes = funcoes_exportacao['exportar_para_excel'](df_nre_metricas, "nres_metricas.xlsx")
-            
-            # Gerar link de download
-            href = funcoes_exportacao['gerar_link_download'](excel_bytes, "nres_metricas.xlsx")
-            
-            # Simular clique no link de download
-            return href, html.Script("document.getElementById('download-nre-excel').click();")
-        
-        return "", ""
+    if nome_arquivo.endswith('.csv'):
+        partes = partes_tabela(snapshot, os.path.splitext(nome_arquivo)[0], nre, escola)
+        return funcoes_exportacao['gerar_csv_em_partes'](partes), None
     
-    # Callback para exportar NREs para CSV
-    @app.callback(
-        [Output("download-nre-csv", "href"),
-         Output("download-nre-csv", "children")],
-        [Input("btn-export-nre-csv", "n_clicks")],
-        prevent_initial_call=True
-    )
-    def exportar_nre_csv(n_clicks):
-        if n_clicks:
-            # Carregar dados
-            df_nre_metricas = pd.read_csv('dados_processados/nre_metricas.csv')
-            
-            # Exportar para CSV
-            csv_bytes = funcoes_exportacao['exportar_para_csv'](df_nre_metricas, "nres_metricas.csv")
-            
-            # Gerar link de download
-            href = funcoes_exportacao['gerar_link_download'](csv_bytes, "nres_metricas.csv")
-            
-            # Simular clique no link de download
-            return href, html.Script("document.getElementById('download-nre-csv').click();")
+    nome, extensao = os.path.splitext(nome_arquivo)
+    arquivo = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    if extensao in ('.feather', '.parquet'):
+        escrever_tabela_arrow(tabela_arrow(snapshot, nome, nre, escola), arquivo, extensao[1:])
+    else:
+        escrever_excel_streaming(arquivo, abas_exportacao(snapshot, nome_arquivo, nre, escola))
+    tamanho = arquivo.tell()
+    arquivo.seek(0)
+    return funcoes_exportacao['ler_em_partes'](arquivo), tamanho
+
+def obter_pdf_dashboard(funcoes_exportacao, snapshot, nre=None, escola=None):
+    """
+    Retorna o PDF do dashboard para o filtro, gerando-o apenas uma vez por
+    versão dos dados
+    
+    Args:
+        funcoes_exportacao: Funções criadas por criar_funcao_exportacao
+        snapshot: Snapshot das escolas
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
         
-        return "", ""
+    Returns:
+        bytes: Conteúdo do PDF, ou None se reportlab não estiver instalado
+    """
+    chave = (snapshot['versao'], nre, escola)
+    with _TRAVA_PDF:
+        if chave in _CACHE_PDF:
+            _CACHE_PDF.move_to_end(chave)
+            return _CACHE_PDF[chave]
     
-    # Callback para exportar Escolas para Excel
-    @app.callback(
-        [Output("download-escolas-excel", "href"),
-         Output("download-escolas-excel", "children")],
-        [Input("btn-export-escolas-excel", "n_clicks")],
-        prevent_initial_call=True
+    figuras = construir_figuras(snapshot, nre, escola)
+    conteudo = funcoes_exportacao['exportar_dashboard_para_pdf'](
+        [figuras['grafico_nres'], figuras['grafico_alunos'], figuras['gauge_respostas'], figuras['gauge_acertos']],
+        'dashboard_completo.pdf'
     )
-    def exportar_escolas_excel(n_clicks):
-        if n_clicks:
-            # Carregar dados
-            df_escolas_metricas = pd.read_csv('dados_processados/escolas_metricas.csv')
-            
-            # Exportar para Excel
-            excel_bytes = funcoes_exportacao['exportar_para_excel'](df_escolas_metricas, "escolas_metricas.xlsx")
-            
-            # Gerar link de download
-            href = funcoes_exportacao['gerar_link_download'](excel_bytes, "escolas_metricas.xlsx")
-            
-            # Simular clique no link de download
-            return href, html.Script("document.getElementById('download-escolas-excel').click();")
+    if conteudo is not None:
+        with _TRAVA_PDF:
+            _CACHE_PDF[chave] = conteudo
+            while len(_CACHE_PDF) > TAMANHO_CACHE_PDF:
+                _CACHE_PDF.popitem(last=False)
+    return conteudo
+
+class SaidaStreaming(io.RawIOBase):
+    """
+    Arquivo somente-escrita que acumula o que é escrito até ser retirado;
+    permite enviar um zip enquanto ele é montado
+    """
+    def __init__(self):
+        self.partes = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+    
+    def retirar(self):
+        """
+        Retorna (e descarta) o que foi escrito desde a última retirada,
+        como lista vazia ou com uma única parte
+        """
+        dados = b''.join(self.partes)
+        self.partes = []
+        return [dados] if dados else []
+
+def gerar_pacote_exportacao(funcoes_exportacao, snapshot, nre=None, escola=None):
+    """
+    Gera um zip com todas as exportações (tabelas em CSV e Excel, gráficos,
+    PDF e um manifesto JSON), enviando cada parte assim que é escrita
+    
+    Tabelas sem filtro vêm dos artefatos da versão atual; gráficos e PDF
+    usam os caches de imagens e de PDF e são gerados no pool de tarefas
+    pesadas (tipo 'pacote'). Itens que não puderam ser gerados
+    (ex.: kaleido ausente) são listados no manifesto.
+    
+    Args:
+        funcoes_exportacao: Funções criadas por criar_funcao_exportacao
+        snapshot: Snapshot das escolas
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
         
-        return "", ""
+    Yields:
+        bytes: Partes do arquivo zip
+    """
+    def graficos_e_pdf():
+        figuras = construir_figuras(snapshot, nre, escola)
+        nomes = list(GRAFICOS_EXPORTACAO)
+        imagens = renderizar_imagens([figuras[GRAFICOS_EXPORTACAO[nome]] for nome in nomes], 'png', escala=2)
+        return dict(zip(nomes, imagens)), obter_pdf_dashboard(funcoes_exportacao, snapshot, nre, escola)
     
-    # Callback para exportar Escolas para CSV
-    @app.callback(
-        [Output("download-escolas-csv", "href"),
-         Output("download-escolas-csv", "children")],
-        [Input("btn-export-escolas-csv", "n_clicks")],
-        prevent_initial_call=True
-    )
-    def exportar_escolas_csv(n_clicks):
-        if n_clicks:
-            # Carregar dados
-            df_escolas_metricas = pd.read_csv('dados_processados/escolas_metricas.csv')
-            
-            # Exportar para CSV
-            csv_bytes = funcoes_exportacao['exportar_para_csv'](df_escolas_metricas, "escolas_metricas.csv")
-            
-            # Gerar link de download
-            href = funcoes_exportacao['gerar_link_download'](csv_bytes, "escolas_metricas.csv")
-            
-            # Simular clique no link de download
-            return href, html.Script("document.getElementById('download-escolas-csv').click();")
+    manifesto = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'versao_dados': snapshot['versao'],
+        'filtros': {'nre': nre, 'escola': escola},
+        'arquivos': [],
+        'indisponiveis': [],
+    }
+    
+    saida = SaidaStreaming()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        def adicionar(nome_arquivo, partes):
+            # Imagens, planilhas e PDF já são comprimidos
+            compressao = zipfile.ZIP_DEFLATED if nome_arquivo.endswith(('.csv', '.json')) else zipfile.ZIP_STORED
+            info = zipfile.ZipInfo(nome_arquivo, date_time=datetime.now().timetuple()[:6])
+            info.compress_type = compressao
+            resumo = hashlib.sha256()
+            tamanho = 0
+            with arquivo_zip.open(info, 'w') as destino:
+                for parte in partes:
+                    destino.write(parte)
+                    resumo.update(parte)
+                    tamanho += len(parte)
+                    yield from saida.retirar()
+            manifesto['arquivos'].append({'nome': nome_arquivo, 'bytes': tamanho, 'sha256': resumo.hexdigest()})
+            yield from saida.retirar()
         
-        return "", ""
+        for nome in TABELAS_EXPORTACAO:
+            for extensao in EXTENSOES_TABELA:
+                yield from adicionar(nome + extensao, conteudo_tabela(funcoes_exportacao, snapshot, nome + extensao, nre, escola)[0])
+        yield from adicionar(PLANILHA_COMPLETA, conteudo_tabela(funcoes_exportacao, snapshot, PLANILHA_COMPLETA, nre, escola)[0])
+        
+        try:
+            graficos, pdf = executar_tarefa('pacote', graficos_e_pdf)
+        except (ValueError, RuntimeError, TimeoutError) as e:
+            # kaleido ausente, renderizador ou pool de tarefas ocupado
+            manifesto['indisponiveis'].append({'nome': 'graficos', 'motivo': str(e).strip()})
+            graficos, pdf = {}, None
+        for nome, imagem in graficos.items():
+            yield from adicionar(f"{nome}.png", [imagem])
+        if pdf is not None:
+            yield from adicionar('dashboard_completo.pdf', [pdf])
+        else:
+            manifesto['indisponiveis'].append({'nome': 'dashboard_completo.pdf', 'motivo': 'PDF indisponível no servidor'})
+        
+        conteudo_manifesto = json.dumps(manifesto, ensure_ascii=False, indent=4).encode('utf-8')
+        yield from adicionar('manifesto.json', [conteudo_manifesto])
+    yield from saida.retirar()
+
+def registrar_rotas_exportacao(server):
+    """
+    Registra no servidor Flask a rota /exportar/<nome_arquivo>, que envia as
+    exportações com os cabeçalhos de download
     
-    # Callback para exportar gráfico de NREs
-    @app.callback(
-        [Output("download-grafico-nre", "href"),
-         Output("download-grafico-nre", "children")],
-        [Input("btn-export-grafico-nre", "n_clicks")],
-        [State("grafico-nres", "figure")],
-        prevent_initial_call=True
-    )
-    def exportar_grafico_nre(n_clicks, figura):
-        if n_clicks and figura:
-            # Criar figura a partir dos dados
-            fig = go.Figure(figura)
-            
-            # Exportar para PNG
-            img_bytes = funcoes_exportacao['exportar_grafico_para_imagem'](fig, 'png')
-            
-            # Gerar link de download
-            href = funcoes_exportacao['gerar_link_download'](img_bytes, "grafico_nres.png")
-            
-            # Simular clique no link de download
-            return href, html.Script("document.getElementById('download-grafico-nre').click();")
+    Todas as exportações respeitam os filtros passados em ?nre=&escola=.
+    Tabelas e o zip completo são enviados em partes (ver conteudo_tabela e
+    gerar_pacote_exportacao). Imagens e PDF rodam no pool de tarefas pesadas
+    e recebem 503 com Retry-After quando ele está cheio.
+    
+    Args:
+        server: Aplicação Flask
+    """
+    funcoes_exportacao = criar_funcao_exportacao()
+    
+    @server.route('/exportar/<nome_arquivo>')
+    def exportar_arquivo(nome_arquivo):
+        nome, extensao = os.path.splitext(nome_arquivo)
+        nre = request.args.get('nre') or None
+        escola = request.args.get('escola') or None
         
-        return "", ""
+        cabecalhos = {
+            'Content-Disposition': f'attachment; filename="{nome_arquivo}"',
+            'Cache-Control': 'no-store',
+        }
+        
+        if nre and nre not in obter_snapshot()['nres']:
+            abort(404)
+        elif nome_arquivo == 'relatorios_nre.zip':
+            if not os.path.exists(ARQUIVO_RELATORIOS):
+                abort(404)
+            cabecalhos['Content-Length'] = str(os.path.getsize(ARQUIVO_RELATORIOS))
+            conteudo = funcoes_exportacao['ler_em_partes'](ARQUIVO_RELATORIOS)
+        elif nome in TABELAS_EXPORTACAO and extensao in EXTENSOES_TABELA or nome_arquivo == PLANILHA_COMPLETA:
+            conteudo, tamanho = conteudo_tabela(funcoes_exportacao, obter_snapshot(), nome_arquivo, nre, escola)
+            if tamanho is not None:
+                cabecalhos['Content-Length'] = str(tamanho)
+        elif nome_arquivo == PACOTE_COMPLETO:
+            conteudo = gerar_pacote_exportacao(funcoes_exportacao, obter_snapshot(), nre, escola)
+        elif nome in GRAFICOS_EXPORTACAO and extensao == '.png':
+            fig = construir_figuras(obter_snapshot(), nre, escola)[GRAFICOS_EXPORTACAO[nome]]
+            try:
+                conteudo = executar_tarefa('imagem', funcoes_exportacao['exportar_grafico_para_imagem'], fig, 'png')
+            except TimeoutError:
+                return Response("Servidor ocupado gerando imagens; tente novamente em instantes.",
+                                status=503, mimetype='text/plain', headers={'Retry-After': '5'})
+            except (ValueError, RuntimeError):
+                # kaleido não está instalado
+                return Response("Exportação de imagens indisponível no servidor.", status=503, mimetype='text/plain')
+        elif nome == 'dashboard_completo' and extensao == '.pdf':
+            try:
+                conteudo = executar_tarefa('pdf', obter_pdf_dashboard, funcoes_exportacao, obter_snapshot(), nre, escola)
+            except TimeoutError:
+                return Response("Servidor ocupado gerando imagens; tente novamente em instantes.",
+                                status=503, mimetype='text/plain', headers={'Retry-After': '5'})
+            except (ValueError, RuntimeError):
+                # kaleido não está instalado
+                conteudo = None
+            if conteudo is None:
+                # reportlab ou kaleido não estão instalados
+                return Response("Exportação em PDF indisponível no servidor.", status=503, mimetype='text/plain')
+        else:
+            abort(404)
+        
+        if isinstance(conteudo, bytes):
+            return Response(conteudo, mimetype=TIPOS_MIME[extensao], headers=cabecalhos)
+        return Response(stream_with_context(conteudo), mimetype=TIPOS_MIME[extensao], headers=cabecalhos)
+
+def registrar_callbacks_exportacao(app):
+    """
+    Registra as rotas de exportação no servidor do Dash e o callback que
+    mantém os links de exportação com os filtros atuais
+    
+    Args:
+        app: Aplicação Dash
+    """
+    registrar_rotas_exportacao(app.server)
     
-    # Callback para exportar gráfico de Alunos
     @app.callback(
-        [Output("download-grafico-alunos", "href"),
-         Output("download-grafico-alunos", "children")],
-        [Input("btn-export-grafico-alunos", "n_clicks")],
-        [State("grafico-alunos-nre", "figure")],
-        prevent_initial_call=True
+        [Output(id_botao, "href") for id_botao in LINKS_EXPORTACAO],
+        [Input("store-nre-selecionado", "data"),
+         Input("store-escola-selecionada", "data")]
     )
-    def exportar_grafico_alunos(n_clicks, figura):
-        if n_clicks and figura:
-            # Criar figura a partir dos dados
-            fig = go.Figure(figura)
-            
-            # Exportar para PNG
-            img_bytes = funcoes_exportacao['exportar_grafico_para_imagem'](fig, 'png')
-            
-            # Gerar link de download
-            href = funcoes_exportacao['gerar_link_download'](img_bytes, "grafico_alunos.png")
-            
-            # Simular clique no link de download
-            return href, html.Script("document.getElementById('download-grafico-alunos').click();")
-        
-        return "", ""
-    
-    # Callback para exportar dashboard completo para PDF
+    def atualizar_links_exportacao(nre_selecionado, escola_selecionada):
+        filtros = {chave: valor for chave, valor in (('nre', nre_selecionado), ('escola', escola_selecionada)) if valor}
+        consulta = f"?{urlencode(filtros)}" if filtros else ""
+        return [f"/exportar/{nome_arquivo}{consulta}" for nome_arquivo in LINKS_EXPORTACAO.values()]
+
     @app.callback(
-        [Output("download-dashboard-pdf", "href"),
-         Output("download-dashboard-pdf", "children"),
-         Output("alert-export", "is_open")],
-        [Input("btn-export-dashboard-pdf", "n_clicks")],
-        [State("grafico-nres", "figure"),
-         State("grafico-alunos-nre", "figure"),
-         State("gauge-respostas", "figure"),
-         State("gauge-acertos", "figure")],
-        prevent_initial_call=True
+        [Output("progresso-relatorios", "value"),
+         Output("progresso-relatorios", "label"),
+         Output("status-relatorios", "children"),
+         Output("btn-baixar-relatorios", "disabled"),
+         Output("intervalo-relatorios", "disabled")],
+        [Input("btn-gerar-relatorios", "n_clicks"),
+         Input("intervalo-relatorios", "n_intervals")]
     )
-    def exportar_dashboard_pdf(n_clicks, fig_nres, fig_alunos, fig_respostas, fig_acertos):
-        if n_clicks and all([fig_nres, fig_alunos, fig_respostas, fig_acertos]):
-            # Criar figuras a partir dos dados
-            figuras = [
-                go.Figure(fig_nres),
-                go.Figure(fig_alunos),
-                go.Figure(fig_respostas),
-                go.Figure(fig_acertos)
-            ]
-            
-            # Exportar para PDF
-            pdf_bytes = funcoes_exportacao['exportar_dashboard_para_pdf'](figuras, "dashboard_completo.pdf")
-            
-            if pdf_bytes:
-                # Gerar link de download
-                href = funcoes_exportacao['gerar_link_download'](pdf_bytes, "dashboard_completo.pdf")
-                
-                # Simular clique no link de download
-                return href, html.Script("document.getElementById('download-dashboard-pdf').click();"), True
-            else:
-                # Se não foi possível gerar o PDF (reportlab não instalado)
-                return "", "", False
+    def acompanhar_relatorios(n_clicks, n_intervals):
+        gatilho = dash.callback_context.triggered[0]['prop_id'] if dash.callback_context.triggered else ''
+        if gatilho.startswith("btn-gerar-relatorios") and n_clicks:
+            if iniciar_geracao_relatorios():
+                return 0, "", "Gerando relatórios...", True, False
+        
+        progresso = ler_progresso()
+        if progresso is None:
+            return 0, "", "Nenhum relatório gerado ainda.", True, True
         
-        return "", "", False
+        percentual = round(100 * progresso['concluidos'] / max(progresso['total'], 1))
+        rotulo = f"{progresso['concluidos']}/{progresso['total']}"
+        if progresso['status'] == 'gerando':
+            return percentual, rotulo, "Gerando relatórios...", True, False
+        if progresso['status'] == 'erro':
+            return percentual, rotulo, f"Erro ao gerar os relatórios: {progresso['mensagem']}", True, True
+        return 100, rotulo, f"Relatórios gerados em {progresso['fim']}.", False, True
 
 if __name__ == "__main__":
     # Teste das funções
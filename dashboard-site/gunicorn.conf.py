@@ -0,0 +1,32 @@
+import gc
+import os
+
+# Configuração do Gunicorn para o Dashboard Desafio PR
+#
+# Com preload_app, o app (dados, snapshot colunar, templates dos gráficos) é
+# carregado uma única vez no processo mestre, antes de criar os workers. Os
+# workers herdam essas páginas de memória por fork e as compartilham enquanto
+# ninguém as altera (copy-on-write), em vez de cada um carregar a sua cópia.
+# Para voltar ao carregamento por worker: GUNICORN_PRELOAD=0.
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Lido também por tarefas_pesadas.THREADS_POR_WORKER, que deixa uma thread
+# livre para os callbacks interativos
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+timeout = 60
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+if preload_app:
+    # O app é importado no mestre, que não usa os renderizadores de imagens:
+    # cada worker cria e aquece os seus no post_fork
+    os.environ['RENDERIZADORES_POST_FORK'] = '1'
+
+def pre_fork(server, worker):
+    # Tira os objetos já carregados do coletor de lixo: sem isso, cada coleta
+    # nos workers tocaria nos cabeçalhos desses objetos e copiaria as páginas
+    gc.freeze()
+
+def post_fork(server, worker):
+    if preload_app:
+        from renderizador_imagens import iniciar_renderizador
+        iniciar_renderizador()
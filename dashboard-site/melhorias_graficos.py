@@ -1,42 +1,61 @@
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+import copy
+from snapshot_dados import SEPARADOR_CHAVE
 
-def criar_gauge_melhorado(valor, titulo):
+# Cache de templates de gauge, indexado por (título, faixa de desempenho).
+# Steps, eixos, fontes e layout são sempre os mesmos; só valor, cor, status e
+# threshold mudam entre uma requisição e outra.
+_TEMPLATES_GAUGE = {}
+
+def _faixa_desempenho(valor):
     """
-    Cria um gráfico de gauge aprimorado para exibir percentuais
+    Classifica um valor percentual na faixa de desempenho correspondente
     
     Args:
         valor: Valor percentual (0-1)
-        titulo: Título do gauge
         
     Returns:
-        figura Plotly
+        tuple: (faixa, cor principal, ícone, texto de status)
     """
-    # Determinar a cor principal e ícone baseados no valor
     if valor < 0.3:
-        cor_principal = "#d32f2f"  # Vermelho
-        icone = "⚠️"  # Ícone de alerta
-        status_texto = "Atenção"
+        return 'atencao', "#d32f2f", "⚠️", "Atenção"  # Vermelho / alerta
     elif valor < 0.7:
-        cor_principal = "#fbc02d"  # Amarelo
-        icone = "📈"  # Ícone de progresso
-        status_texto = "Em progresso"
+        return 'progresso', "#fbc02d", "📈", "Em progresso"  # Amarelo / progresso
     else:
-        cor_principal = "#388e3c"  # Verde
-        icone = "🏆"  # Ícone de excelência
-        status_texto = "Excelente"
+        return 'excelente', "#388e3c", "🏆", "Excelente"  # Verde / excelência
+
+def _obter_template_gauge(titulo, faixa):
+    """
+    Retorna o template (dicionário Plotly) do gauge para um título e faixa,
+    construindo-o apenas na primeira vez
+    
+    Args:
+        titulo: Título do gauge
+        faixa: Faixa de desempenho retornada por _faixa_desempenho
+        
+    Returns:
+        dict: Figura Plotly serializada, usada como base para cópias
+    """
+    chave = (titulo, faixa)
+    if chave in _TEMPLATES_GAUGE:
+        return _TEMPLATES_GAUGE[chave]
+    
+    valor_base = {'atencao': 0.0, 'progresso': 0.3, 'excelente': 0.7}[faixa]
+    _, cor_principal, icone, status_texto = _faixa_desempenho(valor_base)
     
     # Criar o gauge com design aprimorado
     fig = go.Figure(go.Indicator(
         mode="gauge+number+delta",
-        value=valor * 100,
+        value=valor_base * 100,
         domain={'x': [0, 1], 'y': [0, 1]},
         title={
             'text': f"{icone} {titulo}", 
             'font': {'size': 18, 'color': '#333', 'family': 'Roboto, sans-serif'}
         },
-        delta={'reference': 50, 'increasing': {'color': "#388e3c"}, 'decreasing': {'color': "#d32f2f"}},
+        delta={'reference': 0, 'valueformat': '.1f', 'increasing': {'color': "#388e3c"}, 'decreasing': {'color': "#d32f2f"}},
         number={'font': {'size': 26, 'color': cor_principal, 'family': 'Roboto, sans-serif'}, 'suffix': "%"},
         gauge={
             'axis': {
@@ -57,7 +76,7 @@ def criar_gauge_melhorado(valor, titulo):
             'threshold': {
                 'line': {'color': "black", 'width': 4},
                 'thickness': 0.75,
-                'value': valor * 100
+                'value': valor_base * 100
             }
         }
     ))
@@ -84,26 +103,130 @@ def criar_gauge_melhorado(valor, titulo):
         font=dict(family="Roboto, sans-serif", size=12)
     )
     
-    return fig
+    template = fig.to_plotly_json()
+    _TEMPLATES_GAUGE[chave] = template
+    return template
 
-def criar_grafico_nres_melhorado(df):
+def precarregar_templates_gauge(titulos):
+    """
+    Constrói antecipadamente os templates de gauge de todas as faixas para
+    os títulos informados (por exemplo, no processo mestre do servidor,
+    antes de criar os workers)
+    
+    Args:
+        titulos: Títulos dos gauges
+    """
+    for titulo in titulos:
+        for faixa in ('atencao', 'progresso', 'excelente'):
+            _obter_template_gauge(titulo, faixa)
+
+def _campos_variaveis_gauge(valor, titulo, anterior=None):
+    """
+    Calcula os únicos campos do gauge que dependem do valor
+    
+    Args:
+        valor: Valor percentual (0-1)
+        titulo: Título do gauge
+        anterior: Valor da semana anterior (0-1); sem ele o delta é ocultado
+        
+    Returns:
+        tuple: (faixa, dicionário caminho -> valor)
+    """
+    valor = float(valor)
+    faixa, cor_principal, icone, status_texto = _faixa_desempenho(valor)
+    tem_anterior = anterior is not None and not pd.isna(anterior)
+    campos = {
+        ('data', 0, 'value'): valor * 100,
+        ('data', 0, 'mode'): "gauge+number+delta" if tem_anterior else "gauge+number",
+        ('data', 0, 'delta', 'reference'): float(anterior) * 100 if tem_anterior else 0,
+        ('data', 0, 'title', 'text'): f"{icone} {titulo}",
+        ('data', 0, 'number', 'font', 'color'): cor_principal,
+        ('data', 0, 'gauge', 'bar', 'color'): cor_principal,
+        ('data', 0, 'gauge', 'threshold', 'value'): valor * 100,
+        ('layout', 'annotations', 0, 'text'): status_texto,
+        ('layout', 'annotations', 0, 'font', 'color'): cor_principal,
+    }
+    return faixa, campos
+
+def _aplicar_campos(destino, campos):
+    """
+    Atribui cada valor de `campos` ao caminho correspondente em `destino`
+    (dicionário da figura ou dash.Patch)
+    """
+    for caminho, valor in campos.items():
+        alvo = destino
+        for chave in caminho[:-1]:
+            alvo = alvo[chave]
+        alvo[caminho[-1]] = valor
+    return destino
+
+def criar_gauge_melhorado(valor, titulo, anterior=None):
+    """
+    Cria um gráfico de gauge aprimorado para exibir percentuais
+    
+    A figura é copiada de um template em cache (por título e faixa) e só os
+    campos que dependem do valor são preenchidos.
+    
+    Args:
+        valor: Valor percentual (0-1)
+        titulo: Título do gauge
+        anterior: Valor da semana anterior (0-1), exibido como variação
+        
+    Returns:
+        figura Plotly
+    """
+    faixa, campos = _campos_variaveis_gauge(valor, titulo, anterior)
+    fig_dict = copy.deepcopy(_obter_template_gauge(titulo, faixa))
+    _aplicar_campos(fig_dict, campos)
+    
+    return go.Figure(fig_dict)
+
+def criar_patch_gauge(valor, titulo, anterior=None):
+    """
+    Cria uma atualização parcial (dash.Patch) para um gauge já exibido
+    
+    Apenas valor, cor, status e threshold são enviados ao navegador; a figura
+    no cliente precisa ter sido criada por criar_gauge_melhorado.
+    
+    Args:
+        valor: Valor percentual (0-1)
+        titulo: Título do gauge
+        anterior: Valor da semana anterior (0-1), exibido como variação
+        
+    Returns:
+        dash.Patch com os campos alterados
+    """
+    from dash import Patch
+    
+    _, campos = _campos_variaveis_gauge(valor, titulo, anterior)
+    return _aplicar_campos(Patch(), campos)
+
+def criar_grafico_nres_melhorado(df, ordenado=False, variacao=None):
     """
     Cria um gráfico de barras aprimorado para exibir o desempenho por NRE
     
     Args:
         df: DataFrame com os dados dos NREs
+        ordenado: Indica que df já está ordenado por percentual de acertos
+        variacao: Variação semanal do percentual de acertos, alinhada às
+            linhas de df (opcional, exibida no hover)
         
     Returns:
         figura Plotly
     """
     # Ordenar por percentual de acertos
-    df_sorted = df.sort_values(by='Percentual de acertos', ascending=False)
+    df_sorted = df if ordenado else df.sort_values(by='Percentual de acertos', ascending=False)
     
     # Criar cores baseadas no valor
     colors = []
     hover_texts = []
     
-    for valor in df_sorted['Percentual de acertos']:
+    if variacao is None:
+        variacao_sorted = [np.nan] * len(df_sorted)
+    else:
+        variacao_sorted = pd.Series(np.asarray(variacao), index=df.index).loc[df_sorted.index]
+    
+    for valor, delta in zip(df_sorted['Percentual de acertos'], variacao_sorted):
         if valor < 0.3:
             colors.append('#d32f2f')  # Vermelho
             status = "Atenção"
@@ -114,7 +237,10 @@ def criar_grafico_nres_melhorado(df):
             colors.append('#388e3c')  # Verde
             status = "Excelente"
         
-        hover_texts.append(f"Status: {status}<br>Percentual: {valor:.1%}")
+        hover_text = f"Status: {status}<br>Percentual: {valor:.1%}"
+        if pd.notna(delta):
+            hover_text += f"<br>Variação semanal: {delta * 100:+.1f} p.p."
+        hover_texts.append(hover_text)
     
     # Criar gráfico com barras personalizadas
     fig = px.bar(
@@ -267,14 +393,312 @@ def criar_grafico_alunos_nre_melhorado(df):
     
     return fig
 
+def criar_grafico_dispersao_escolas(snapshot):
+    """
+    Cria um gráfico de dispersão (WebGL) com todas as escolas do estado:
+    Índice de Respostas x Percentual de Acertos, colorido por NRE e com o
+    tamanho proporcional ao número de alunos
+    
+    Args:
+        snapshot: Snapshot colunar das escolas (ver snapshot_dados)
+        
+    Returns:
+        figura Plotly
+    """
+    offsets = snapshot['offsets']
+    alunos = np.nan_to_num(snapshot['alunos'])
+    cores = px.colors.qualitative.Dark24
+    
+    # Escala de área: a maior escola fica com ~30px de diâmetro
+    sizeref = 2.0 * max(alunos.max(initial=0), 1) / (30 ** 2)
+    
+    fig = go.Figure()
+    
+    # Um trace Scattergl por NRE; as escolas já estão agrupadas por NRE no
+    # snapshot, então cada trace é apenas uma fatia dos arrays
+    for i, nre in enumerate(snapshot['nres']):
+        inicio, fim = offsets[i], offsets[i + 1]
+        fig.add_trace(go.Scattergl(
+            x=snapshot['indice_respostas'][inicio:fim],
+            y=snapshot['percentual_acertos'][inicio:fim],
+            mode='markers',
+            name=nre,
+            text=snapshot['escola'][inicio:fim],
+            # Chave estável "NRE<tab>Escola": continua válida se os dados mudarem
+            customdata=np.char.add(nre + SEPARADOR_CHAVE, snapshot['escola'][inicio:fim]),
+            marker=dict(
+                size=alunos[inicio:fim],
+                sizemode='area',
+                sizeref=sizeref,
+                sizemin=3,
+                color=cores[i % len(cores)],
+                opacity=0.7,
+                line=dict(width=0)
+            ),
+            hovertemplate='<b>%{text}</b><br>' + nre +
+                          '<br>Índice de Respostas: %{x:.1%}<br>Percentual de Acertos: %{y:.1%}<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        height=500,
+        dragmode='select',
+        xaxis={
+            'title': {'text': 'Índice de Respostas', 'font': {'size': 14, 'family': 'Roboto, sans-serif'}},
+            'tickformat': '.0%',
+            'tickfont': {'size': 12, 'family': 'Roboto, sans-serif'}
+        },
+        yaxis={
+            'title': {'text': 'Percentual de Acertos', 'font': {'size': 14, 'family': 'Roboto, sans-serif'}},
+            'tickformat': '.0%',
+            'tickfont': {'size': 12, 'family': 'Roboto, sans-serif'}
+        },
+        margin=dict(l=40, r=20, t=40, b=40),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Roboto, sans-serif", size=12),
+        legend=dict(font=dict(size=10, family="Roboto, sans-serif")),
+        title={
+            'text': 'Escolas: Índice de Respostas x Percentual de Acertos',
+            'y': 0.98,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top',
+            'font': {'size': 18, 'family': 'Roboto, sans-serif', 'color': '#003366'}
+        }
+    )
+    
+    return fig
+
+def criar_grafico_hierarquia_escolas(snapshot, tipo='sunburst'):
+    """
+    Cria um gráfico hierárquico (sunburst ou treemap) Estado -> NRE -> Escola
+    com a distribuição de alunos
+    
+    A hierarquia vem pré-calculada no snapshot; ao clicar em um NRE o próprio
+    navegador expande as escolas, sem novas chamadas ao servidor.
+    
+    Args:
+        snapshot: Snapshot colunar das escolas (ver snapshot_dados)
+        tipo: 'sunburst' ou 'treemap' (padrão: sunburst)
+        
+    Returns:
+        figura Plotly
+    """
+    Trace = go.Treemap if tipo == 'treemap' else go.Sunburst
+    
+    fig = go.Figure(Trace(
+        ids=snapshot['hierarquia_ids'],
+        labels=snapshot['hierarquia_rotulos'],
+        parents=snapshot['hierarquia_pais'],
+        values=snapshot['hierarquia_alunos'],
+        customdata=snapshot['hierarquia_acertos'],
+        branchvalues='total',
+        maxdepth=2,
+        marker=dict(
+            colors=snapshot['hierarquia_acertos'],
+            colorscale=[[0, '#d32f2f'], [0.5, '#fbc02d'], [1, '#388e3c']],
+            cmin=0,
+            cmax=1,
+            colorbar=dict(title='Acertos', tickformat='.0%')
+        ),
+        hovertemplate='<b>%{label}</b><br>Alunos: %{value:,}<br>Percentual de Acertos: %{customdata:.1%}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        height=550,
+        margin=dict(l=10, r=10, t=40, b=10),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Roboto, sans-serif", size=12),
+        title={
+            'text': 'Alunos por NRE e Escola',
+            'y': 0.98,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top',
+            'font': {'size': 18, 'family': 'Roboto, sans-serif', 'color': '#003366'}
+        }
+    )
+    
+    return fig
+
+def criar_grafico_comparacao(df):
+    """
+    Cria um gráfico de barras agrupadas comparando os indicadores de vários
+    NREs/escolas e da seleção combinada
+    
+    Args:
+        df: DataFrame com as colunas 'Item', 'Índice de Respostas' e
+            'Percentual de acertos'
+        
+    Returns:
+        figura Plotly
+    """
+    fig = go.Figure()
+    for coluna, cor in (('Índice de Respostas', '#003366'), ('Percentual de acertos', '#388e3c')):
+        fig.add_trace(go.Bar(
+            x=df['Item'],
+            y=df[coluna],
+            name=coluna,
+            marker_color=cor,
+            text=[f"{v:.1%}" if pd.notna(v) else "-" for v in df[coluna]],
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>' + coluna + ': %{y:.1%}<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        barmode='group',
+        height=450,
+        xaxis={
+            'tickangle': 45,
+            'tickfont': {'size': 12, 'family': 'Roboto, sans-serif'}
+        },
+        yaxis={
+            'tickformat': '.0%',
+            'range': [0, 1],
+            'tickfont': {'size': 12, 'family': 'Roboto, sans-serif'}
+        },
+        margin=dict(l=40, r=20, t=40, b=120),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Roboto, sans-serif", size=12),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
+        title={
+            'text': 'Comparação da Seleção',
+            'y': 0.98,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top',
+            'font': {'size': 18, 'family': 'Roboto, sans-serif', 'color': '#003366'}
+        }
+    )
+    
+    return fig
+
+def criar_grafico_distribuicao(bordas, contagens_acertos, contagens_indice, titulo='Estado'):
+    """
+    Cria um histograma com a distribuição das escolas por faixa de Percentual
+    de Acertos e de Índice de Respostas
+    
+    Args:
+        bordas: Bordas das faixas (0-1)
+        contagens_acertos: Número de escolas por faixa de percentual de acertos
+        contagens_indice: Número de escolas por faixa de índice de respostas
+        titulo: Recorte exibido no título (NRE ou estado)
+        
+    Returns:
+        figura Plotly
+    """
+    bordas = np.asarray(bordas)
+    centros = (bordas[:-1] + bordas[1:]) / 2
+    rotulos = [f"{inicio:.0%}–{fim:.0%}" for inicio, fim in zip(bordas[:-1], bordas[1:])]
+    
+    fig = go.Figure()
+    for contagens, nome, cor in ((contagens_acertos, 'Percentual de Acertos', '#388e3c'),
+                                 (contagens_indice, 'Índice de Respostas', '#003366')):
+        fig.add_trace(go.Bar(
+            x=centros,
+            y=contagens,
+            width=(bordas[1] - bordas[0]) * 0.9,
+            name=nome,
+            marker_color=cor,
+            opacity=0.7,
+            customdata=rotulos,
+            hovertemplate='<b>%{customdata}</b><br>Escolas: %{y}<extra>' + nome + '</extra>'
+        ))
+    
+    fig.update_layout(
+        barmode='overlay',
+        height=400,
+        xaxis={
+            'title': {'text': 'Faixa', 'font': {'size': 14, 'family': 'Roboto, sans-serif'}},
+            'tickformat': '.0%',
+            'range': [0, 1],
+            'tickfont': {'size': 12, 'family': 'Roboto, sans-serif'}
+        },
+        yaxis={
+            'title': {'text': 'Escolas', 'font': {'size': 14, 'family': 'Roboto, sans-serif'}},
+            'tickfont': {'size': 12, 'family': 'Roboto, sans-serif'}
+        },
+        margin=dict(l=40, r=20, t=60, b=40),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Roboto, sans-serif", size=12),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
+        title={
+            'text': f'Distribuição das Escolas - {titulo}',
+            'y': 0.98,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top',
+            'font': {'size': 18, 'family': 'Roboto, sans-serif', 'color': '#003366'}
+        }
+    )
+    
+    return fig
+
+def criar_patch_distribuicao(contagens_acertos, contagens_indice, titulo='Estado'):
+    """
+    Cria uma atualização parcial (dash.Patch) do histograma: só as contagens
+    por faixa e o título vão para o navegador
+    
+    Args:
+        contagens_acertos: Número de escolas por faixa de percentual de acertos
+        contagens_indice: Número de escolas por faixa de índice de respostas
+        titulo: Recorte exibido no título (NRE ou estado)
+        
+    Returns:
+        dash.Patch com os campos alterados
+    """
+    from dash import Patch
+    
+    patch = Patch()
+    patch['data'][0]['y'] = [int(c) for c in contagens_acertos]
+    patch['data'][1]['y'] = [int(c) for c in contagens_indice]
+    patch['layout']['title']['text'] = f'Distribuição das Escolas - {titulo}'
+    return patch
+
+def criar_lista_atencao(df, titulo):
+    """
+    Cria a lista de escolas que precisam de atenção (piores percentuais de
+    acertos)
+    
+    Args:
+        df: DataFrame com as escolas, da pior para a melhor
+        titulo: Título da lista
+        
+    Returns:
+        componente HTML da lista
+    """
+    from dash import html
+    
+    itens = []
+    for _, row in df.iterrows():
+        acertos = row['Percentual de acertos']
+        itens.append(html.Li([
+            html.I(className="fas fa-exclamation-triangle status-icon", style={'color': '#d32f2f'}),
+            html.Span(row['Escola'], className="atencao-escola"),
+            html.Span(f" ({row['NRE']})", className="atencao-nre"),
+            html.Span(f"{acertos:.1%}" if pd.notna(acertos) else "sem respostas", className="atencao-valor"),
+        ], className="atencao-item"))
+    
+    return html.Div([
+        html.H3(titulo, className="card-title"),
+        html.Ul(itens, className="atencao-lista"),
+    ], className="atencao-container")
+
 # Função para criar tabela de escolas com indicadores visuais melhorados
-def criar_tabela_escolas_melhorada(df, nre=None):
+def criar_tabela_escolas_melhorada(df, nre=None, ordenado=False):
     """
     Cria uma tabela HTML aprimorada para exibir as escolas
     
+    Quando df traz as colunas de ranking do snapshot ('Posição no NRE' e
+    'Percentil no Estado'), elas também são exibidas.
+    
     Args:
         df: DataFrame com os dados das escolas
         nre: Filtro opcional por NRE
+        ordenado: Indica que df já está ordenado por percentual de acertos
         
     Returns:
         componente HTML da tabela
@@ -289,17 +713,29 @@ def criar_tabela_escolas_melhorada(df, nre=None):
         df_filtered = df.head(20)
     
     # Ordenar por percentual de acertos
-    df_filtered = df_filtered.sort_values(by='Percentual de acertos', ascending=False)
+    if not ordenado:
+        df_filtered = df_filtered.sort_values(by='Percentual de acertos', ascending=False)
     
     # Formatar os valores para exibição
     df_display = df_filtered.copy()
+    com_ranking = 'Posição no NRE' in df_display.columns and 'Percentil no Estado' in df_display.columns
+    if com_ranking:
+        df_display['Posição no NRE'] = df_display['Posição no NRE'].apply(lambda x: f"{int(x)}º")
+        df_display['Percentil no Estado'] = df_display['Percentil no Estado'].apply(lambda x: f"{x:.0%}")
     df_display['Índice de Respostas'] = df_display['Índice de Respostas'].apply(lambda x: f"{x:.1%}")
     df_display['Percentual de acertos'] = df_display['Percentual de acertos'].apply(lambda x: f"{x:.1%}")
     df_display['Atribuição Esperada'] = df_display['Atribuição Esperada'].apply(lambda x: f"{int(x):,}".replace(",", "."))
     
+    com_variacao = 'Variação de acertos' in df_display.columns
+    if com_variacao:
+        df_display['Variação de acertos'] = df_display['Variação de acertos'].apply(
+            lambda x: f"{'▲' if x >= 0 else '▼'} {x * 100:+.1f} p.p. na semana" if pd.notna(x) else "")
+    
     # Selecionar apenas as colunas relevantes
     colunas = ['Escola', 'Alunos', 'Professores', 'Atribuição Esperada', 'Questões Respondidas', 'Índice de Respostas', 'Percentual de acertos']
-    df_display = df_display[colunas]
+    if com_ranking:
+        colunas = colunas + ['Posição no NRE', 'Percentil no Estado']
+    df_display = df_display[colunas + (['Variação de acertos'] if com_variacao else [])]
     
     # Criar a tabela HTML com indicadores visuais aprimorados
     header = html.Thead(html.Tr([html.Th(col, style={'background-color': '#003366', 'color': 'white'}) for col in colunas]))
@@ -364,8 +800,14 @@ def criar_tabela_escolas_melhorada(df, nre=None):
                     icone_acertos,
                     "Percentual de Acertos"
                 ])
-            ], style={'background-color': cor_acertos, 'padding': '5px', 'border-radius': '4px'})),
-        ], style={'background-color': '#f9f9f9' if i % 2 == 0 else 'white'})
+            ] + ([
+                html.Div(row['Variação de acertos'], className="weekly-delta")
+            ] if com_variacao and row['Variação de acertos'] else []),
+            style={'background-color': cor_acertos, 'padding': '5px', 'border-radius': '4px'})),
+        ] + ([
+            html.Td(row['Posição no NRE']),
+            html.Td(row['Percentil no Estado']),
+        ] if com_ranking else []), style={'background-color': '#f9f9f9' if i % 2 == 0 else 'white'})
         rows.append(tr)
     
     body = html.Tbody(rows)
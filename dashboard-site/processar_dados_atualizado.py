@@ -4,6 +4,20 @@ import json
 import os
 import shutil
 from datetime import datetime
+from snapshot_dados import (
+    construir_snapshot,
+    publicar_snapshot,
+    obter_snapshot,
+    reescalar_atribuicao,
+    dataframe_nres,
+    dataframe_origem,
+    agregar_selecao,
+    ler_versao_atual,
+    DIRETORIO_SNAPSHOT
+)
+from artefatos_exportacao import preparar_artefatos, DIRETORIO_ARTEFATOS
+from visoes_precalculadas import preparar_visoes
+from relatorios_nre import DIRETORIO_RELATORIOS
 
 def extrair_dados_planilhas():
     """
@@ -72,6 +86,9 @@ def extrair_dados_planilhas():
     escolas_metricas.to_csv('dados_processados/escolas_metricas.csv', index=False)
     professores_metricas.to_csv('dados_processados/professores_metricas.csv', index=False)
     
+    # Salvar snapshot colunar das escolas
+    publicar_snapshot(construir_snapshot(escolas_metricas, 8, 30, anterior=obter_snapshot()))
+    
     # Salvar lista de NREs
     with open('dados_processados/lista_nres.json', 'w', encoding='utf-8') as f:
         json.dump(list(nres), f, ensure_ascii=False)
@@ -129,6 +146,46 @@ def extrair_dados_planilhas():
         'professores_por_escola': professores_por_escola
     }
 
+def ignorar_no_backup(diretorio, nomes):
+    """
+    Retorna o que não entra no backup dos dados processados (usado como
+    ignore de shutil.copytree): exportações e relatórios, que são refeitos
+    a partir dos dados, e, no snapshot, as versões que não são a publicada
+    e as visões pré-calculadas
+
+    Args:
+        diretorio: Diretório sendo copiado
+        nomes: Nomes dos arquivos e diretórios nele
+
+    Returns:
+        set: Nomes a ignorar
+    """
+    diretorio = os.path.normpath(diretorio)
+    derivados = {os.path.normpath(DIRETORIO_ARTEFATOS), os.path.normpath(DIRETORIO_RELATORIOS)}
+    ignorados = {nome for nome in nomes if os.path.join(diretorio, nome) in derivados}
+    if diretorio == os.path.normpath(DIRETORIO_SNAPSHOT):
+        ignorados.update(nome for nome in nomes if nome not in ('atual.json', ler_versao_atual()))
+    elif os.path.dirname(diretorio) == os.path.normpath(DIRETORIO_SNAPSHOT):
+        ignorados.update(nome for nome in nomes if nome == 'visoes')
+    return ignorados
+
+def fazer_backup_dados():
+    """
+    Copia os dados processados atuais para backup/dados_<timestamp>, sem
+    os derivados (ver ignorar_no_backup)
+
+    Returns:
+        str: Diretório do backup
+    """
+    os.makedirs('backup', exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_dir = f"backup/dados_{timestamp}"
+    os.makedirs(backup_dir)
+
+    if os.path.exists('dados_processados'):
+        shutil.copytree('dados_processados', backup_dir, ignore=ignorar_no_backup, dirs_exist_ok=True)
+    return backup_dir
+
 def criar_funcoes_atualizacao():
     """
     Cria funções para atualização dos dados a partir de novas planilhas
@@ -207,18 +264,7 @@ def criar_funcoes_atualizacao():
                 return f"Erro: {mensagem}"
             
             # Fazer backup dos dados atuais
-            if not os.path.exists('backup'):
-                os.makedirs('backup')
-                
-            # Criar um timestamp para o backup
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_dir = f"backup/dados_{timestamp}"
-            os.makedirs(backup_dir)
-            
-            # Copiar os arquivos de dados para o backup
-            if os.path.exists('dados_processados'):
-                for arquivo in os.listdir('dados_processados'):
-                    shutil.copy(f"dados_processados/{arquivo}", f"{backup_dir}/{arquivo}")
+            backup_dir = fazer_backup_dados()
             
             # Processar os novos dados
             print("Processando novos dados...")
@@ -287,6 +333,12 @@ def criar_funcoes_atualizacao():
             nre_metricas.to_csv('dados_processados/nre_metricas.csv', index=False)
             escolas_metricas.to_csv('dados_processados/escolas_metricas.csv', index=False)
             
+            # Salvar snapshot colunar das escolas, guardando os indicadores do
+            # snapshot atual como semana anterior
+            publicar_snapshot(construir_snapshot(escolas_metricas, semanas_atuais, questoes_por_semana, anterior=obter_snapshot()))
+            preparar_visoes(obter_snapshot())
+            preparar_artefatos(obter_snapshot())
+            
             with open('dados_processados/lista_nres.json', 'w', encoding='utf-8') as f:
                 json.dump(list(nres), f, ensure_ascii=False)
                 
@@ -349,6 +401,62 @@ def criar_funcoes_atualizacao():
         except Exception as e:
             return f"Erro durante a atualização dos dados: {str(e)}"
     
+    def recalcular_semanas(semanas_atuais, questoes_por_semana):
+        """
+        Recalcula a Atribuição Esperada e o Índice de Respostas dos dados atuais
+        para um novo número de semanas/questões, sem planilha: o cálculo é
+        feito sobre os arrays do snapshot, depois de um backup dos dados
+        
+        Args:
+            semanas_atuais: Novo número de semanas
+            questoes_por_semana: Novo número de questões por semana
+            
+        Returns:
+            str: Mensagem com o resultado do recálculo
+        """
+        try:
+            snapshot = obter_snapshot()
+            if snapshot is None:
+                return "Erro: não há dados carregados para recalcular."
+            
+            # Fazer backup dos dados atuais
+            backup_dir = fazer_backup_dados()
+            
+            # Recalcular de forma vetorizada e publicar o novo snapshot
+            novo_snapshot = reescalar_atribuicao(snapshot, semanas_atuais, questoes_por_semana)
+            totais = agregar_selecao(novo_snapshot, novo_snapshot['nres'])
+            
+            publicar_snapshot(novo_snapshot)
+            preparar_visoes(novo_snapshot)
+            preparar_artefatos(novo_snapshot)
+            
+            # Regravar os CSVs (de onde o snapshot é reconstruído) a partir
+            # dos arrays já recalculados, sem relê-los
+            dataframe_origem(novo_snapshot).to_csv('dados_processados/escolas_metricas.csv', index=False)
+            dataframe_nres(novo_snapshot).sort_values(by='NRE').to_csv('dados_processados/nre_metricas.csv', index=False)
+            
+            with open('dados_processados/estrutura_dados.json', 'r', encoding='utf-8') as f:
+                estrutura_dados = json.load(f)
+            estrutura_dados['indice_respostas_geral'] = float(totais['indice_respostas'])
+            estrutura_dados['semanas_atuais'] = semanas_atuais
+            estrutura_dados['questoes_por_semana'] = questoes_por_semana
+            estrutura_dados['ultima_atualizacao'] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+            with open('dados_processados/estrutura_dados.json', 'w', encoding='utf-8') as f:
+                json.dump(estrutura_dados, f, ensure_ascii=False, indent=4)
+            
+            return f"""
+            Atribuição esperada recalculada!
+            
+            - Semana atual: {semanas_atuais}
+            - Questões por semana: {questoes_por_semana}
+            - Índice de respostas geral: {estrutura_dados['indice_respostas_geral']:.1%}
+            
+            Backup dos dados anteriores salvo em: {backup_dir}
+            """
+            
+        except Exception as e:
+            return f"Erro durante o recálculo: {str(e)}"
+    
     def obter_historico_atualizacoes(limite=5):
         """
         Obtém o histórico de atualizações
@@ -408,6 +516,7 @@ def criar_funcoes_atualizacao():
     return {
         'verificar_formato_planilha': verificar_formato_planilha,
         'atualizar_dados_dashboard': atualizar_dados_dashboard,
+        'recalcular_semanas': recalcular_semanas,
         'obter_historico_atualizacoes': obter_historico_atualizacoes,
         'validar_dados_entrada': validar_dados_entrada
     }
@@ -0,0 +1,28 @@
+import multiprocessing
+
+def contexto_processos():
+    """
+    Retorna o contexto de multiprocessing dos processos auxiliares
+    (renderizadores de imagens, geração de relatórios e das visões)
+
+    Os processos são criados por spawn, nunca por fork: o servidor tem
+    threads (atendimento, tarefas pesadas, segundo plano), e um fork feito
+    com outra thread segurando uma trava deixaria o filho travado. Um
+    processo spawn começa um interpretador limpo e importa só os módulos da
+    função que vai executar; o snapshot é mapeado dos mesmos arquivos .npy,
+    então os dados não são copiados.
+
+    Returns:
+        multiprocessing.context.SpawnContext
+    """
+    return multiprocessing.get_context('spawn')
+
+def em_processo_auxiliar():
+    """
+    Indica se o código está rodando num processo auxiliar (inclusive durante
+    a reimportação do módulo principal que o spawn faz ao iniciá-lo), e não
+    no servidor. Usado para não repetir nos auxiliares as tarefas de
+    inicialização do servidor.
+    """
+    return multiprocessing.parent_process() is not None or \
+        getattr(multiprocessing.current_process(), '_inheriting', False)
@@ -0,0 +1,299 @@
+import concurrent.futures
+import io
+import json
+import os
+import time
+import zipfile
+from datetime import datetime
+from snapshot_dados import obter_snapshot, carregar_snapshot, dataframe_nres, dataframe_escolas, DIRETORIO_SNAPSHOT
+from visoes_dashboard import construir_figuras, indices_filtro
+from renderizador_imagens import renderizar_imagem, renderizar_imagens
+from escrita_excel import escrever_excel_streaming
+from tarefas_pesadas import iniciar_tarefa, ServidorOcupado
+from processos_auxiliares import contexto_processos
+
+# Diretório dos relatórios por NRE (zip e arquivo de progresso)
+DIRETORIO_RELATORIOS = 'dados_processados/relatorios'
+
+# Arquivo zip com os relatórios de todos os NREs
+ARQUIVO_RELATORIOS = os.path.join(DIRETORIO_RELATORIOS, 'relatorios_nre.zip')
+
+# Progresso da geração, lido por qualquer processo do servidor
+ARQUIVO_PROGRESSO = os.path.join(DIRETORIO_RELATORIOS, 'progresso.json')
+
+# Número máximo de processos gerando relatórios ao mesmo tempo
+NUM_PROCESSOS_RELATORIOS = int(os.environ.get('RELATORIOS_PROCESSOS', os.cpu_count() or 1))
+
+# Snapshot usado por um processo de geração (ver _iniciar_processo_geracao)
+_SNAPSHOT_PROCESSO = {'snapshot': None}
+
+# Colunas da tabela de escolas nos relatórios (coluna -> formato)
+COLUNAS_TABELA_RELATORIO = {
+    'Escola': '{}',
+    'Alunos': '{}',
+    'Índice de Respostas': '{:.1%}',
+    'Percentual de acertos': '{:.1%}',
+    'Posição no NRE': '{}',
+}
+
+# Tempo (segundos) sem atualização do progresso após o qual uma geração
+# 'gerando' é considerada interrompida
+TEMPO_GERACAO_INTERROMPIDA = 600
+
+def nome_arquivo_nre(nre):
+    """
+    Retorna um nome de arquivo seguro para o NRE (sem espaços nem barras)
+    """
+    return ''.join(c if c.isalnum() else '_' for c in nre).strip('_')
+
+def dataframe_escolas_nre(snapshot, nre):
+    """
+    Retorna as escolas do NRE, ordenadas pela posição no NRE
+    """
+    df = dataframe_escolas(snapshot, indices_filtro(snapshot, nre))
+    return df.sort_values(by='Posição no NRE').reset_index(drop=True)
+
+def gerar_xlsx_relatorio(snapshot, nre):
+    """
+    Gera a planilha do relatório de um NRE, com as métricas do NRE e a
+    tabela de escolas em abas separadas
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: Nome do NRE
+
+    Returns:
+        bytes: Conteúdo do arquivo XLSX
+    """
+    df_nre = dataframe_nres(snapshot)
+    output = io.BytesIO()
+    escrever_excel_streaming(output, [
+        ('NRE', [df_nre[df_nre['NRE'] == nre]]),
+        ('Escolas', [dataframe_escolas_nre(snapshot, nre)]),
+    ])
+    return output.getvalue()
+
+def renderizar_gauges(snapshot, nre):
+    """
+    Renderiza os gauges do NRE nos processos renderizadores de imagens
+
+    Returns:
+        list: Imagens dos gauges, ou lista vazia sem kaleido (ou com o
+        renderizador ocupado)
+    """
+    figuras = construir_figuras(snapshot, nre)
+    try:
+        return renderizar_imagens([figuras['gauge_respostas'], figuras['gauge_acertos']])
+    except (ValueError, RuntimeError, TimeoutError):
+        return []
+
+def gerar_pdf_relatorio(snapshot, nre, png_ranking=None, gauges=None):
+    """
+    Gera o PDF do relatório de um NRE: gauges do NRE, ranking dos NREs e
+    tabela de escolas
+
+    Sem kaleido (ou com o renderizador ocupado), o relatório sai sem as
+    imagens.
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: Nome do NRE
+        png_ranking: Imagem já renderizada do ranking dos NREs (opcional)
+        gauges: Imagens já renderizadas dos gauges (padrão: renderizá-las
+            com renderizar_gauges)
+
+    Returns:
+        bytes: Conteúdo do PDF, ou None se reportlab não estiver instalado
+    """
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Image, Spacer, Paragraph, Table, TableStyle
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib.units import inch
+    except ImportError:
+        return None
+
+    if gauges is None:
+        gauges = renderizar_gauges(snapshot, nre)
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    styles = getSampleStyleSheet()
+    elements = [
+        Paragraph(f"Desafio PR - Relatório {nre}", styles['Title']),
+        Paragraph(f"Gerado em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", styles['Normal']),
+        Spacer(1, 0.25*inch),
+    ]
+
+    if gauges:
+        elements.append(Table([[Image(io.BytesIO(png), width=3.4*inch, height=2.4*inch) for png in gauges]]))
+        elements.append(Spacer(1, 0.25*inch))
+    if png_ranking:
+        elements.append(Image(io.BytesIO(png_ranking), width=7*inch, height=5*inch))
+        elements.append(Spacer(1, 0.25*inch))
+
+    df_escolas = dataframe_escolas_nre(snapshot, nre)
+    linhas = [list(COLUNAS_TABELA_RELATORIO)]
+    for _, escola in df_escolas.iterrows():
+        linhas.append([formato.format(escola[coluna]) for coluna, formato in COLUNAS_TABELA_RELATORIO.items()])
+    tabela = Table(linhas, repeatRows=1)
+    tabela.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#003366')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f7fa')]),
+    ]))
+    elements.append(tabela)
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+def gerar_relatorio_nre(snapshot, nre, png_ranking=None):
+    """
+    Gera o PDF e o XLSX de um NRE
+
+    Returns:
+        tuple: (conteúdo do PDF ou None, conteúdo do XLSX)
+    """
+    return gerar_pdf_relatorio(snapshot, nre, png_ranking), gerar_xlsx_relatorio(snapshot, nre)
+
+def _iniciar_processo_geracao(diretorio, versao):
+    """
+    Inicializa um processo de geração, mapeando dos arquivos do snapshot a
+    mesma versão dos dados usada pelo servidor
+    """
+    _SNAPSHOT_PROCESSO['snapshot'] = carregar_snapshot(diretorio, versao)
+
+def _gerar_relatorio_processo(nre, gauges, png_ranking):
+    """
+    Gera o PDF e o XLSX de um NRE (executado nos processos de geração)
+
+    Returns:
+        tuple: (nre, conteúdo do PDF ou None, conteúdo do XLSX)
+    """
+    snapshot = _SNAPSHOT_PROCESSO['snapshot']
+    if snapshot is None:
+        raise RuntimeError("Versão dos dados não encontrada no snapshot salvo")
+    return nre, gerar_pdf_relatorio(snapshot, nre, png_ranking, gauges), gerar_xlsx_relatorio(snapshot, nre)
+
+def ler_progresso():
+    """
+    Retorna o progresso da última geração de relatórios
+
+    Returns:
+        dict: status ('gerando', 'concluido' ou 'erro'), total, concluidos,
+        versao dos dados e mensagem; ou None se nunca houve geração
+    """
+    try:
+        with open(ARQUIVO_PROGRESSO, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def salvar_progresso(progresso):
+    """
+    Salva o progresso da geração (escrita atômica, para leitura por outros
+    processos)
+    """
+    temporario = f"{ARQUIVO_PROGRESSO}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(progresso, f, ensure_ascii=False)
+    os.replace(temporario, ARQUIVO_PROGRESSO)
+
+def gerar_relatorios(snapshot, num_processos=NUM_PROCESSOS_RELATORIOS, diretorio_snapshot=DIRETORIO_SNAPSHOT):
+    """
+    Gera os relatórios de todos os NREs em um pool de processos e os grava
+    em um zip (um PDF e um XLSX por NRE), atualizando o progresso a cada NRE
+    concluído
+
+    Roda numa thread do pool de tarefas pesadas. As imagens são renderizadas
+    por esta thread, nos processos renderizadores já aquecidos; os processos
+    de geração (spawn, ver contexto_processos) recebem só o nome do NRE e as
+    imagens, e carregam a versão do snapshot pelo diretório salvo.
+
+    Args:
+        snapshot: Snapshot das escolas (já salvo em diretorio_snapshot)
+        num_processos: Número máximo de processos
+        diretorio_snapshot: Diretório do snapshot (padrão: DIRETORIO_SNAPSHOT)
+
+    Returns:
+        str: Caminho do arquivo zip
+    """
+    nres = list(snapshot['nres'])
+    progresso = {
+        'status': 'gerando',
+        'total': len(nres),
+        'concluidos': 0,
+        'versao': snapshot['versao'],
+        'inicio': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+        'mensagem': '',
+    }
+    salvar_progresso(progresso)
+
+    # O ranking dos NREs é o mesmo em todos os relatórios: renderizar uma vez
+    try:
+        png_ranking = renderizar_imagem(construir_figuras(snapshot)['grafico_nres'])
+    except (ValueError, RuntimeError, TimeoutError):
+        png_ranking = None
+
+    temporario = f"{ARQUIVO_RELATORIOS}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(temporario, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip, \
+                concurrent.futures.ProcessPoolExecutor(max_workers=max(1, min(num_processos, len(nres))),
+                                                       mp_context=contexto_processos(),
+                                                       initializer=_iniciar_processo_geracao,
+                                                       initargs=(diretorio_snapshot, snapshot['versao'])) as executor:
+            # Os gauges de um NRE são renderizados enquanto os processos
+            # geram os relatórios dos anteriores
+            futuros = [executor.submit(_gerar_relatorio_processo, nre, renderizar_gauges(snapshot, nre), png_ranking)
+                       for nre in nres]
+            for futuro in concurrent.futures.as_completed(futuros):
+                nre, pdf, xlsx = futuro.result()
+                nome = nome_arquivo_nre(nre)
+                if pdf is not None:
+                    arquivo_zip.writestr(f"{nome}/relatorio_{nome}.pdf", pdf)
+                arquivo_zip.writestr(f"{nome}/relatorio_{nome}.xlsx", xlsx)
+                progresso['concluidos'] += 1
+                salvar_progresso(progresso)
+        os.replace(temporario, ARQUIVO_RELATORIOS)
+    except Exception as e:
+        progresso.update(status='erro', mensagem=str(e))
+        salvar_progresso(progresso)
+        raise
+    finally:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+
+    progresso.update(status='concluido', fim=datetime.now().strftime('%d/%m/%Y %H:%M:%S'))
+    salvar_progresso(progresso)
+    return ARQUIVO_RELATORIOS
+
+def iniciar_geracao_relatorios():
+    """
+    Inicia a geração dos relatórios em segundo plano, no pool de tarefas
+    pesadas (tipo 'relatorios'), se não houver outra em andamento
+
+    Returns:
+        bool: True se a geração foi iniciada
+    """
+    # Outro processo do servidor pode estar gerando
+    progresso = ler_progresso()
+    if progresso is not None and progresso['status'] == 'gerando' and \
+            time.time() - os.path.getmtime(ARQUIVO_PROGRESSO) < TEMPO_GERACAO_INTERROMPIDA:
+        return False
+
+    os.makedirs(DIRETORIO_RELATORIOS, exist_ok=True)
+
+    def gerar(snapshot):
+        try:
+            gerar_relatorios(snapshot)
+        except Exception as e:
+            print(f"Erro ao gerar os relatórios por NRE: {e}")
+
+    try:
+        iniciar_tarefa('relatorios', gerar, obter_snapshot())
+    except ServidorOcupado:
+        return False
+    return True
@@ -0,0 +1,211 @@
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import os
+import signal
+import threading
+from collections import OrderedDict
+from processos_auxiliares import contexto_processos
+
+# Número de processos renderizadores por processo do servidor (cada worker
+# do Gunicorn tem os seus), criados e aquecidos na inicialização do worker
+NUM_RENDERIZADORES = int(os.environ.get('RENDERIZADORES', 1))
+
+# Pedidos que podem aguardar na fila além dos que estão sendo renderizados
+TAMANHO_FILA = 8
+
+# Tempo máximo (segundos) esperando uma vaga na fila
+TEMPO_ESPERA_FILA = 2
+
+# Tempo máximo (segundos) para renderizar uma imagem
+TEMPO_LIMITE_RENDERIZACAO = 30
+
+# Número de imagens mantidas no cache
+TAMANHO_CACHE_IMAGENS = 64
+
+_RENDERIZADOR = {'executor': None}
+_VAGAS = threading.BoundedSemaphore(NUM_RENDERIZADORES + TAMANHO_FILA)
+_CACHE_IMAGENS = OrderedDict()
+_TRAVA = threading.Lock()
+
+def _reiniciar_no_filho():
+    """
+    Descarta, no processo filho de um fork, o pool e as travas herdados do
+    pai (as threads que os controlam não existem no filho)
+    """
+    global _VAGAS, _TRAVA
+    _RENDERIZADOR['executor'] = None
+    _VAGAS = threading.BoundedSemaphore(NUM_RENDERIZADORES + TAMANHO_FILA)
+    _TRAVA = threading.Lock()
+
+os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+def _aquecer_processo():
+    """
+    Inicializa um processo renderizador, gerando uma imagem pequena para que
+    o renderizador do Plotly (kaleido) já esteja de pé no primeiro pedido
+
+    O processo passa a liderar o próprio grupo de processos, junto com o
+    Chromium que o kaleido abre: um renderizador travado é encerrado com
+    todo o grupo (ver _encerrar_processos).
+    """
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    try:
+        import plotly.graph_objects as go
+        go.Figure().to_image(format='png', width=10, height=10)
+    except Exception:
+        # kaleido ausente: o erro aparece no primeiro pedido de imagem
+        pass
+
+def _renderizar(fig_json, formato, escala):
+    """
+    Renderiza uma figura serializada em JSON (executado no processo
+    renderizador)
+    """
+    import plotly.io as pio
+    return pio.from_json(fig_json).to_image(format=formato, scale=escala)
+
+def iniciar_renderizador(num_processos=NUM_RENDERIZADORES):
+    """
+    Cria (se ainda não existir) o pool de processos renderizadores e os
+    aquece em segundo plano
+
+    Chamado na inicialização de cada worker (no post_fork do Gunicorn com
+    preload_app, senão ao importar o app), para que o primeiro pedido de
+    imagem já encontre o kaleido de pé; os pedidos recriam o pool se ele
+    tiver sido descartado. Os processos são criados por spawn (ver
+    contexto_processos), nunca por fork do servidor.
+
+    Args:
+        num_processos: Número de processos (padrão: NUM_RENDERIZADORES)
+
+    Returns:
+        concurrent.futures.ProcessPoolExecutor
+    """
+    with _TRAVA:
+        if _RENDERIZADOR['executor'] is None:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=num_processos,
+                mp_context=contexto_processos(),
+                initializer=_aquecer_processo
+            )
+            # Cada tarefa vazia obriga o pool a criar um processo (e aquecê-lo)
+            for _ in range(num_processos):
+                executor.submit(int)
+            _RENDERIZADOR['executor'] = executor
+        return _RENDERIZADOR['executor']
+
+def _encerrar_processos(executor):
+    """
+    Mata os processos do pool, cada um com o seu grupo de processos (o
+    Chromium aberto pelo kaleido): um renderizador travado nunca termina
+    sozinho, e shutdown só encerra processos ociosos
+    """
+    for processo in list((executor._processes or {}).values()):
+        try:
+            os.killpg(processo.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            # Sem grupos de processos, ou o processo ainda não criou o seu
+            processo.kill()
+
+def _descartar_renderizador(executor):
+    """
+    Descarta um pool travado ou quebrado, matando os seus processos, e cria
+    outro já aquecido no lugar
+    """
+    with _TRAVA:
+        if _RENDERIZADOR['executor'] is not executor:
+            return
+        _RENDERIZADOR['executor'] = None
+    _encerrar_processos(executor)
+    executor.shutdown(wait=False, cancel_futures=True)
+    iniciar_renderizador()
+
+def chave_imagem(fig_json, formato, escala):
+    """
+    Retorna a chave de cache de uma imagem (hash da figura e do formato)
+    """
+    return hashlib.sha1(f"{formato}|{escala}|{fig_json}".encode('utf-8')).hexdigest()
+
+def renderizar_imagens(figs, formato='png', escala=2, tempo_limite=TEMPO_LIMITE_RENDERIZACAO):
+    """
+    Renderiza várias figuras Plotly em paralelo nos processos renderizadores,
+    usando o cache para as que já foram renderizadas
+
+    Args:
+        figs: Lista de figuras Plotly
+        formato: Formato das imagens (padrão: png)
+        escala: Fator de escala (padrão: 2)
+        tempo_limite: Tempo máximo de renderização em segundos
+
+    Returns:
+        list: Conteúdo de cada imagem (bytes), na ordem das figuras
+
+    Raises:
+        TimeoutError: Se a fila estiver cheia ou a renderização demorar
+            mais que o tempo limite
+    """
+    figs_json = [fig.to_json() for fig in figs]
+    chaves = [chave_imagem(fig_json, formato, escala) for fig_json in figs_json]
+
+    imagens = {}
+    with _TRAVA:
+        for chave in chaves:
+            if chave in _CACHE_IMAGENS:
+                _CACHE_IMAGENS.move_to_end(chave)
+                imagens[chave] = _CACHE_IMAGENS[chave]
+    pendentes = {chave: fig_json for chave, fig_json in zip(chaves, figs_json) if chave not in imagens}
+
+    vagas = 0
+    try:
+        for _ in pendentes:
+            if not _VAGAS.acquire(timeout=TEMPO_ESPERA_FILA):
+                raise TimeoutError("Fila de renderização de imagens cheia")
+            vagas += 1
+
+        if pendentes:
+            executor = iniciar_renderizador()
+            futuros = {chave: executor.submit(_renderizar, fig_json, formato, escala)
+                       for chave, fig_json in pendentes.items()}
+            # As figuras são renderizadas ao mesmo tempo: o prazo vale para o conjunto
+            concluidos, atrasados = concurrent.futures.wait(futuros.values(), timeout=tempo_limite)
+            if atrasados:
+                _descartar_renderizador(executor)
+                raise TimeoutError("Tempo limite de renderização da imagem excedido")
+            try:
+                for chave, futuro in futuros.items():
+                    imagens[chave] = futuro.result()
+            except BrokenProcessPool:
+                _descartar_renderizador(executor)
+                raise
+    finally:
+        for _ in range(vagas):
+            _VAGAS.release()
+
+    with _TRAVA:
+        for chave in pendentes:
+            _CACHE_IMAGENS[chave] = imagens[chave]
+        while len(_CACHE_IMAGENS) > TAMANHO_CACHE_IMAGENS:
+            _CACHE_IMAGENS.popitem(last=False)
+    return [imagens[chave] for chave in chaves]
+
+def renderizar_imagem(fig, formato='png', escala=2, tempo_limite=TEMPO_LIMITE_RENDERIZACAO):
+    """
+    Renderiza uma figura Plotly em um dos processos renderizadores, usando o
+    cache quando a mesma figura já foi renderizada
+
+    Args:
+        fig: Figura Plotly
+        formato: Formato da imagem (padrão: png)
+        escala: Fator de escala (padrão: 2)
+        tempo_limite: Tempo máximo de renderização em segundos
+
+    Returns:
+        bytes: Conteúdo da imagem
+
+    Raises:
+        TimeoutError: Se a fila estiver cheia ou a renderização demorar
+            mais que o tempo limite
+    """
+    return renderizar_imagens([fig], formato, escala, tempo_limite)[0]
@@ -0,0 +1,143 @@
+import json
+import numpy as np
+import plotly.io as pio
+
+try:
+    import orjson
+except ImportError:
+    # orjson é opcional: sem ele, usa-se o json da biblioteca padrão com o
+    # codificador do Plotly (comportamento original)
+    orjson = None
+
+# Motor de serialização: 'orjson' quando instalado, senão 'json'
+MOTOR_JSON = 'orjson' if orjson is not None else 'json'
+
+# Arrays NumPy (contíguos, de tipos numéricos) são escritos direto pelo orjson
+OPCOES_ORJSON = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+# orjson 3.9+ insere na saída, sem alterá-lo, JSON já serializado (Fragment).
+# O requirements.txt fixa uma versão com Fragment; com um orjson mais antigo
+# tudo continua funcionando, só que fragmento_json desserializa o conteúdo
+FRAGMENTOS_ORJSON = orjson is not None and hasattr(orjson, 'Fragment')
+
+# Versões do Dash (major, minor) em que as respostas dos callbacks passam por
+# dash._callback.to_json: da 2.9 (dashboard-site/requirements.txt) à 2.14
+# (requirements.txt da raiz). Fora delas o Dash não é alterado.
+VERSOES_DASH_CALLBACKS = ((2, 9), (2, 14))
+
+# Indica se as respostas dos callbacks são serializadas com para_json
+_SERIALIZACAO = {'callbacks': False}
+
+def _converter(valor):
+    """
+    Converte para tipos nativos do orjson os objetos que ele não conhece
+    (chamado pelo próprio orjson, só para esses objetos)
+    """
+    if hasattr(valor, 'to_plotly_json'):
+        # Figuras, componentes do Dash e dash.Patch
+        return valor.to_plotly_json()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if hasattr(valor, 'tolist'):
+        # Arrays não contíguos ou de texto, Series e Index do pandas
+        return valor.tolist()
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+def para_json(valor, motor=None):
+    """
+    Serializa figuras, componentes do Dash, dicionários e arrays NumPy em
+    JSON
+
+    Com orjson, os objetos do Plotly/Dash são convertidos sob demanda
+    (to_plotly_json) e os arrays NumPy são escritos sem virar listas. O
+    motor do Plotly com orjson não serve aqui: ao encontrar uma figura ou um
+    componente, ele limpa o objeto inteiro em Python e fica mais lento que o
+    json. Se o orjson não conseguir serializar algum valor, usa-se o
+    codificador original.
+
+    Args:
+        valor: Objeto a serializar
+        motor: 'orjson' ou 'json' (padrão: MOTOR_JSON)
+
+    Returns:
+        str: JSON compacto
+    """
+    if (motor or MOTOR_JSON) == 'orjson':
+        try:
+            return orjson.dumps(valor, default=_converter, option=OPCOES_ORJSON).decode('utf-8')
+        except TypeError:
+            pass
+    return pio.json.to_json_plotly(valor, engine='json')
+
+def de_json(conteudo):
+    """
+    Desserializa JSON (str ou bytes), com orjson quando disponível
+    """
+    if orjson is not None:
+        return orjson.loads(conteudo)
+    return json.loads(conteudo)
+
+def fragmento_json(conteudo):
+    """
+    Prepara JSON já serializado (bytes) para ser devolvido por um callback
+
+    Com a serialização dos callbacks instalada e orjson 3.9+, o conteúdo vai
+    para a resposta exatamente como está (orjson.Fragment), sem ser
+    desserializado nem serializado de novo. Caso contrário, o Dash precisa
+    de objetos Python, e o conteúdo é desserializado.
+
+    Args:
+        conteudo: JSON em bytes
+
+    Returns:
+        orjson.Fragment, ou o valor desserializado
+    """
+    if FRAGMENTOS_ORJSON and _SERIALIZACAO['callbacks']:
+        return orjson.Fragment(conteudo)
+    return de_json(conteudo)
+
+def versao_dash_suportada(versao):
+    """
+    Indica se a versão do Dash (ex.: '2.9.3') está em VERSOES_DASH_CALLBACKS
+    """
+    try:
+        major, minor = (int(parte) for parte in versao.split('.')[:2])
+    except ValueError:
+        return False
+    return VERSOES_DASH_CALLBACKS[0] <= (major, minor) <= VERSOES_DASH_CALLBACKS[1]
+
+def instalar_serializacao_callbacks():
+    """
+    Faz o Dash serializar as respostas dos callbacks com para_json
+
+    O Dash serializa as respostas com dash._callback.to_json (o motor JSON do
+    Plotly), que não é uma interface pública: ela só é trocada com o orjson
+    instalado, numa versão do Dash em VERSOES_DASH_CALLBACKS e se ainda for
+    a função original de dash._utils. Caso contrário o Dash fica intacto e
+    as respostas continuam com o serializador dele (fragmento_json então
+    devolve objetos Python). O layout e a configuração da página sempre usam
+    o serializador do Dash.
+
+    Returns:
+        str: Motor em uso nas respostas dos callbacks ('orjson' ou 'json')
+    """
+    if orjson is None:
+        return 'json'
+
+    import dash
+    import dash._callback
+    import dash._utils
+    if getattr(dash._callback, 'to_json', None) is para_json:
+        # Já instalada
+        return 'orjson'
+    original = getattr(dash._utils, 'to_json', None)
+    if not versao_dash_suportada(dash.__version__) or original is None \
+            or getattr(dash._callback, 'to_json', None) is not original:
+        print(f"Serialização dos callbacks com orjson desativada: Dash {dash.__version__} não suportado")
+        return 'json'
+
+    dash._callback.to_json = para_json
+    _SERIALIZACAO['callbacks'] = True
+    return 'orjson'
@@ -1,17 +1,31 @@
-from flask import Flask, render_template, redirect, url_for, send_from_directory
+from flask import Flask, render_template, redirect, url_for
 import os
 from app import app as dash_app
+from exportar_dados import registrar_rotas_exportacao
+from api_dados import registrar_rotas_api
+from compressao_http import registrar_compressao, precomprimir_estaticos, servir_estatico, CACHE_PAGINAS
 
-# Criar uma aplicação Flask
-server = Flask(__name__, static_folder='assets')
+# Criar uma aplicação Flask (os assets são servidos pela rota /assets abaixo,
+# já comprimidos)
+server = Flask(__name__, static_folder=None)
 
 # Registrar o Dash app como uma rota no Flask
 dash_app.server = server
 
+# Rotas de exportação (downloads em streaming)
+registrar_rotas_exportacao(server)
+
+# API somente leitura (/api/v1)
+registrar_rotas_api(server)
+
+# Compressão das respostas dinâmicas e arquivos estáticos já comprimidos
+registrar_compressao(server)
+precomprimir_estaticos('index.html', 'assets')
+
 @server.route('/')
 def index():
     # Rota para a página inicial estática
-    return send_from_directory('.', 'index.html')
+    return servir_estatico('.', 'index.html', cache_control=CACHE_PAGINAS)
 
 @server.route('/dashboard')
 def dashboard():
@@ -21,7 +35,7 @@ def dashboard():
 @server.route('/assets/<path:path>')
 def serve_assets(path):
     # Servir arquivos estáticos
-    return send_from_directory('assets', path)
+    return servir_estatico('assets', path)
 
 @server.route('/dash')
 def dash_app_route():
@@ -0,0 +1,839 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from busca_escolas import construir_indice_busca
+
+# Diretório onde o snapshot das escolas é salvo: um subdiretório por versão
+# dos dados (um arquivo .npy por coluna) e o arquivo atual.json, que aponta
+# para a versão publicada
+DIRETORIO_SNAPSHOT = 'dados_processados/snapshot'
+
+# Versão do formato do snapshot; snapshots salvos com outro formato são
+# ignorados e reconstruídos a partir dos CSVs
+VERSAO_FORMATO = 10
+
+# Colunas numéricas das escolas armazenadas como arrays tipados
+# (nome no snapshot -> coluna no DataFrame de escolas)
+COLUNAS_NUMERICAS = {
+    'alunos': 'Alunos',
+    'professores': 'Professores',
+    'atribuicao_esperada': 'Atribuição Esperada',
+    'questoes_respondidas': 'Questões Respondidas',
+    'questoes_corretas': 'Questões Corretas',
+    'indice_respostas': 'Índice de Respostas',
+    'percentual_acertos': 'Percentual de acertos',
+}
+
+# Colunas de contagem: guardadas como float64 (podem ter lacunas), mas
+# devolvidas como inteiros quando completas
+COLUNAS_CONTAGEM = {'alunos', 'professores', 'atribuicao_esperada', 'questoes_respondidas', 'questoes_corretas'}
+
+# Colunas somadas pelo motor de agregação (têm somas acumuladas no snapshot)
+COLUNAS_SOMA = ('alunos', 'professores', 'atribuicao_esperada', 'questoes_respondidas', 'questoes_corretas')
+
+# Colunas de ranking calculadas na ingestão (nome no snapshot -> coluna exibida)
+COLUNAS_RANKING = {
+    'posicao_nre': 'Posição no NRE',
+    'posicao_estado': 'Posição no Estado',
+    'percentil_nre': 'Percentil no NRE',
+    'percentil_estado': 'Percentil no Estado',
+}
+
+# Tipos das colunas da tabela de origem das escolas, guardados no snapshot
+# para remontá-la com os mesmos tipos (ver dataframe_origem)
+TIPOS_ORIGEM = ('inteiro', 'numero', 'texto')
+
+# Separador entre NRE e escola nas chaves estáveis das escolas usadas no
+# navegador (ver visoes_dashboard.chaves_escolas)
+SEPARADOR_CHAVE = '\t'
+
+# Número de faixas (de mesma largura, entre 0% e 100%) dos histogramas por NRE
+FAIXAS_HISTOGRAMA = 20
+
+# Quantidade de escolas nas listas de atenção (piores desempenhos) por NRE
+ESCOLAS_ATENCAO = 5
+
+# Snapshot publicado neste processo e o mtime do meta.json de onde veio
+_SNAPSHOT_PUBLICADO = {'snapshot': None, 'mtime': None}
+
+# DataFrames de NREs derivados do snapshot, por versão dos dados
+_CACHE_NRES = {}
+_TRAVA = threading.Lock()
+
+def _reiniciar_no_filho():
+    """
+    Recria, no processo filho de um fork, a trava herdada do pai
+    """
+    global _TRAVA
+    _TRAVA = threading.Lock()
+
+os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+def construir_snapshot(df_escolas, semanas_atuais=None, questoes_por_semana=None, anterior=None):
+    """
+    Constrói o snapshot colunar das escolas a partir do DataFrame processado
+
+    As escolas são ordenadas por NRE (ordem estável) e os limites de cada NRE
+    ficam em `offsets`: as escolas do NRE i ocupam o intervalo
+    offsets[i]:offsets[i+1] de todos os arrays.
+
+    Args:
+        df_escolas: DataFrame com os dados das escolas
+        semanas_atuais: Semanas usadas na Atribuição Esperada (opcional)
+        questoes_por_semana: Questões por semana usadas na Atribuição Esperada (opcional)
+        anterior: Snapshot da semana anterior, para as variações (opcional)
+
+    Returns:
+        dict: Snapshot com os arrays por escola e os metadados
+    """
+    df = df_escolas.dropna(subset=['NRE']).sort_values(by='NRE', kind='mergesort')
+
+    nres = sorted(df['NRE'].unique())
+    nre_codigo = np.searchsorted(np.array(nres, dtype=str), df['NRE'].to_numpy(dtype=str)).astype(np.int32)
+    offsets = np.searchsorted(nre_codigo, np.arange(len(nres) + 1)).astype(np.int64)
+
+    snapshot = {
+        'nres': list(nres),
+        'offsets': offsets,
+        'nre_codigo': nre_codigo,
+        'escola': df['Escola'].to_numpy(dtype=str),
+        'semanas_atuais': semanas_atuais,
+        'questoes_por_semana': questoes_por_semana,
+    }
+    for nome, coluna in COLUNAS_NUMERICAS.items():
+        snapshot[nome] = pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype=np.float64)
+
+    snapshot.update(construir_colunas_origem(df))
+    atualizar_somas_acumuladas(snapshot)
+    snapshot.update(construir_hierarquia(snapshot))
+    snapshot.update(construir_rankings(snapshot))
+    snapshot.update(construir_indice_busca(snapshot['escola']))
+    snapshot.update(construir_semana_anterior(snapshot, anterior))
+    snapshot.update(construir_histogramas(snapshot))
+    snapshot['versao'] = calcular_versao(snapshot)
+
+    return snapshot
+
+def tipo_coluna_origem(serie):
+    """
+    Retorna o tipo (um de TIPOS_ORIGEM) de uma coluna da tabela de origem
+    """
+    if pd.api.types.is_bool_dtype(serie) or not pd.api.types.is_numeric_dtype(serie):
+        return 'texto'
+    return 'inteiro' if pd.api.types.is_integer_dtype(serie) else 'numero'
+
+def construir_colunas_origem(df):
+    """
+    Guarda no snapshot as colunas da tabela de origem das escolas que não
+    têm array próprio (ex.: município), com a ordem e o tipo de todas as
+    colunas, para que as exportações tenham exatamente as colunas da tabela
+    processada
+
+    Colunas numéricas viram float64 e as demais, texto de largura fixa
+    (vazio para valores ausentes), ambas mapeáveis do disco.
+
+    Args:
+        df: DataFrame das escolas, já na ordem do snapshot
+
+    Returns:
+        dict: 'colunas_origem', 'tipos_origem' e um array 'origem_<i>' por
+        coluna sem array próprio (i é a posição da coluna)
+    """
+    proprias = {'NRE', 'Escola', *COLUNAS_NUMERICAS.values()}
+    resultado = {
+        'colunas_origem': [str(coluna) for coluna in df.columns],
+        'tipos_origem': [tipo_coluna_origem(df[coluna]) for coluna in df.columns],
+    }
+    for i, (coluna, tipo) in enumerate(zip(df.columns, resultado['tipos_origem'])):
+        if coluna in proprias:
+            continue
+        if tipo == 'texto':
+            resultado[f"origem_{i}"] = df[coluna].fillna('').astype(str).to_numpy(dtype=str)
+        else:
+            resultado[f"origem_{i}"] = df[coluna].to_numpy(dtype=np.float64)
+    return resultado
+
+def atualizar_somas_acumuladas(snapshot, colunas=COLUNAS_SOMA):
+    """
+    Recalcula as somas acumuladas das colunas: a soma das escolas i:j de uma
+    coluna é acumulado[j] - acumulado[i], então qualquer NRE custa O(1)
+    """
+    for nome in colunas:
+        snapshot[f"acumulado_{nome}"] = np.concatenate(([0.0], np.cumsum(np.nan_to_num(snapshot[nome]))))
+
+def calcular_versao(snapshot):
+    """
+    Calcula a versão dos dados: hash do conteúdo dos arrays e dos parâmetros
+    da Atribuição Esperada
+    """
+    hash_dados = hashlib.sha1()
+    hash_dados.update(f"{snapshot.get('semanas_atuais')}/{snapshot.get('questoes_por_semana')}".encode('utf-8'))
+    for nome, valor in sorted(snapshot.items()):
+        if isinstance(valor, np.ndarray):
+            hash_dados.update(nome.encode('utf-8'))
+            hash_dados.update(valor.tobytes())
+    return hash_dados.hexdigest()[:12]
+
+def reescalar_atribuicao(snapshot, semanas_atuais, questoes_por_semana):
+    """
+    Recalcula a Atribuição Esperada (Alunos × questões_por_semana ×
+    semanas_atuais) e o Índice de Respostas de todas as escolas, sem reler
+    nenhuma planilha
+
+    Só as colunas que dependem da atribuição mudam; hierarquia, rankings e
+    índice de busca são reaproveitados.
+
+    Args:
+        snapshot: Snapshot atual
+        semanas_atuais: Novo número de semanas
+        questoes_por_semana: Novo número de questões por semana
+
+    Returns:
+        dict: Novo snapshot (o original não é alterado)
+    """
+    novo = dict(snapshot)
+    novo['semanas_atuais'] = semanas_atuais
+    novo['questoes_por_semana'] = questoes_por_semana
+
+    novo['atribuicao_esperada'] = snapshot['alunos'] * (questoes_por_semana * semanas_atuais)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        novo['indice_respostas'] = snapshot['questoes_respondidas'] / novo['atribuicao_esperada']
+    atualizar_somas_acumuladas(novo, ('atribuicao_esperada',))
+    novo.update(construir_histogramas(novo, colunas=('indice_respostas',)))
+    novo['versao'] = calcular_versao(novo)
+
+    return novo
+
+def congelar_snapshot(snapshot):
+    """
+    Marca os arrays do snapshot como somente-leitura. Um snapshot publicado
+    nunca é alterado (novas versões são novos dicionários), e arrays que
+    ninguém escreve continuam compartilhados entre os workers criados por
+    fork após o preload.
+
+    Args:
+        snapshot: Snapshot a congelar
+
+    Returns:
+        dict: O próprio snapshot
+    """
+    for valor in snapshot.values():
+        if isinstance(valor, np.ndarray):
+            valor.flags.writeable = False
+    return snapshot
+
+def obter_snapshot(diretorio=DIRETORIO_SNAPSHOT):
+    """
+    Retorna o snapshot publicado, trocando para a nova versão quando o
+    atual.json mudou (por exemplo, após uma ingestão feita por outro
+    processo). A versão anterior é liberada quando deixa de ser usada.
+
+    Args:
+        diretorio: Diretório do snapshot (padrão: DIRETORIO_SNAPSHOT)
+
+    Returns:
+        dict: Snapshot atual, ou None se ainda não houver nenhum
+    """
+    try:
+        mtime = os.stat(os.path.join(diretorio, 'atual.json')).st_mtime_ns
+    except OSError:
+        return _SNAPSHOT_PUBLICADO['snapshot']
+
+    if mtime != _SNAPSHOT_PUBLICADO['mtime']:
+        snapshot = carregar_snapshot(diretorio)
+        if snapshot is not None:
+            _SNAPSHOT_PUBLICADO['snapshot'] = congelar_snapshot(snapshot)
+            _SNAPSHOT_PUBLICADO['mtime'] = mtime
+    return _SNAPSHOT_PUBLICADO['snapshot']
+
+def publicar_snapshot(snapshot, diretorio=DIRETORIO_SNAPSHOT):
+    """
+    Salva o snapshot e passa a usá-lo imediatamente neste processo, já
+    mapeado dos arquivos salvos (a mesma cópia usada pelos outros processos)
+
+    Args:
+        snapshot: Snapshot a publicar
+        diretorio: Diretório do snapshot (padrão: DIRETORIO_SNAPSHOT)
+    """
+    salvar_snapshot(snapshot, diretorio)
+    _SNAPSHOT_PUBLICADO['snapshot'] = congelar_snapshot(carregar_snapshot(diretorio) or snapshot)
+    _SNAPSHOT_PUBLICADO['mtime'] = os.stat(os.path.join(diretorio, 'atual.json')).st_mtime_ns
+
+def dataframe_nres(snapshot):
+    """
+    Monta o DataFrame de métricas por NRE a partir do snapshot, ordenado por
+    percentual de acertos (calculado uma vez por versão dos dados)
+
+    Args:
+        snapshot: Snapshot das escolas
+
+    Returns:
+        DataFrame com as mesmas colunas de nre_metricas.csv
+    """
+    versao = snapshot['versao']
+    df = _CACHE_NRES.get(versao)
+    if df is None:
+        totais = agregar_por_nre(snapshot, snapshot['nres'])
+        for nome in COLUNAS_SOMA:
+            totais[nome] = np.rint(totais[nome]).astype(np.int64)
+        df = pd.DataFrame({
+            'NRE': snapshot['nres'],
+            'Alunos': totais['alunos'],
+            'Atribuição Esperada': totais['atribuicao_esperada'],
+            'Questões Respondidas': totais['questoes_respondidas'],
+            'Questões Corretas': totais['questoes_corretas'],
+            'Professores': totais['professores'],
+            'Número de Escolas': totais['num_escolas'],
+            'Índice de Respostas': totais['indice_respostas'],
+            'Percentual de acertos': totais['percentual_acertos'],
+        })
+        df = df.sort_values(by='Percentual de acertos', ascending=False).reset_index(drop=True)
+
+        # Outra thread pode estar trocando o cache para outra versão: o
+        # resultado desta chamada é o próprio df, não a entrada do cache
+        with _TRAVA:
+            _CACHE_NRES.clear()
+            _CACHE_NRES[versao] = df
+    return df
+
+def somar_por_nre(valores, offsets):
+    """
+    Soma um array por escola dentro de cada NRE, usando os offsets do snapshot
+
+    Args:
+        valores: Array por escola (NaN é tratado como zero)
+        offsets: Limites de cada NRE nos arrays do snapshot
+
+    Returns:
+        numpy.ndarray: Soma por NRE
+    """
+    acumulado = np.concatenate(([0.0], np.cumsum(np.nan_to_num(valores))))
+    return acumulado[offsets[1:]] - acumulado[offsets[:-1]]
+
+def _indicadores(totais):
+    """
+    Completa um dicionário de somas com o Índice de Respostas e o Percentual
+    de acertos (NaN quando o denominador é zero)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        totais['indice_respostas'] = np.divide(totais['questoes_respondidas'], totais['atribuicao_esperada'])
+        totais['percentual_acertos'] = np.divide(totais['questoes_corretas'], totais['questoes_respondidas'])
+    return totais
+
+def codigos_nres(snapshot, nres):
+    """
+    Converte nomes de NRE nos seus códigos (posições em snapshot['nres'])
+    """
+    posicoes = {nre: i for i, nre in enumerate(snapshot['nres'])}
+    return np.array([posicoes[nre] for nre in nres], dtype=np.int64)
+
+def agregar_por_nre(snapshot, nres):
+    """
+    Soma as colunas de cada NRE informado, usando as somas acumuladas
+
+    Args:
+        snapshot: Snapshot das escolas
+        nres: Lista de nomes de NRE
+
+    Returns:
+        dict: Arrays (um valor por NRE) com as somas, o número de escolas e os
+        indicadores
+    """
+    codigos = codigos_nres(snapshot, nres)
+    inicios = snapshot['offsets'][codigos]
+    fins = snapshot['offsets'][codigos + 1]
+
+    totais = {nome: snapshot[f"acumulado_{nome}"][fins] - snapshot[f"acumulado_{nome}"][inicios] for nome in COLUNAS_SOMA}
+    totais['num_escolas'] = fins - inicios
+    return _indicadores(totais)
+
+def agregar_selecao(snapshot, nres=(), escolas=()):
+    """
+    Soma qualquer conjunto de NREs e escolas como uma única seleção
+
+    Cada NRE custa O(1) (somas acumuladas) e as escolas avulsas são somadas
+    de forma vetorizada; escolas que já pertencem a um NRE selecionado não
+    são contadas duas vezes.
+
+    Args:
+        snapshot: Snapshot das escolas
+        nres: Nomes dos NREs selecionados
+        escolas: Índices (no snapshot) das escolas selecionadas
+
+    Returns:
+        dict: Somas, número de escolas e indicadores da seleção
+    """
+    codigos = np.unique(codigos_nres(snapshot, nres))
+    inicios = snapshot['offsets'][codigos]
+    fins = snapshot['offsets'][codigos + 1]
+
+    escolas = np.unique(np.asarray(escolas, dtype=np.int64))
+    escolas = escolas[~np.isin(snapshot['nre_codigo'][escolas], codigos)]
+
+    totais = {}
+    for nome in COLUNAS_SOMA:
+        acumulado = snapshot[f"acumulado_{nome}"]
+        totais[nome] = float((acumulado[fins] - acumulado[inicios]).sum() + np.nansum(snapshot[nome][escolas]))
+    totais['num_escolas'] = int((fins - inicios).sum() + len(escolas))
+    return _indicadores(totais)
+
+def construir_semana_anterior(snapshot, anterior):
+    """
+    Alinha os indicadores do snapshot anterior (semana passada) ao snapshot
+    atual, para o estado, cada NRE e cada escola, de modo que a variação
+    semanal seja uma simples consulta por índice
+
+    Escolas e NREs que não existiam no snapshot anterior ficam com NaN.
+
+    Args:
+        snapshot: Snapshot atual (com os arrays por escola)
+        anterior: Snapshot anterior, ou None
+
+    Returns:
+        dict: Arrays 'anterior_*' e os indicadores anteriores do estado
+    """
+    num_escolas = len(snapshot['escola'])
+    num_nres = len(snapshot['nres'])
+
+    if anterior is None:
+        vazio_escolas = np.full(num_escolas, np.nan)
+        vazio_nres = np.full(num_nres, np.nan)
+        return {
+            'anterior_indice_respostas': vazio_escolas,
+            'anterior_percentual_acertos': vazio_escolas.copy(),
+            'anterior_nre_indice_respostas': vazio_nres,
+            'anterior_nre_percentual_acertos': vazio_nres.copy(),
+            'anterior_estado_indice_respostas': None,
+            'anterior_estado_percentual_acertos': None,
+        }
+
+    # Escolas: casar pelo par (NRE, Escola)
+    def chaves(s):
+        return pd.Index(np.char.add(np.char.add(np.array(s['nres'], dtype=str)[s['nre_codigo']], '|'), s['escola']))
+
+    posicoes = chaves(anterior).get_indexer(chaves(snapshot))
+    encontradas = posicoes >= 0
+
+    def alinhar(valores, posicoes, encontradas):
+        alinhados = np.full(len(posicoes), np.nan)
+        alinhados[encontradas] = valores[posicoes[encontradas]]
+        return alinhados
+
+    # NREs: casar pelo nome
+    posicoes_nre = pd.Index(anterior['nres']).get_indexer(snapshot['nres'])
+    nres_encontrados = posicoes_nre >= 0
+    totais_nre = agregar_por_nre(anterior, anterior['nres'])
+    totais_estado = agregar_selecao(anterior, anterior['nres'])
+
+    return {
+        'anterior_indice_respostas': alinhar(anterior['indice_respostas'], posicoes, encontradas),
+        'anterior_percentual_acertos': alinhar(anterior['percentual_acertos'], posicoes, encontradas),
+        'anterior_nre_indice_respostas': alinhar(totais_nre['indice_respostas'], posicoes_nre, nres_encontrados),
+        'anterior_nre_percentual_acertos': alinhar(totais_nre['percentual_acertos'], posicoes_nre, nres_encontrados),
+        'anterior_estado_indice_respostas': float(totais_estado['indice_respostas']),
+        'anterior_estado_percentual_acertos': float(totais_estado['percentual_acertos']),
+    }
+
+def indicadores_anteriores(snapshot, nre=None, escolas=None):
+    """
+    Retorna os indicadores da semana anterior para o estado, um NRE ou uma
+    escola (consulta O(1) nos arrays alinhados)
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: Nome do NRE (opcional)
+        escolas: Índices das escolas; usado quando há exatamente uma (opcional)
+
+    Returns:
+        tuple: (índice de respostas, percentual de acertos) anteriores; None
+        quando não há valor anterior
+    """
+    def valor(v):
+        return None if v is None or np.isnan(v) else float(v)
+
+    if escolas is not None and len(escolas) == 1:
+        i = escolas[0]
+        return valor(snapshot['anterior_indice_respostas'][i]), valor(snapshot['anterior_percentual_acertos'][i])
+    if nre is not None:
+        i = snapshot['nres'].index(nre)
+        return valor(snapshot['anterior_nre_indice_respostas'][i]), valor(snapshot['anterior_nre_percentual_acertos'][i])
+    return valor(snapshot['anterior_estado_indice_respostas']), valor(snapshot['anterior_estado_percentual_acertos'])
+
+def construir_histogramas(snapshot, colunas=('percentual_acertos', 'indice_respostas')):
+    """
+    Calcula, em uma única passada agrupada por coluna, o histograma de
+    escolas por faixa de valor para cada NRE e para o estado
+
+    Cada escola cai na faixa floor(valor * FAIXAS_HISTOGRAMA) (valores acima de
+    100% ficam na última); a contagem por (NRE, faixa) sai de um único
+    np.bincount sobre nre_codigo * FAIXAS_HISTOGRAMA + faixa. Escolas sem
+    valor são ignoradas.
+
+    Args:
+        snapshot: Snapshot com os arrays por escola
+        colunas: Colunas a histogramar (padrão: acertos e índice de respostas)
+
+    Returns:
+        dict: Bordas das faixas e, por coluna, as contagens por NRE
+        (num_nres x FAIXAS_HISTOGRAMA) e do estado
+    """
+    num_nres = len(snapshot['nres'])
+    resultado = {'histograma_bordas': np.linspace(0.0, 1.0, FAIXAS_HISTOGRAMA + 1)}
+
+    for nome in colunas:
+        valores = snapshot[nome]
+        validos = ~np.isnan(valores)
+        faixas = np.clip(np.floor(valores[validos] * FAIXAS_HISTOGRAMA), 0, FAIXAS_HISTOGRAMA - 1).astype(np.int64)
+        chaves = snapshot['nre_codigo'][validos].astype(np.int64) * FAIXAS_HISTOGRAMA + faixas
+        contagens = np.bincount(chaves, minlength=num_nres * FAIXAS_HISTOGRAMA).reshape(num_nres, FAIXAS_HISTOGRAMA)
+
+        resultado[f"histograma_{nome}"] = contagens
+        resultado[f"histograma_{nome}_estado"] = contagens.sum(axis=0)
+
+    return resultado
+
+def histograma(snapshot, nome, nre=None):
+    """
+    Retorna as contagens por faixa de uma coluna para um NRE ou o estado
+
+    Args:
+        snapshot: Snapshot das escolas
+        nome: 'percentual_acertos' ou 'indice_respostas'
+        nre: Nome do NRE (padrão: estado inteiro)
+
+    Returns:
+        numpy.ndarray: FAIXAS_HISTOGRAMA contagens
+    """
+    if nre is None:
+        return snapshot[f"histograma_{nome}_estado"]
+    return snapshot[f"histograma_{nome}"][snapshot['nres'].index(nre)]
+
+def construir_hierarquia(snapshot):
+    """
+    Pré-calcula a hierarquia Estado -> NRE -> Escola usada pelos gráficos
+    sunburst/treemap (ids, rótulos, pais, alunos e percentual de acertos)
+
+    Args:
+        snapshot: Snapshot com os arrays por escola e os offsets
+
+    Returns:
+        dict: Arrays 'hierarquia_*', na ordem estado, NREs, escolas
+    """
+    offsets = snapshot['offsets']
+    nres = snapshot['nres']
+    num_escolas = len(snapshot['escola'])
+
+    alunos_nre = somar_por_nre(snapshot['alunos'], offsets)
+    respondidas_nre = somar_por_nre(snapshot['questoes_respondidas'], offsets)
+    corretas_nre = somar_por_nre(snapshot['questoes_corretas'], offsets)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acertos_nre = corretas_nre / respondidas_nre
+        acertos_estado = corretas_nre.sum() / respondidas_nre.sum()
+
+    ids_nre = np.array([f"nre-{i}" for i in range(len(nres))], dtype=str)
+    ids_escola = np.char.add('escola-', np.arange(num_escolas).astype(str))
+
+    return {
+        'hierarquia_ids': np.concatenate((['estado'], ids_nre, ids_escola)).astype(str),
+        'hierarquia_rotulos': np.concatenate((['Paraná'], np.array(nres, dtype=str), snapshot['escola'])).astype(str),
+        'hierarquia_pais': np.concatenate(([''], np.full(len(nres), 'estado'), ids_nre[snapshot['nre_codigo']])).astype(str),
+        'hierarquia_alunos': np.concatenate(([alunos_nre.sum()], alunos_nre, np.nan_to_num(snapshot['alunos']))),
+        'hierarquia_acertos': np.concatenate(([acertos_estado], acertos_nre, snapshot['percentual_acertos'])),
+    }
+
+def construir_rankings(snapshot):
+    """
+    Calcula a posição e o percentil de cada escola (pelo Percentual de
+    acertos) dentro do seu NRE e no estado, além das listas de atenção com as
+    piores escolas de cada NRE
+
+    As ordens ficam prontas no snapshot: as k melhores escolas de um NRE são
+    ordem_nre[offsets[i]:offsets[i] + k], sem ordenar nada por requisição.
+    Escolas sem percentual de acertos ficam no fim das ordens.
+
+    Args:
+        snapshot: Snapshot com os arrays por escola e os offsets
+
+    Returns:
+        dict: Arrays de posição, percentil, ordens e listas de atenção
+    """
+    offsets = snapshot['offsets']
+    nre_codigo = snapshot['nre_codigo']
+    num_escolas = len(nre_codigo)
+    acertos = np.where(np.isnan(snapshot['percentual_acertos']), -np.inf, snapshot['percentual_acertos'])
+
+    # Ranking agrupado: ordenar por NRE e, dentro do NRE, por acertos decrescente
+    ordem_nre = np.lexsort((-acertos, nre_codigo)).astype(np.int64)
+    posicao_nre = np.empty(num_escolas, dtype=np.int32)
+    posicao_nre[ordem_nre] = np.arange(num_escolas) - offsets[nre_codigo[ordem_nre]] + 1
+
+    ordem_estado = np.argsort(-acertos, kind='stable').astype(np.int64)
+    posicao_estado = np.empty(num_escolas, dtype=np.int32)
+    posicao_estado[ordem_estado] = np.arange(1, num_escolas + 1)
+
+    escolas_no_nre = np.diff(offsets)[nre_codigo]
+    percentil_nre = 1.0 - (posicao_nre - 1) / escolas_no_nre
+    percentil_estado = 1.0 - (posicao_estado - 1) / max(num_escolas, 1)
+
+    # Listas de atenção: as ESCOLAS_ATENCAO piores de cada NRE (argpartition
+    # dentro de cada fatia, ordenando apenas os k selecionados)
+    atencao = []
+    atencao_offsets = [0]
+    for i in range(len(offsets) - 1):
+        inicio, fim = offsets[i], offsets[i + 1]
+        valores = acertos[inicio:fim]
+        k = min(ESCOLAS_ATENCAO, fim - inicio)
+        if k > 0:
+            piores = np.argpartition(valores, k - 1)[:k]
+            atencao.append(piores[np.argsort(valores[piores], kind='stable')] + inicio)
+        atencao_offsets.append(atencao_offsets[-1] + k)
+
+    k = min(ESCOLAS_ATENCAO, num_escolas)
+    piores_estado = np.argpartition(acertos, k - 1)[:k] if k > 0 else np.array([], dtype=np.int64)
+
+    return {
+        'posicao_nre': posicao_nre,
+        'posicao_estado': posicao_estado,
+        'percentil_nre': percentil_nre,
+        'percentil_estado': percentil_estado,
+        'ordem_nre': ordem_nre,
+        'ordem_estado': ordem_estado,
+        'atencao': np.concatenate(atencao).astype(np.int64) if atencao else np.array([], dtype=np.int64),
+        'atencao_offsets': np.array(atencao_offsets, dtype=np.int64),
+        'atencao_estado': piores_estado[np.argsort(acertos[piores_estado], kind='stable')].astype(np.int64),
+    }
+
+def melhores_escolas(snapshot, nre=None, k=20):
+    """
+    Retorna os índices das k escolas com maior percentual de acertos, no
+    estado ou em um NRE, a partir das ordens pré-calculadas
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: Nome do NRE (padrão: estado inteiro)
+        k: Quantidade de escolas (None para todas)
+
+    Returns:
+        numpy.ndarray: Índices das escolas, da melhor para a pior
+    """
+    if nre is None:
+        return snapshot['ordem_estado'][:k]
+
+    i = snapshot['nres'].index(nre)
+    inicio, fim = snapshot['offsets'][i], snapshot['offsets'][i + 1]
+    if k is not None:
+        fim = min(fim, inicio + k)
+    return snapshot['ordem_nre'][inicio:fim]
+
+def escolas_atencao(snapshot, nre=None):
+    """
+    Retorna os índices das escolas com pior percentual de acertos (lista de
+    atenção) no estado ou em um NRE
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: Nome do NRE (padrão: estado inteiro)
+
+    Returns:
+        numpy.ndarray: Índices das escolas, da pior para a melhor
+    """
+    if nre is None:
+        return snapshot['atencao_estado']
+
+    i = snapshot['nres'].index(nre)
+    return snapshot['atencao'][snapshot['atencao_offsets'][i]:snapshot['atencao_offsets'][i + 1]]
+
+def salvar_snapshot(snapshot, diretorio=DIRETORIO_SNAPSHOT):
+    """
+    Salva o snapshot em disco e o torna a versão atual
+
+    Cada versão fica em um subdiretório próprio (cada array em um arquivo
+    .npy e os demais campos em meta.json) que nunca é reescrito: os arquivos
+    podem estar mapeados na memória de outros processos. A troca de versão é
+    a substituição atômica do atual.json; só a versão atual e a anterior são
+    mantidas.
+
+    Args:
+        snapshot: Snapshot criado por construir_snapshot
+        diretorio: Diretório de destino (padrão: DIRETORIO_SNAPSHOT)
+    """
+    versao = snapshot['versao']
+    destino = os.path.join(diretorio, versao)
+
+    # Uma versão já salva tem exatamente o mesmo conteúdo (a versão é o hash)
+    if not os.path.exists(os.path.join(destino, 'meta.json')):
+        os.makedirs(destino, exist_ok=True)
+        meta = {'formato': VERSAO_FORMATO, 'arrays': []}
+        for nome, valor in snapshot.items():
+            if isinstance(valor, np.ndarray):
+                np.save(os.path.join(destino, f"{nome}.npy"), valor, allow_pickle=False)
+                meta['arrays'].append(nome)
+            else:
+                meta[nome] = valor
+
+        # O meta.json é escrito por último: uma versão só é considerada
+        # completa depois que todos os arrays foram salvos
+        with open(os.path.join(destino, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    anterior = ler_versao_atual(diretorio)
+    temporario = os.path.join(diretorio, f".atual.{os.getpid()}.json")
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'formato': VERSAO_FORMATO, 'versao': versao}, f)
+    os.replace(temporario, os.path.join(diretorio, 'atual.json'))
+
+    remover_versoes_antigas(diretorio, manter={versao, anterior})
+
+def ler_versao_atual(diretorio=DIRETORIO_SNAPSHOT):
+    """
+    Retorna a versão apontada pelo atual.json, ou None se não houver uma
+    versão no formato atual
+    """
+    try:
+        with open(os.path.join(diretorio, 'atual.json'), 'r', encoding='utf-8') as f:
+            atual = json.load(f)
+        return atual['versao'] if atual.get('formato') == VERSAO_FORMATO else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+def data_publicacao(diretorio=DIRETORIO_SNAPSHOT):
+    """
+    Retorna quando a versão atual do snapshot foi publicada (data do
+    atual.json), ou None se ainda não houver nenhuma
+    """
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(os.path.join(diretorio, 'atual.json')))
+    except OSError:
+        return None
+
+def remover_versoes_antigas(diretorio=DIRETORIO_SNAPSHOT, manter=()):
+    """
+    Remove as versões do snapshot que não estão em manter (e os arquivos de
+    formatos antigos). Processos que ainda tenham uma versão removida
+    mapeada continuam lendo-a até trocar de versão.
+
+    Args:
+        diretorio: Diretório do snapshot (padrão: DIRETORIO_SNAPSHOT)
+        manter: Versões a manter
+    """
+    for nome in os.listdir(diretorio):
+        if nome in manter or nome == 'atual.json' or nome.startswith('.'):
+            continue
+        caminho = os.path.join(diretorio, nome)
+        if os.path.isdir(caminho):
+            shutil.rmtree(caminho, ignore_errors=True)
+        else:
+            os.unlink(caminho)
+
+def carregar_snapshot(diretorio=DIRETORIO_SNAPSHOT, versao=None):
+    """
+    Carrega uma versão do snapshot salvo por salvar_snapshot (a atual, se
+    nenhuma for indicada)
+
+    Os arrays são mapeados dos arquivos .npy (somente leitura), não copiados:
+    todos os processos que carregam a mesma versão usam as mesmas páginas do
+    cache de arquivos do sistema, ou seja, uma única cópia física dos dados.
+    As colunas de texto têm largura fixa, então também são mapeadas.
+
+    Args:
+        diretorio: Diretório do snapshot (padrão: DIRETORIO_SNAPSHOT)
+        versao: Versão a carregar (padrão: a apontada pelo atual.json)
+
+    Returns:
+        dict: Snapshot carregado, ou None se não existir ou estiver incompleto
+    """
+    if versao is None:
+        versao = ler_versao_atual(diretorio)
+    if versao is None:
+        return None
+    origem = os.path.join(diretorio, versao)
+
+    try:
+        with open(os.path.join(origem, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('formato') != VERSAO_FORMATO:
+            return None
+
+        snapshot = {nome: valor for nome, valor in meta.items() if nome not in ('formato', 'arrays')}
+        for nome in meta['arrays']:
+            caminho = os.path.join(origem, f"{nome}.npy")
+            try:
+                snapshot[nome] = np.load(caminho, mmap_mode='r', allow_pickle=False)
+            except ValueError:
+                # Arrays vazios não podem ser mapeados
+                snapshot[nome] = np.load(caminho, allow_pickle=False)
+        return snapshot
+    except (OSError, ValueError, KeyError):
+        return None
+
+def dataframe_origem(snapshot, indices=None):
+    """
+    Remonta a tabela de origem das escolas (as colunas e os tipos de
+    escolas_metricas.csv) a partir dos arrays do snapshot, na ordem do
+    snapshot (escolas agrupadas por NRE)
+
+    Args:
+        snapshot: Snapshot das escolas
+        indices: Índices das escolas a incluir (padrão: todas)
+
+    Returns:
+        DataFrame com as colunas da tabela processada
+    """
+    if indices is None:
+        indices = slice(None)
+
+    arrays = {coluna: nome for nome, coluna in COLUNAS_NUMERICAS.items()}
+    nres = np.array(snapshot['nres'], dtype=object)
+    dados = {}
+    for i, (coluna, tipo) in enumerate(zip(snapshot['colunas_origem'], snapshot['tipos_origem'])):
+        if coluna == 'NRE':
+            valores = nres[snapshot['nre_codigo'][indices]]
+        elif coluna == 'Escola':
+            valores = snapshot['escola'][indices]
+        else:
+            valores = snapshot[arrays.get(coluna, f"origem_{i}")][indices]
+            if tipo == 'texto':
+                valores = np.where(valores == '', None, valores.astype(object))
+            elif tipo == 'inteiro' and not np.isnan(valores).any():
+                valores = valores.astype(np.int64)
+        dados[coluna] = valores
+    return pd.DataFrame(dados, columns=snapshot['colunas_origem'])
+
+def dataframe_escolas(snapshot, indices=None):
+    """
+    Monta um DataFrame de escolas (com os nomes de coluna originais) a partir
+    do snapshot
+
+    Args:
+        snapshot: Snapshot das escolas
+        indices: Índices das escolas a incluir (padrão: todas)
+
+    Returns:
+        DataFrame com as colunas NRE, Escola e as colunas numéricas
+    """
+    if indices is None:
+        indices = slice(None)
+
+    nres = np.array(snapshot['nres'], dtype=object)
+    dados = {
+        'NRE': nres[snapshot['nre_codigo'][indices]],
+        'Escola': snapshot['escola'][indices],
+    }
+    for nome, coluna in COLUNAS_NUMERICAS.items():
+        valores = snapshot[nome][indices]
+        if nome in COLUNAS_CONTAGEM and not np.isnan(valores).any():
+            valores = valores.astype(np.int64)
+        dados[coluna] = valores
+    for nome, coluna in COLUNAS_RANKING.items():
+        if nome in snapshot:
+            dados[coluna] = snapshot[nome][indices]
+    if 'anterior_percentual_acertos' in snapshot:
+        dados['Variação de acertos'] = snapshot['percentual_acertos'][indices] - snapshot['anterior_percentual_acertos'][indices]
+
+    return pd.DataFrame(dados)
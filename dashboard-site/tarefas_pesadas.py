@@ -0,0 +1,132 @@
+import concurrent.futures
+import os
+import threading
+
+# Limites por tipo de tarefa pesada: quantas rodam ao mesmo tempo e quantas
+# podem esperar na fila; além disso o pedido é recusado na hora
+LIMITES_TAREFAS = {
+    'imagem': {'simultaneas': 2, 'fila': 2},
+    'pdf': {'simultaneas': 1, 'fila': 1},
+    'atualizacao': {'simultaneas': 1, 'fila': 0},
+    'upload': {'simultaneas': 1, 'fila': 1},
+    'pacote': {'simultaneas': 1, 'fila': 1},
+    'relatorios': {'simultaneas': 1, 'fila': 0},
+}
+
+# Threads de atendimento por worker do Gunicorn (mesma variável e mesmo
+# padrão do gunicorn.conf.py)
+THREADS_POR_WORKER = int(os.environ.get('GUNICORN_THREADS', 2))
+
+# Máximo de pedidos esperando tarefas pesadas ao mesmo tempo por processo,
+# somando todos os tipos e contando os que ainda estão na fila. Cada um
+# prende uma thread de atendimento até o resultado: o padrão deixa sempre
+# uma thread livre para os callbacks interativos (filtros)
+MAXIMO_TAREFAS_PESADAS = int(os.environ.get('TAREFAS_PESADAS', max(1, THREADS_POR_WORKER - 1)))
+
+# Tempo máximo (segundos) esperando o resultado de uma tarefa
+TEMPO_LIMITE_TAREFA = 120
+
+_EXECUTORES = {}
+_VAGAS = {tipo: threading.BoundedSemaphore(limite['simultaneas'] + limite['fila'])
+          for tipo, limite in LIMITES_TAREFAS.items()}
+_VAGAS_TOTAIS = threading.BoundedSemaphore(MAXIMO_TAREFAS_PESADAS)
+_TRAVA = threading.Lock()
+
+class ServidorOcupado(TimeoutError):
+    """
+    Não há vaga para a tarefa: o cliente deve tentar de novo em instantes
+    """
+
+def _reiniciar_no_filho():
+    """
+    Descarta, no processo filho de um fork, os executores e as vagas
+    herdados do pai (as threads que os usavam não existem no filho)
+    """
+    global _VAGAS, _VAGAS_TOTAIS, _TRAVA
+    _EXECUTORES.clear()
+    _VAGAS = {tipo: threading.BoundedSemaphore(limite['simultaneas'] + limite['fila'])
+              for tipo, limite in LIMITES_TAREFAS.items()}
+    _VAGAS_TOTAIS = threading.BoundedSemaphore(MAXIMO_TAREFAS_PESADAS)
+    _TRAVA = threading.Lock()
+
+os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+def obter_executor(tipo):
+    """
+    Retorna (criando na primeira vez) o pool de threads do tipo de tarefa
+    """
+    with _TRAVA:
+        if tipo not in _EXECUTORES:
+            _EXECUTORES[tipo] = concurrent.futures.ThreadPoolExecutor(
+                max_workers=LIMITES_TAREFAS[tipo]['simultaneas'],
+                thread_name_prefix=f"tarefa-{tipo}"
+            )
+        return _EXECUTORES[tipo]
+
+def iniciar_tarefa(tipo, funcao, *args, **kwargs):
+    """
+    Inicia uma operação pesada no pool do seu tipo, sem esperar o resultado
+    (para tarefas de segundo plano, que não prendem o pedido)
+
+    Se o tipo já estiver no limite de tarefas, recusa na hora com
+    ServidorOcupado em vez de enfileirar sem limite. A vaga só é liberada
+    quando a tarefa termina.
+
+    Args:
+        tipo: Tipo da tarefa (chave de LIMITES_TAREFAS)
+        funcao: Função a executar
+        *args, **kwargs: Argumentos da função
+
+    Returns:
+        concurrent.futures.Future: Resultado da tarefa
+
+    Raises:
+        ServidorOcupado: Se não houver vaga para a tarefa
+    """
+    vagas = _VAGAS[tipo]
+    if not vagas.acquire(blocking=False):
+        raise ServidorOcupado(f"Limite de tarefas do tipo {tipo} atingido")
+
+    try:
+        futuro = obter_executor(tipo).submit(funcao, *args, **kwargs)
+    except BaseException:
+        vagas.release()
+        raise
+    futuro.add_done_callback(lambda _: vagas.release())
+    return futuro
+
+def executar_tarefa(tipo, funcao, *args, tempo_limite=TEMPO_LIMITE_TAREFA, **kwargs):
+    """
+    Executa uma operação pesada no pool do seu tipo e espera o resultado
+    (ver iniciar_tarefa)
+
+    Além do limite do tipo, o pedido precisa de uma das
+    MAXIMO_TAREFAS_PESADAS vagas de espera do processo, ocupada enquanto a
+    thread do pedido espera (na fila ou com a tarefa rodando). A vaga do
+    tipo só é liberada quando a tarefa termina, mesmo que o pedido tenha
+    desistido de esperar.
+
+    Args:
+        tipo: Tipo da tarefa (chave de LIMITES_TAREFAS)
+        funcao: Função a executar
+        *args, **kwargs: Argumentos da função
+        tempo_limite: Tempo máximo de espera pelo resultado (segundos)
+
+    Returns:
+        Resultado da função
+
+    Raises:
+        ServidorOcupado: Se não houver vaga para a tarefa
+        TimeoutError: Se o resultado não ficar pronto no tempo limite
+    """
+    vagas_totais = _VAGAS_TOTAIS
+    if not vagas_totais.acquire(blocking=False):
+        raise ServidorOcupado("Limite de tarefas pesadas atingido")
+    try:
+        futuro = iniciar_tarefa(tipo, funcao, *args, **kwargs)
+        concurrent.futures.wait([futuro], timeout=tempo_limite)
+        if not futuro.done():
+            raise TimeoutError(f"Tempo limite da tarefa do tipo {tipo} excedido")
+        return futuro.result()
+    finally:
+        vagas_totais.release()
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot_dados
+from snapshot_dados import (
+    carregar_snapshot,
+    construir_snapshot,
+    ler_versao_atual,
+    obter_snapshot,
+    publicar_snapshot,
+    reescalar_atribuicao,
+    salvar_snapshot,
+)
+
+def escolas_exemplo():
+    """
+    Tabela de escolas pequena, com dois NREs
+    """
+    return pd.DataFrame({
+        'NRE': ['NRE B', 'NRE A', 'NRE B', 'NRE A'],
+        'Escola': ['Escola 1', 'Escola 2', 'Escola 3', 'Escola 4'],
+        'Alunos': [100, 200, 50, 80],
+        'Professores': [5, 8, 3, 4],
+        'Atribuição Esperada': [24000, 48000, 12000, 19200],
+        'Questões Respondidas': [18000, 30000, 6000, 19200],
+        'Questões Corretas': [11700, 21000, 3000, 9600],
+        'Índice de Respostas': [0.75, 0.625, 0.5, 1.0],
+        'Percentual de acertos': [0.65, 0.7, 0.5, 0.5],
+    })
+
+@pytest.fixture
+def diretorio(tmp_path, monkeypatch):
+    """
+    Diretório de snapshot vazio, sem nenhuma versão publicada neste processo
+    """
+    monkeypatch.setitem(snapshot_dados._SNAPSHOT_PUBLICADO, 'snapshot', None)
+    monkeypatch.setitem(snapshot_dados._SNAPSHOT_PUBLICADO, 'mtime', None)
+    return str(tmp_path)
+
+def avancar_atual(diretorio):
+    """
+    Garante um mtime novo no atual.json (duas publicações seguidas podem
+    cair no mesmo tique do relógio do sistema de arquivos)
+    """
+    caminho = os.path.join(diretorio, 'atual.json')
+    mtime = os.stat(caminho).st_mtime_ns + 10**9
+    os.utime(caminho, ns=(mtime, mtime))
+
+def test_publicar_e_carregar_a_versao_atual(diretorio):
+    snapshot = construir_snapshot(escolas_exemplo(), 8, 30)
+    publicar_snapshot(snapshot, diretorio)
+
+    assert ler_versao_atual(diretorio) == snapshot['versao']
+    carregado = obter_snapshot(diretorio)
+    assert carregado['versao'] == snapshot['versao']
+    assert carregado['nres'] == ['NRE A', 'NRE B']
+    np.testing.assert_array_equal(carregado['alunos'], snapshot['alunos'])
+    # Mapeado do disco e somente leitura
+    assert isinstance(carregado['alunos'], np.memmap)
+    assert not carregado['alunos'].flags.writeable
+
+def test_troca_de_versao_publicada_por_outro_processo(diretorio):
+    antigo = construir_snapshot(escolas_exemplo(), 8, 30)
+    publicar_snapshot(antigo, diretorio)
+    em_uso = obter_snapshot(diretorio)
+
+    # Outro processo publica uma nova versão: só o atual.json muda
+    novo = reescalar_atribuicao(em_uso, 10, 30)
+    salvar_snapshot(novo, diretorio)
+    avancar_atual(diretorio)
+
+    atual = obter_snapshot(diretorio)
+    assert atual['versao'] == novo['versao'] != antigo['versao']
+    assert atual['semanas_atuais'] == 10
+    np.testing.assert_allclose(atual['atribuicao_esperada'], atual['alunos'] * 300)
+    # Quem ainda usa a versão anterior continua lendo os mesmos dados
+    np.testing.assert_array_equal(em_uso['atribuicao_esperada'], antigo['atribuicao_esperada'])
+    # E ela continua carregável pela versão (processos auxiliares)
+    assert carregar_snapshot(diretorio, antigo['versao'])['versao'] == antigo['versao']
+
+def test_mantem_so_a_versao_atual_e_a_anterior(diretorio):
+    versoes = []
+    snapshot = construir_snapshot(escolas_exemplo(), 8, 30)
+    for semanas in (8, 9, 10):
+        snapshot = reescalar_atribuicao(snapshot, semanas, 30)
+        salvar_snapshot(snapshot, diretorio)
+        versoes.append(snapshot['versao'])
+
+    assert sorted(nome for nome in os.listdir(diretorio) if nome != 'atual.json') == sorted(versoes[1:])
+    assert carregar_snapshot(diretorio, versoes[0]) is None
+    assert carregar_snapshot(diretorio)['versao'] == versoes[2]
+
+def test_dataframe_nres_de_versoes_diferentes(diretorio):
+    antigo = construir_snapshot(escolas_exemplo(), 8, 30)
+    novo = reescalar_atribuicao(antigo, 16, 30)
+
+    df_antigo = snapshot_dados.dataframe_nres(antigo)
+    df_novo = snapshot_dados.dataframe_nres(novo)
+    assert df_novo is not df_antigo
+    por_nre = df_novo.set_index('NRE')
+    assert por_nre.loc['NRE A', 'Atribuição Esperada'] == (200 + 80) * 16 * 30
+    assert por_nre.loc['NRE B', 'Número de Escolas'] == 2
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+import tarefas_pesadas
+from tarefas_pesadas import ServidorOcupado, executar_tarefa, iniciar_tarefa
+
+@pytest.fixture
+def vagas_totais(monkeypatch):
+    """
+    Limita o processo a uma tarefa pesada esperando por vez
+    """
+    monkeypatch.setattr(tarefas_pesadas, '_VAGAS_TOTAIS', threading.BoundedSemaphore(1))
+
+@pytest.fixture
+def bloqueio():
+    """
+    Evento que segura as tarefas de teste até o fim do teste
+    """
+    evento = threading.Event()
+    yield evento
+    evento.set()
+
+def esperar(evento):
+    evento.wait(10)
+    return 'ok'
+
+def test_recusa_na_hora_quando_as_vagas_do_processo_acabam(vagas_totais, bloqueio):
+    ocupante = threading.Thread(target=executar_tarefa, args=('imagem', esperar, bloqueio))
+    ocupante.start()
+    time.sleep(0.1)
+
+    inicio = time.monotonic()
+    with pytest.raises(ServidorOcupado):
+        executar_tarefa('pdf', esperar, bloqueio, tempo_limite=5)
+    # A recusa não espera o tempo limite da tarefa
+    assert time.monotonic() - inicio < 1
+
+    bloqueio.set()
+    ocupante.join(5)
+    assert executar_tarefa('pdf', esperar, bloqueio) == 'ok'
+
+def test_recusa_quando_o_tipo_esta_no_limite(bloqueio):
+    # 'relatorios': uma tarefa de cada vez e nenhuma na fila
+    futuro = iniciar_tarefa('relatorios', esperar, bloqueio)
+    with pytest.raises(ServidorOcupado):
+        iniciar_tarefa('relatorios', esperar, bloqueio)
+
+    bloqueio.set()
+    assert futuro.result(5) == 'ok'
+    # A vaga do tipo é devolvida quando a tarefa termina
+    assert iniciar_tarefa('relatorios', esperar, bloqueio).result(5) == 'ok'
+
+def test_tempo_limite_libera_o_pedido_mas_nao_a_vaga_do_tipo(vagas_totais, bloqueio):
+    with pytest.raises(TimeoutError) as erro:
+        executar_tarefa('atualizacao', esperar, bloqueio, tempo_limite=0.1)
+    assert not isinstance(erro.value, ServidorOcupado)
+
+    # O pedido desistiu (vaga do processo livre), mas a tarefa continua
+    # rodando e ocupando a única vaga do tipo
+    with pytest.raises(ServidorOcupado):
+        executar_tarefa('atualizacao', esperar, bloqueio)
+
+    bloqueio.set()
+    time.sleep(0.1)
+    assert executar_tarefa('atualizacao', esperar, bloqueio) == 'ok'
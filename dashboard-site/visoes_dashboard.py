@@ -0,0 +1,224 @@
+import numpy as np
+from melhorias_graficos import (
+    criar_gauge_melhorado,
+    criar_grafico_nres_melhorado,
+    criar_grafico_alunos_nre_melhorado,
+    criar_tabela_escolas_melhorada,
+    criar_lista_atencao
+)
+from snapshot_dados import (
+    dataframe_nres,
+    dataframe_escolas,
+    melhores_escolas,
+    escolas_atencao,
+    agregar_selecao,
+    codigos_nres,
+    indicadores_anteriores,
+    SEPARADOR_CHAVE
+)
+
+def indices_escola(snapshot, nre=None, escola=None):
+    """
+    Retorna os índices no snapshot da escola com esse nome (dentro do NRE, se
+    informado)
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: Nome do NRE (opcional)
+        escola: Nome da escola
+
+    Returns:
+        numpy.ndarray: Índices encontrados
+    """
+    mascara = snapshot['escola'] == escola
+    if nre:
+        mascara &= snapshot['nre_codigo'] == snapshot['nres'].index(nre)
+    return np.flatnonzero(mascara)
+
+def chaves_escolas(snapshot, indices):
+    """
+    Retorna as chaves estáveis das escolas ("NRE<tab>Escola"), que continuam
+    válidas quando uma nova versão dos dados é publicada (ao contrário dos
+    índices, que mudam com o número de escolas)
+
+    Args:
+        snapshot: Snapshot das escolas
+        indices: Índices (ou fatia) das escolas
+
+    Returns:
+        numpy.ndarray: Chaves das escolas
+    """
+    nres = np.array(snapshot['nres'], dtype=str)
+    return np.char.add(np.char.add(nres[snapshot['nre_codigo'][indices]], SEPARADOR_CHAVE), snapshot['escola'][indices])
+
+def indices_por_chaves(snapshot, chaves):
+    """
+    Converte chaves de escolas (ver chaves_escolas) nos índices do snapshot
+    atual, na ordem recebida; chaves de escolas que não existem mais são
+    ignoradas
+
+    Args:
+        snapshot: Snapshot das escolas
+        chaves: Chaves "NRE<tab>Escola"
+
+    Returns:
+        numpy.ndarray: Índices das escolas encontradas
+    """
+    posicoes_nre = {}
+    indices = []
+    for chave in chaves:
+        nre, _, escola = str(chave).partition(SEPARADOR_CHAVE)
+        if nre not in posicoes_nre:
+            posicoes_nre[nre] = {}
+            if nre in snapshot['nres']:
+                # Nomes das escolas do NRE -> índice, a partir da faixa do NRE
+                codigo = snapshot['nres'].index(nre)
+                inicio, fim = int(snapshot['offsets'][codigo]), int(snapshot['offsets'][codigo + 1])
+                posicoes_nre[nre] = {str(nome): inicio + i for i, nome in enumerate(snapshot['escola'][inicio:fim])}
+        if escola in posicoes_nre[nre]:
+            indices.append(posicoes_nre[nre][escola])
+    return np.array(indices, dtype=np.int64)
+
+def nre_do_filtro(snapshot, nre):
+    """
+    Retorna o NRE do filtro se ele existir na versão atual dos dados, senão
+    None (todos os NREs): o filtro guardado no navegador pode vir de uma
+    versão anterior, da qual o NRE saiu
+    """
+    return nre if nre in snapshot['nres'] else None
+
+def indices_filtro(snapshot, nre=None, escola=None):
+    """
+    Retorna os índices no snapshot das escolas visíveis com o filtro atual,
+    usando as faixas de cada NRE (offsets) do snapshot
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+
+    Returns:
+        numpy.ndarray: Índices das escolas, na ordem do snapshot
+    """
+    if escola:
+        return indices_escola(snapshot, nre, escola)
+    if nre:
+        codigo = snapshot['nres'].index(nre)
+        return np.arange(snapshot['offsets'][codigo], snapshot['offsets'][codigo + 1])
+    return np.arange(len(snapshot['escola']))
+
+def filtrar_nres(snapshot, nre=None):
+    """
+    Retorna as métricas por NRE (ordenadas por percentual de acertos),
+    restritas ao NRE selecionado quando houver
+    """
+    df_nre = dataframe_nres(snapshot)
+    if nre:
+        return df_nre[df_nre['NRE'] == nre]
+    return df_nre
+
+def variacao_nres(snapshot, df_nre):
+    """
+    Retorna a variação semanal do percentual de acertos, alinhada às linhas
+    de df_nre
+    """
+    codigos = codigos_nres(snapshot, df_nre['NRE'])
+    return df_nre['Percentual de acertos'].to_numpy() - snapshot['anterior_nre_percentual_acertos'][codigos]
+
+def calcular_indicadores(snapshot, nre=None, escola=None):
+    """
+    Calcula os indicadores exibidos nos gauges para o filtro atual, com os
+    valores da semana anterior
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+
+    Returns:
+        dict: indice_respostas, percentual_acertos e os respectivos anteriores
+    """
+    if nre and escola:
+        escolas = indices_escola(snapshot, nre, escola)
+        selecao = agregar_selecao(snapshot, escolas=escolas)
+        anteriores = indicadores_anteriores(snapshot, escolas=escolas)
+    elif nre:
+        selecao = agregar_selecao(snapshot, nres=[nre])
+        anteriores = indicadores_anteriores(snapshot, nre=nre)
+    else:
+        selecao = agregar_selecao(snapshot, snapshot['nres'])
+        anteriores = indicadores_anteriores(snapshot)
+
+    return {
+        'indice_respostas': selecao['indice_respostas'],
+        'percentual_acertos': selecao['percentual_acertos'],
+        'anterior_indice_respostas': anteriores[0],
+        'anterior_percentual_acertos': anteriores[1],
+    }
+
+def construir_figuras(snapshot, nre=None, escola=None):
+    """
+    Constrói as figuras completas do dashboard para um filtro, como o
+    usuário as vê na tela (usadas nas exportações de imagem e PDF)
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+
+    Returns:
+        dict: Figuras Plotly por nome ('grafico_nres', 'grafico_alunos',
+        'gauge_respostas', 'gauge_acertos')
+    """
+    indicadores = calcular_indicadores(snapshot, nre, escola)
+    df_nre = filtrar_nres(snapshot, nre)
+
+    return {
+        'grafico_nres': criar_grafico_nres_melhorado(df_nre, ordenado=True, variacao=variacao_nres(snapshot, df_nre)),
+        'grafico_alunos': criar_grafico_alunos_nre_melhorado(df_nre),
+        'gauge_respostas': criar_gauge_melhorado(
+            indicadores['indice_respostas'], "Índice de Respostas", indicadores['anterior_indice_respostas']),
+        'gauge_acertos': criar_gauge_melhorado(
+            indicadores['percentual_acertos'], "Percentual de Acertos", indicadores['anterior_percentual_acertos']),
+    }
+
+def tabela_escolas_filtro(snapshot, nre=None, escola=None):
+    """
+    Cria a tabela de escolas do filtro: a escola selecionada, todas as
+    escolas do NRE ou as 20 melhores do Estado, pelas ordens pré-calculadas
+    no snapshot (top-k em O(k))
+    """
+    if escola:
+        indices = indices_escola(snapshot, nre, escola)
+    else:
+        indices = melhores_escolas(snapshot, nre, k=None if nre else 20)
+    return criar_tabela_escolas_melhorada(dataframe_escolas(snapshot, indices), ordenado=True)
+
+def lista_atencao_filtro(snapshot, nre=None):
+    """
+    Cria a lista de escolas que precisam de atenção no NRE (ou no Estado)
+    """
+    titulo = f"Escolas que precisam de atenção - {nre}" if nre else "Escolas que precisam de atenção - Estado"
+    return criar_lista_atencao(dataframe_escolas(snapshot, escolas_atencao(snapshot, nre)), titulo)
+
+def construir_saidas_filtro(snapshot, nre=None, escola=None):
+    """
+    Constrói as saídas do dashboard para um filtro, exceto os gauges (que
+    são enviados como atualização parcial)
+
+    Args:
+        snapshot: Snapshot das escolas
+        nre: NRE selecionado (opcional)
+        escola: Escola selecionada (opcional)
+
+    Returns:
+        dict: 'grafico_nres', 'grafico_alunos', 'tabela_escolas' e
+        'lista_atencao'
+    """
+    df_nre = filtrar_nres(snapshot, nre)
+    return {
+        'grafico_nres': criar_grafico_nres_melhorado(df_nre, ordenado=True, variacao=variacao_nres(snapshot, df_nre)),
+        'grafico_alunos': criar_grafico_alunos_nre_melhorado(df_nre),
+        'tabela_escolas': tabela_escolas_filtro(snapshot, nre, escola),
+        'lista_atencao': lista_atencao_filtro(snapshot, nre),
+    }
@@ -0,0 +1,207 @@
+import concurrent.futures
+import os
+import threading
+from snapshot_dados import DIRETORIO_SNAPSHOT, carregar_snapshot
+from visoes_dashboard import construir_saidas_filtro
+from serializacao_json import para_json, fragmento_json
+from processos_auxiliares import contexto_processos
+
+# Saídas de construir_saidas_filtro gravadas em cada visão, uma por linha
+SAIDAS_FILTRO = ('grafico_nres', 'grafico_alunos', 'tabela_escolas', 'lista_atencao')
+
+# Número máximo de processos pré-calculando as visões dos NREs
+NUM_PROCESSOS_VISOES = int(os.environ.get('VISOES_PROCESSOS', min(4, os.cpu_count() or 1)))
+
+# Snapshot usado por um processo de pré-cálculo (ver _iniciar_processo_visoes)
+_SNAPSHOT_PROCESSO = {'snapshot': None}
+
+# Saídas pré-calculadas em memória neste processo (arquivo -> linhas em
+# bytes), da versão atual dos dados
+_CACHE_VISOES = {'versao': None, 'saidas': {}}
+
+# Versões cujas visões estão sendo pré-calculadas neste processo
+_EM_CONSTRUCAO = set()
+_TRAVA = threading.Lock()
+
+def _reiniciar_no_filho():
+    """
+    Recria, no processo filho de um fork, a trava herdada do pai e descarta
+    os pré-cálculos em andamento (as threads que os fazem não existem no
+    filho)
+    """
+    global _TRAVA
+    _EM_CONSTRUCAO.clear()
+    _TRAVA = threading.Lock()
+
+os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+def diretorio_visoes(versao, diretorio=DIRETORIO_SNAPSHOT):
+    """
+    Retorna o diretório das visões pré-calculadas de uma versão dos dados
+    (dentro do diretório da versão no snapshot, removido junto com ela)
+    """
+    return os.path.join(diretorio, versao, 'visoes')
+
+def nome_arquivo_visao(snapshot, nre=None):
+    """
+    Retorna o nome do arquivo da visão do Estado ou de um NRE
+    """
+    return f"nre-{snapshot['nres'].index(nre)}.jsonl" if nre else 'estado.jsonl'
+
+def serializar_saidas(snapshot, nre=None):
+    """
+    Constrói as saídas do dashboard para o filtro e as serializa em JSON,
+    uma saída por linha na ordem de SAIDAS_FILTRO
+
+    Returns:
+        bytes: Saídas em JSON (figuras e componentes já no formato do Dash)
+    """
+    saidas = construir_saidas_filtro(snapshot, nre)
+    return b'\n'.join(para_json(saidas[chave]).encode('utf-8') for chave in SAIDAS_FILTRO)
+
+def gravar_visao(snapshot, nre, caminho):
+    """
+    Constrói e grava a visão do Estado ou de um NRE (gravação atômica)
+    """
+    temporario = f"{caminho}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(temporario, 'wb') as f:
+        f.write(serializar_saidas(snapshot, nre))
+    os.replace(temporario, caminho)
+
+def _iniciar_processo_visoes(diretorio, versao):
+    """
+    Inicializa um processo de pré-cálculo, mapeando dos arquivos do snapshot
+    a versão dos dados das visões
+    """
+    _SNAPSHOT_PROCESSO['snapshot'] = carregar_snapshot(diretorio, versao)
+
+def _gravar_visao_processo(nre, caminho):
+    """
+    Grava a visão de um NRE (executado nos processos de pré-cálculo)
+    """
+    snapshot = _SNAPSHOT_PROCESSO['snapshot']
+    if snapshot is None:
+        raise RuntimeError("Versão dos dados não encontrada no snapshot salvo")
+    gravar_visao(snapshot, nre, caminho)
+
+def precalcular_visoes(snapshot, diretorio=DIRETORIO_SNAPSHOT, num_processos=NUM_PROCESSOS_VISOES):
+    """
+    Pré-calcula as saídas do dashboard para o Estado e para cada NRE,
+    gravando-as junto da versão no snapshot
+
+    A visão do Estado é gravada primeiro, por quem chama; as dos NREs são
+    construídas em paralelo num pool de processos (spawn, ver
+    contexto_processos), que carregam a mesma versão do snapshot pelo
+    diretório salvo. Visões já gravadas (por exemplo, após reiniciar o
+    servidor) não são refeitas.
+
+    Args:
+        snapshot: Snapshot publicado
+        diretorio: Diretório do snapshot (padrão: DIRETORIO_SNAPSHOT)
+        num_processos: Número máximo de processos
+
+    Returns:
+        int: Número de visões gravadas
+    """
+    destino = diretorio_visoes(snapshot['versao'], diretorio)
+    if not os.path.isdir(os.path.dirname(destino)):
+        # A versão já foi removida por uma publicação mais nova
+        return 0
+    os.makedirs(destino, exist_ok=True)
+
+    pendentes = [(nre, os.path.join(destino, nome_arquivo_visao(snapshot, nre)))
+                 for nre in [None] + list(snapshot['nres'])]
+    pendentes = [(nre, caminho) for nre, caminho in pendentes if not os.path.exists(caminho)]
+
+    # A visão do Estado (a página inicial) não espera os processos subirem
+    if pendentes and pendentes[0][0] is None:
+        gravar_visao(snapshot, None, pendentes.pop(0)[1])
+        gravadas = 1
+    else:
+        gravadas = 0
+
+    if pendentes:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, min(num_processos, len(pendentes))),
+                                                    mp_context=contexto_processos(),
+                                                    initializer=_iniciar_processo_visoes,
+                                                    initargs=(diretorio, snapshot['versao'])) as executor:
+            futuros = [executor.submit(_gravar_visao_processo, nre, caminho) for nre, caminho in pendentes]
+            for futuro in concurrent.futures.as_completed(futuros):
+                futuro.result()
+                gravadas += 1
+    return gravadas
+
+def preparar_visoes(snapshot, diretorio=DIRETORIO_SNAPSHOT):
+    """
+    Pré-calcula em segundo plano as visões da versão dos dados (uma única
+    construção por versão neste processo)
+
+    Deve ser chamado depois de publicar o snapshot. Enquanto as visões não
+    existirem, o dashboard as constrói na hora.
+
+    Args:
+        snapshot: Snapshot recém-publicado
+        diretorio: Diretório do snapshot (padrão: DIRETORIO_SNAPSHOT)
+
+    Returns:
+        threading.Thread: Thread do pré-cálculo, ou None se ele já estiver
+        em andamento
+    """
+    versao = snapshot['versao']
+    with _TRAVA:
+        if versao in _EM_CONSTRUCAO:
+            return None
+        _EM_CONSTRUCAO.add(versao)
+
+    def construir():
+        try:
+            precalcular_visoes(snapshot, diretorio)
+        except Exception as e:
+            print(f"Erro ao pré-calcular as visões do dashboard: {e}")
+        finally:
+            with _TRAVA:
+                _EM_CONSTRUCAO.discard(versao)
+
+    thread = threading.Thread(target=construir, name='visoes-dashboard', daemon=True)
+    thread.start()
+    return thread
+
+def obter_saidas_precalculadas(snapshot, nre=None, diretorio=DIRETORIO_SNAPSHOT):
+    """
+    Retorna as saídas pré-calculadas do filtro, ou None se ainda não
+    existirem (o chamador então as constrói)
+
+    Os bytes lidos do disco ficam em memória até a troca de versão e são
+    devolvidos como fragmentos de JSON (ver fragmento_json): com orjson 3.9+,
+    entram na resposta do callback sem nova serialização.
+
+    Args:
+        snapshot: Snapshot atual
+        nre: NRE selecionado (opcional)
+        diretorio: Diretório do snapshot (padrão: DIRETORIO_SNAPSHOT)
+
+    Returns:
+        dict: Mesmas chaves de construir_saidas_filtro, ou None
+    """
+    versao = snapshot['versao']
+    nome = nome_arquivo_visao(snapshot, nre)
+
+    with _TRAVA:
+        if _CACHE_VISOES['versao'] != versao:
+            _CACHE_VISOES['versao'] = versao
+            _CACHE_VISOES['saidas'] = {}
+        saidas = _CACHE_VISOES['saidas']
+        linhas = saidas.get(nome)
+
+    if linhas is None:
+        try:
+            with open(os.path.join(diretorio_visoes(versao, diretorio), nome), 'rb') as f:
+                linhas = f.read().split(b'\n')
+        except OSError:
+            return None
+        if len(linhas) != len(SAIDAS_FILTRO):
+            return None
+        with _TRAVA:
+            saidas[nome] = linhas
+
+    return {chave: fragmento_json(linha) for chave, linha in zip(SAIDAS_FILTRO, linhas)}